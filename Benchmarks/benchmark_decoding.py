@@ -0,0 +1,241 @@
+"""
+Throughput benchmark of the decoding stages of the IPR library.
+
+Every stage (framing, escape handling, validation, field extraction, scaling and the complete
+decoders) is timed on the example capture and on larger synthetic captures, and reported in
+packets per second and megabytes per second. Results are saved as JSON in Benchmarks/results/
+so that two versions of the library can be compared:
+
+    python Benchmarks/benchmark_decoding.py
+    python Benchmarks/benchmark_decoding.py --sizes 10 100 --compare Benchmarks/results/<previous>.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pyipr_sensor_lib
+from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+from pyipr_sensor_lib.ipr_encoder import IPRCaptureGenerator
+from pyipr_sensor_lib.ipr_frame_splitter import IPRFrameSplitter
+from pyipr_sensor_lib.ipr_packet_layout import PACKET_LAYOUTS_BY_ID
+from pyipr_sensor_lib.ipr_parser import IPRParser
+from pyipr_sensor_lib.ipr_sample_decoder import decode_into, DECODE_BUFFER_LENGTH
+from pyipr_sensor_lib.ipr_sensor_decoder import IPRSensorDecoder
+
+BENCHMARK_PATH = os.path.dirname(os.path.abspath(__file__)) + "/"
+EXAMPLE_PATH = BENCHMARK_PATH + "../Examples/"
+EXAMPLE_FILE = "binary_data_example_01.bin"
+RESULTS_PATH = BENCHMARK_PATH + "results/"
+
+SERIAL_BLOCK_SIZE = 4096  # Size of the blocks fed to the frame splitter, as read from the serial port
+
+
+def make_synthetic_capture(size):
+    """Generate a synthetic capture of about size bytes with the packet mix of the example capture."""
+    _generator = IPRCaptureGenerator(jitter=500, seed=size)
+    _capture = bytearray()
+    while len(_capture) < size:
+        _capture += _generator.generate(IPRCaptureGenerator.DEFAULT_BLOCK_TICKS)
+    return bytes(_capture)
+
+
+def time_stage(function, repeat):
+    """Run a stage repeat times and return the best duration in seconds."""
+    _best = None
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        function()
+        _duration = time.perf_counter() - _start
+        _best = _duration if _best is None else min(_best, _duration)
+    return _best
+
+
+def prepare_parsers(telegrams):
+    """
+    Create one parser per valid telegram, unescaped and ready for field extraction.
+
+    The lengths are those of the packet layouts, so that the telegrams measured are the ones
+    accepted by the decoders.
+    """
+    _parsers = list()
+    for _telegram in telegrams:
+        _parser = IPRParser()
+        if _parser.parser_check_telegram_validity(_telegram):
+            _layout = PACKET_LAYOUTS_BY_ID[_parser.parser_get_id()]
+            _parser.parser_get_id_name()
+            if _layout is not None and len(_parser._byte_data) >= _layout.telegram_length:
+                _parsers.append(_parser)
+    return _parsers
+
+
+def get_stages(data, filepath, filename):
+    """
+    Build the stages to benchmark on a capture.
+
+    Returns:
+        list: (stage name, function to time) tuples
+    """
+    _decoder = IPRSensorDecoder()
+    _telegrams = data.split(b'\x08')[:-1]
+    _hex_telegrams = [_telegram.hex() for _telegram in _telegrams]
+    _parser = IPRParser()
+    _parsers = prepare_parsers(_telegrams)
+
+    def frame_file():
+        _decoder.load_telegrams_from_binary_file(filepath, filename)
+
+    def frame_file_hex():
+        _decoder.load_from_binary_file(filepath, filename)
+
+    def frame_stream():
+        _splitter = IPRFrameSplitter()
+        for _start in range(0, len(data), SERIAL_BLOCK_SIZE):
+            _splitter.feed(data[_start:_start + SERIAL_BLOCK_SIZE])
+
+    def unescape():
+        for _telegram in _telegrams:
+            _parser.parser_unescape(_telegram)
+
+    def unescape_hex():
+        for _telegram in _hex_telegrams:
+            _parser.parser_hex_to_byte(_telegram, len(_telegram))
+
+    def validate():
+        for _telegram in _telegrams:
+            _parser.parser_check_telegram_validity(_telegram)
+
+    def extract():
+        for _p in _parsers:
+            _p.parser_get_header()
+            if _p.packet_type == "STRAIN":
+                _p.parser_get_strain()
+            elif _p.packet_type == "ENVIRONMENT":
+                _p.parser_get_environment()
+            else:
+                _p.parser_get_acceleration()
+
+    def scale():
+        for _p in _parsers:
+            if _p.packet_type == "STRAIN":
+                _p.parser_scale_strain_xyz()
+                _p.parser_scale_strain_p1p2()
+            elif _p.packet_type == "ENVIRONMENT":
+                _p.parser_scale_environment()
+            else:
+                _p.parser_scale_acceleration()
+
+    def analyse_packet():
+        for _telegram in _telegrams:
+            _decoder.analyse_packet(_telegram)
+
+    def sample_decode_into():
+        _values = [0] * DECODE_BUFFER_LENGTH
+        for _telegram in _telegrams:
+            decode_into(_telegram, _values)
+
+    def batch_decode():
+        decode_batch(data)
+
+    # Extract the raw values once so that scale() can also be timed on its own
+    extract()
+    _parser.invalid_data_list.clear()
+    return [("frame_file", frame_file), ("frame_file_hex", frame_file_hex), ("frame_stream", frame_stream),
+            ("unescape", unescape), ("unescape_hex", unescape_hex), ("validate", validate),
+            ("extract", extract), ("scale", scale), ("analyse_packet", analyse_packet),
+            ("sample_decode_into", sample_decode_into), ("decode_batch", batch_decode)]
+
+
+def run_capture(name, data, repeat):
+    """
+    Benchmark every stage on a capture.
+
+    Returns:
+        dict: Capture description and per-stage results
+    """
+    _telegram_count = data.count(b'\x08')
+    _result = {"capture": name, "bytes": len(data), "telegrams": _telegram_count, "stages": dict()}
+    with tempfile.TemporaryDirectory() as _directory:
+        _filepath = _directory + "/"
+        with open(_filepath + "capture.bin", 'wb') as _file:
+            _file.write(data)
+        _stages = get_stages(data, _filepath, "capture.bin")
+
+        for _stage_name, _function in _stages:
+            _duration = time_stage(_function, repeat)
+            _result["stages"][_stage_name] = {
+                "seconds": _duration,
+                "packets_per_second": _telegram_count / _duration,
+                "megabytes_per_second": len(data) / _duration / 1e6,
+            }
+            print("{:<12} {:<20} {:>10.4f} s {:>14,.0f} packets/s {:>10.2f} MB/s".format(
+                name, _stage_name, _duration, _telegram_count / _duration, len(data) / _duration / 1e6))
+    return _result
+
+
+def compare_results(current, previous):
+    """Print the throughput change of every stage against a previous result file."""
+    _previous = {(_c["capture"], _s): _v["packets_per_second"]
+                 for _c in previous["captures"] for _s, _v in _c["stages"].items()}
+    print("\nChange against {} ({}):".format(previous["version"], previous["date"]))
+    for _capture in current["captures"]:
+        for _stage_name, _values in _capture["stages"].items():
+            _before = _previous.get((_capture["capture"], _stage_name))
+            if _before:
+                print("{:<12} {:<20} {:>+8.1f} %".format(
+                    _capture["capture"], _stage_name, 100.0 * (_values["packets_per_second"] / _before - 1)))
+
+
+def main():
+    _arguments = argparse.ArgumentParser(description="Benchmark the IPR decoding stages")
+    _arguments.add_argument("--sizes", type=int, nargs="*", default=[10],
+                            help="Sizes in MB of the synthetic captures (default: 10)")
+    _arguments.add_argument("--repeat", type=int, default=3, help="Runs per stage, the best is kept")
+    _arguments.add_argument("--output", help="Result file (default: results/<version>_<date>.json)")
+    _arguments.add_argument("--compare", help="Previous result file to compare with")
+    _args = _arguments.parse_args()
+
+    with open(EXAMPLE_PATH + EXAMPLE_FILE, 'rb') as _file:
+        _example = _file.read()
+
+    _captures = [("example", _example)]
+    _captures += [("synth_{}MB".format(_size), make_synthetic_capture(_size * 1000000))
+                  for _size in _args.sizes]
+
+    _results = {
+        "version": pyipr_sensor_lib.__version__,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": _args.repeat,
+        "captures": [run_capture(_name, _data, _args.repeat) for _name, _data in _captures],
+    }
+
+    _output = _args.output
+    if _output is None:
+        os.makedirs(RESULTS_PATH, exist_ok=True)
+        _output = RESULTS_PATH + "{}_{}.json".format(_results["version"],
+                                                     datetime.now().strftime("%Y%m%d_%H%M%S"))
+    with open(_output, 'w') as _file:
+        json.dump(_results, _file, indent=2)
+    print("\nResults saved to {}".format(_output))
+
+    if _args.compare:
+        with open(_args.compare) as _file:
+            compare_results(_results, json.load(_file))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from pyipr_sensor_lib.ipr_sensor_decoder import IPRSensorDecoder
+from pyipr_sensor_lib.ipr_capture_writer import IPRCaptureWriter
 from pyipr_sensor_lib.ipr_serial_interface import IPRSerialInterface
 
 # *****************************************************************************************
@@ -18,7 +18,11 @@ obj.serial_open()               # Open the serial port with predefined setting f
 obj.serial_ipr_start_binary_read()      # Start the binary datastream from the sensor
 # obj.serial_ipr_stop_binary_read()     # Stop the binary datastream from the sensor
 
-# Create a parser object
-ipr_obj = IPRSensorDecoder()
-while True:
-    ipr_obj.save_binary_data(binary_file_path, binary_file_name, obj.serial_read_binary())
+# Create a writer keeping the file open and writing the data in large blocks
+# Use max_file_size or max_file_duration to start a new file regularly
+writer = IPRCaptureWriter(binary_file_path, binary_file_name, flush_interval=1.0)
+try:
+    while True:
+        writer.write(obj.serial_read_available())
+finally:
+    writer.close()
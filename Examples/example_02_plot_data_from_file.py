@@ -1,4 +1,6 @@
 from pyipr_sensor_lib.ipr_sensor_decoder import IPRSensorDecoder
+from pyipr_sensor_lib.ipr_time_axis import unwrap_timestamps
+from pyipr_sensor_lib.ipr_aggregation import lttb_downsample
 
 # Matplotlib is only used at this level to plot the data. The IPR library has no dependence on Matplotlib
 import matplotlib.pyplot as plt
@@ -10,31 +12,48 @@ import matplotlib.pyplot as plt
 # Read the entire file as a single byte string
 binary_file_path = "./"
 binary_file_name = 'binary_data_example_01.bin'
+# Long captures are reduced to this number of points per curve, which keeps the peaks visible
+max_plot_points = 5000
 
 # Create an object to parse the data from the sensor or a binary file
 ipr_obj = IPRSensorDecoder()
-telegram_list = ipr_obj.load_from_binary_file(binary_file_path, binary_file_name)
+telegram_list = ipr_obj.load_telegrams_from_binary_file(binary_file_path, binary_file_name)
 
 strain_list = list([list(),list(),list()])
 acceleration_list = list([list(),list(),list()])
 environment_list = list([list(),list(),list(),list()])
+# Raw header timestamps of each packet type, used as time axis of the plots
+strain_timestamps = list()
+acceleration_timestamps = list()
+environment_timestamps = list()
+first_timestamp = None
 # Analyse each telegram in the list. Each telegram contains either Strain, Acceleration, or Environment data
 for _telegram in telegram_list:
     ipr_obj.analyse_packet(_telegram)
     if ipr_obj.ipr_decoder_is_packet_valid():
+        if first_timestamp is None:
+            first_timestamp = ipr_obj.get_timestamp()
         if ipr_obj.get_packet_type() == ipr_obj.TYPE_STRAIN:
             strain_list[0].append(ipr_obj.get_strain_xyz(ipr_obj.STRAIN_AXIS_X))    # Get Strain X scaled value
             strain_list[1].append(ipr_obj.get_strain_xyz(ipr_obj.STRAIN_AXIS_Y))    # Get Strain Y scaled value
             strain_list[2].append(ipr_obj.get_strain_xyz(ipr_obj.STRAIN_AXIS_Z))    # Get Strain Z scaled value
+            strain_timestamps.append(ipr_obj.get_timestamp())
         if ipr_obj.get_packet_type() == ipr_obj.TYPE_ACCELERATION:
             acceleration_list[0].append(ipr_obj.get_acceleration_xyz(ipr_obj.ACCEL_AXIS_X))    # Get Acceleration X scaled value
             acceleration_list[1].append(ipr_obj.get_acceleration_xyz(ipr_obj.ACCEL_AXIS_Y))    # Get Acceleration Y scaled value
             acceleration_list[2].append(ipr_obj.get_acceleration_xyz(ipr_obj.ACCEL_AXIS_Z))    # Get Acceleration Z scaled value
+            acceleration_timestamps.append(ipr_obj.get_timestamp())
         if ipr_obj.get_packet_type() == ipr_obj.TYPE_ENVIRONMENT:
             environment_list[0].append(ipr_obj.get_environment(ipr_obj.ENVIRONMENT_VBAT))  # Get Battery Voltage
             environment_list[1].append(ipr_obj.get_environment(ipr_obj.ENVIRONMENT_PRES))  # Get Pressure
             environment_list[2].append(ipr_obj.get_environment(ipr_obj.ENVIRONMENT_HUMI))  # Get Humidity
             environment_list[3].append(ipr_obj.get_environment(ipr_obj.ENVIRONMENT_TEMP))  # Get Temperature
+            environment_timestamps.append(ipr_obj.get_timestamp())
+
+# The 27-bit timestamps roll over: rebuild a monotonic time axis, in ticks since the first packet
+strain_ticks = unwrap_timestamps(strain_timestamps, first_timestamp) - first_timestamp
+acceleration_ticks = unwrap_timestamps(acceleration_timestamps, first_timestamp) - first_timestamp
+environment_ticks = unwrap_timestamps(environment_timestamps, first_timestamp) - first_timestamp
 
 # The code below allows to plot the scaled value of strain X, Y, Z
 fig, axs = plt.subplots(3)
@@ -44,10 +63,11 @@ axs[0].set_title('uStrain X')
 axs[1].set_title('uStrain Y')
 axs[2].set_title('uStrain Z')
 # Plot the data in each subplot
-axs[0].plot(range(0, len(strain_list[0])), strain_list[0], 'tab:blue')
-axs[1].plot(range(0, len(strain_list[1])), strain_list[1], 'tab:orange')
-axs[2].plot(range(0, len(strain_list[2])), strain_list[2], 'tab:green')
+axs[0].plot(*lttb_downsample(strain_ticks, strain_list[0], max_plot_points), 'tab:blue')
+axs[1].plot(*lttb_downsample(strain_ticks, strain_list[1], max_plot_points), 'tab:orange')
+axs[2].plot(*lttb_downsample(strain_ticks, strain_list[2], max_plot_points), 'tab:green')
 # Remove the X axis for subplots
+axs[-1].set_xlabel('Timestamp (ticks)')
 for ax in axs.flat:
     ax.label_outer()
 # Display the plot
@@ -61,10 +81,11 @@ axs[0].set_title('Acceleration X')
 axs[1].set_title('Acceleration Y')
 axs[2].set_title('Acceleration Z')
 # Plot the data in each subplot
-axs[0].plot(range(0, len(acceleration_list[0])), acceleration_list[0], 'tab:blue')
-axs[1].plot(range(0, len(acceleration_list[1])), acceleration_list[1], 'tab:orange')
-axs[2].plot(range(0, len(acceleration_list[2])), acceleration_list[2], 'tab:green')
+axs[0].plot(*lttb_downsample(acceleration_ticks, acceleration_list[0], max_plot_points), 'tab:blue')
+axs[1].plot(*lttb_downsample(acceleration_ticks, acceleration_list[1], max_plot_points), 'tab:orange')
+axs[2].plot(*lttb_downsample(acceleration_ticks, acceleration_list[2], max_plot_points), 'tab:green')
 # Remove the X axis for subplots
+axs[-1].set_xlabel('Timestamp (ticks)')
 for ax in axs.flat:
     ax.label_outer()
 # Display the plot
@@ -79,11 +100,12 @@ axs[1].set_title('Pressure')
 axs[2].set_title('Humidity')
 axs[3].set_title('Temperature')
 # Plot the data in each subplot
-axs[0].plot(range(0, len(environment_list[0])), environment_list[0], 'tab:blue')
-axs[1].plot(range(0, len(environment_list[1])), environment_list[1], 'tab:orange')
-axs[2].plot(range(0, len(environment_list[2])), environment_list[2], 'tab:green')
-axs[3].plot(range(0, len(environment_list[3])), environment_list[3], 'tab:red')
+axs[0].plot(environment_ticks, environment_list[0], 'tab:blue')
+axs[1].plot(environment_ticks, environment_list[1], 'tab:orange')
+axs[2].plot(environment_ticks, environment_list[2], 'tab:green')
+axs[3].plot(environment_ticks, environment_list[3], 'tab:red')
 # Remove the X axis for subplots
+axs[-1].set_xlabel('Timestamp (ticks)')
 for ax in axs.flat:
     ax.label_outer()
 # Display the plot
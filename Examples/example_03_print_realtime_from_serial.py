@@ -25,7 +25,7 @@ obj.serial_ipr_start_binary_read()      # Start the binary datastream from the s
 ipr_obj = IPRSensorDecoder()
 # Read in continuous mode the binary data, parse it and display the converted values
 while True:
-    ipr_obj.analyse_packet(obj.serial_ipr_read_telegram())
+    ipr_obj.analyse_packet(obj.serial_ipr_read_telegram_binary())
     if ipr_obj.ipr_decoder_is_packet_valid():
         if ipr_obj.get_packet_type() == ipr_obj.TYPE_ENVIRONMENT:
             ipr_obj.print_environment()
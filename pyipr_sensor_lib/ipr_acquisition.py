@@ -0,0 +1,238 @@
+import queue
+import threading
+from time import perf_counter
+
+from pyipr_sensor_lib.ipr_frame_splitter import IPRFrameSplitter
+
+
+class IPRRingBuffer:
+    """
+    Fixed-size byte ring buffer shared by one producer thread and one consumer thread.
+
+    The memory is allocated once. The producer only moves the write counter and the consumer
+    only moves the read counter, so no lock is needed between them. When the buffer is full,
+    the bytes that do not fit are dropped and counted in overflow_bytes.
+    """
+
+    def __init__(self, capacity):
+        """
+        Initialize the ring buffer.
+
+        Args:
+            capacity (int): Size of the buffer in bytes
+        """
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._write_count = 0  # Total bytes written, only updated by the producer
+        self._read_count = 0  # Total bytes read, only updated by the consumer
+        self.overflow_bytes = 0
+
+    def write(self, data):
+        """
+        Copy bytes into the buffer (producer side).
+
+        Args:
+            data (bytes/bytearray/memoryview): Bytes to store
+
+        Returns:
+            int: Number of bytes stored, lower than len(data) if the buffer was full
+        """
+        _free = self.capacity - (self._write_count - self._read_count)
+        _size = min(len(data), _free)
+        self.overflow_bytes += len(data) - _size
+
+        _position = self._write_count % self.capacity
+        _first_part = min(_size, self.capacity - _position)
+        self._buffer[_position:_position + _first_part] = data[:_first_part]
+        self._buffer[:_size - _first_part] = data[_first_part:_size]
+        self._write_count += _size
+        return _size
+
+    def read(self, max_size=None):
+        """
+        Take bytes out of the buffer (consumer side).
+
+        Args:
+            max_size (int): Maximum number of bytes to read (default: everything available)
+
+        Returns:
+            bytes: Bytes read, empty if the buffer is empty
+        """
+        _size = self._write_count - self._read_count
+        if max_size is not None:
+            _size = min(_size, max_size)
+
+        _position = self._read_count % self.capacity
+        _first_part = min(_size, self.capacity - _position)
+        _data = bytes(self._buffer[_position:_position + _first_part]) + self._buffer[:_size - _first_part]
+        self._read_count += _size
+        return _data
+
+    def get_length(self):
+        """
+        Get the number of bytes waiting in the buffer.
+
+        Returns:
+            int: Number of bytes available to the consumer
+        """
+        return self._write_count - self._read_count
+
+
+class IPRBackgroundReader:
+    """
+    Background acquisition of binary telegrams from an IPRSerialInterface.
+
+    Two threads are used:
+    - The read thread drains the serial port continuously into a preallocated ring buffer
+    - The framing thread splits the ring buffer content into telegrams and puts them in a
+      bounded queue read by the consumers
+
+    A slow consumer therefore never delays the serial port reads. When the queue is full,
+    telegrams are dropped according to the drop policy and counted.
+    """
+
+    # Drop policies applied when the telegram queue is full
+    DROP_NEWEST = 0  # Discard the telegram that was just framed
+    DROP_OLDEST = 1  # Discard the oldest telegram of the queue to make room
+    BLOCK = 2  # Wait for the consumer, the ring buffer absorbs the incoming data meanwhile
+
+    DEFAULT_RING_BUFFER_SIZE = 1024 * 1024
+    DEFAULT_QUEUE_SIZE = 10000
+
+    def __init__(self, serial_interface, ring_buffer_size=DEFAULT_RING_BUFFER_SIZE,
+                 queue_size=DEFAULT_QUEUE_SIZE, drop_policy=DROP_OLDEST):
+        """
+        Initialize the background reader.
+
+        Args:
+            serial_interface (IPRSerialInterface): Opened serial interface to read from
+            ring_buffer_size (int): Size of the ring buffer in bytes
+            queue_size (int): Maximum number of telegrams waiting for the consumers
+            drop_policy (int): DROP_NEWEST, DROP_OLDEST or BLOCK
+        """
+        self._serial_interface = serial_interface
+        self._ring_buffer = IPRRingBuffer(ring_buffer_size)
+        self._frame_splitter = IPRFrameSplitter()
+        self.telegram_queue = queue.Queue(queue_size)
+        self.drop_policy = drop_policy
+
+        self._data_available = threading.Event()
+        self._stop_requested = threading.Event()
+        self._read_thread = None
+        self._framing_thread = None
+
+        # Counters, also reported to the metrics of the serial interface if it has any
+        self.metrics = getattr(serial_interface, "metrics", None)
+        self.bytes_read = 0
+        self.telegrams_framed = 0
+        self.telegrams_dropped = 0
+
+    def start(self):
+        """Start the read and framing threads."""
+        if self.is_running():
+            return
+        self._stop_requested.clear()
+        self._read_thread = threading.Thread(target=self._read_loop, name="IPRSerialRead", daemon=True)
+        self._framing_thread = threading.Thread(target=self._framing_loop, name="IPRFraming", daemon=True)
+        self._read_thread.start()
+        self._framing_thread.start()
+
+    def stop(self):
+        """Stop the threads and wait for them to finish. Telegrams already queued are kept."""
+        self._stop_requested.set()
+        self._data_available.set()
+        for _thread in (self._read_thread, self._framing_thread):
+            if _thread is not None:
+                _thread.join()
+        self._read_thread = None
+        self._framing_thread = None
+
+    def is_running(self):
+        """
+        Check if the background threads are running.
+
+        Returns:
+            bool: True if the acquisition is running
+        """
+        return self._read_thread is not None and self._read_thread.is_alive()
+
+    def get_telegram(self, timeout=None):
+        """
+        Get the next telegram received.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds (default: wait forever)
+
+        Returns:
+            bytes: Telegram without the 0x08 separator, or None if the timeout was reached
+        """
+        try:
+            return self.telegram_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_ring_buffer_overflow(self):
+        """
+        Get the number of bytes lost because the ring buffer was full.
+
+        Returns:
+            int: Number of bytes dropped by the ring buffer
+        """
+        return self._ring_buffer.overflow_bytes
+
+    def _read_loop(self):
+        """Read thread: move the serial port data into the ring buffer."""
+        while not self._stop_requested.is_set():
+            _data = self._serial_interface.serial_read_available()
+            if _data:
+                self.bytes_read += len(_data)
+                _stored = self._ring_buffer.write(_data)
+                if _stored < len(_data) and self.metrics is not None:
+                    self.metrics.increment(self.metrics.RING_BUFFER_OVERFLOW_BYTES, len(_data) - _stored)
+                self._data_available.set()
+
+    def _framing_loop(self):
+        """Framing thread: split the ring buffer content into telegrams and queue them."""
+        while not self._stop_requested.is_set():
+            self._data_available.wait()
+            self._data_available.clear()
+            _data = self._ring_buffer.read()
+            if not _data:
+                continue
+            if self.metrics is None:
+                _telegrams = self._frame_splitter.feed(_data)
+            else:
+                _start_time = perf_counter()
+                _discarded_bytes = self._frame_splitter.discarded_bytes
+                _telegrams = self._frame_splitter.feed(_data)
+                self.metrics.record_time(self.metrics.STAGE_FRAME, perf_counter() - _start_time)
+                self.metrics.increment(self.metrics.TELEGRAMS_FRAMED, len(_telegrams))
+                self.metrics.increment(self.metrics.DISCARDED_BYTES,
+                                       self._frame_splitter.discarded_bytes - _discarded_bytes)
+            for _telegram in _telegrams:
+                self.telegrams_framed += 1
+                self._queue_telegram(_telegram)
+
+    def _queue_telegram(self, telegram):
+        """Put a telegram in the queue, applying the drop policy if the queue is full."""
+        if self.drop_policy == self.BLOCK:
+            while not self._stop_requested.is_set():
+                try:
+                    self.telegram_queue.put(telegram, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+            return
+
+        try:
+            self.telegram_queue.put_nowait(telegram)
+        except queue.Full:
+            self.telegrams_dropped += 1
+            if self.metrics is not None:
+                self.metrics.increment(self.metrics.QUEUE_OVERFLOWS)
+            if self.drop_policy == self.DROP_OLDEST:
+                try:
+                    self.telegram_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                self.telegram_queue.put_nowait(telegram)
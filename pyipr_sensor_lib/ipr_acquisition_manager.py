@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+from pyipr_sensor_lib.ipr_serial_interface import IPRSerialInterface
+
+
+class IPRAcquisitionManager:
+    """
+    Acquisition of several IPR sensors at once, with decoding spread over a process pool.
+
+    Each sensor is read by its own IPRBackgroundReader. The telegrams are grouped in batches per
+    sensor and decoded with ipr_batch_decoder.decode_batch in worker processes, so the decoding
+    work uses several cores while the read threads stay responsive. Decoded batches are returned
+    tagged with the sensor name, in reception order for each sensor.
+    """
+
+    DEFAULT_BATCH_SIZE = 2000  # Telegrams per decoded batch
+    DEFAULT_BATCH_INTERVAL = 0.5  # Maximum time in seconds before an incomplete batch is decoded
+
+    def __init__(self, com_port_names, workers=None, batch_size=DEFAULT_BATCH_SIZE,
+                 batch_interval=DEFAULT_BATCH_INTERVAL, scaled=True):
+        """
+        Initialize the acquisition manager.
+
+        Args:
+            com_port_names (list): Names of the COM ports the sensors are connected to
+            workers (int): Number of decoding processes (default: number of CPUs)
+            batch_size (int): Maximum number of telegrams decoded in a single batch
+            batch_interval (float): Maximum time in seconds a telegram waits for its batch to fill
+            scaled (bool): Whether to decode scaled values (default True)
+        """
+        self.com_port_names = list(com_port_names)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.scaled = scaled
+
+        self.sensor_names = list()
+        self._interfaces = list()
+        self._pending_batches = list()  # Per sensor, decoding futures in submission order
+        self._dispatch_threads = list()
+        self._executor = None
+        self._stop_requested = threading.Event()
+
+    def start(self):
+        """
+        Open every serial port, read the sensor names and start the acquisition and decoding.
+        """
+        self._stop_requested.clear()
+        self._executor = ProcessPoolExecutor(self.workers)
+        for _com_port_name in self.com_port_names:
+            _interface = IPRSerialInterface()
+            _interface.serial_setup(_com_port_name)
+            _interface.serial_open()
+            self.sensor_names.append(_interface.serial_ipr_get_sensor_name())
+            _interface.serial_ipr_start_binary_read()
+            self._interfaces.append(_interface)
+            self._pending_batches.append(deque())
+
+            # Dispatch right away, the other sensors are still being set up
+            _background_reader = _interface.serial_start_background_read()
+            _thread = threading.Thread(target=self._dispatch_loop,
+                                       args=(len(self._interfaces) - 1, _background_reader),
+                                       name="IPRDispatch-{}".format(self.sensor_names[-1]), daemon=True)
+            _thread.start()
+            self._dispatch_threads.append(_thread)
+
+    def stop(self):
+        """Stop the acquisition, decode the telegrams already received and close the serial ports."""
+        for _interface in self._interfaces:
+            _interface.serial_stop_background_read()
+        self._stop_requested.set()
+        for _thread in self._dispatch_threads:
+            _thread.join()
+        for _interface in self._interfaces:
+            _interface.serial_ipr_stop_binary_read()
+            _interface.serial_close()
+        self._executor.shutdown()
+
+    def read_results(self, timeout=None):
+        """
+        Iterate over the decoded batches of every sensor as they become available.
+
+        Batches of a given sensor are returned in reception order. The iteration ends once the
+        acquisition is stopped and every batch has been returned, or when no batch completes
+        within the timeout.
+
+        Args:
+            timeout (float): Maximum time to wait for a batch in seconds (default: wait forever)
+
+        Yields:
+            tuple: (sensor name, decoded columns as returned by ipr_batch_decoder.decode_batch)
+        """
+        _idle_deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            for _index, _batches in enumerate(self._pending_batches):
+                while _batches and _batches[0].done():
+                    yield self.sensor_names[_index], _batches.popleft().result()
+                    _idle_deadline = None if timeout is None else time.monotonic() + timeout
+
+            _heads = [_batches[0] for _batches in self._pending_batches if _batches]
+            if _heads:
+                if not wait(_heads, timeout, return_when=FIRST_COMPLETED).done:
+                    return
+            elif self._stop_requested.is_set() and not any(_t.is_alive() for _t in self._dispatch_threads):
+                if not any(self._pending_batches):
+                    return
+            elif _idle_deadline is not None and time.monotonic() >= _idle_deadline:
+                return
+            else:
+                time.sleep(0.01)  # Waiting for the first batch to be submitted
+
+    def _dispatch_loop(self, index, background_reader):
+        """Dispatch thread: group the telegrams of one sensor in batches and submit them for decoding."""
+        _batch = list()
+        _deadline = time.monotonic() + self.batch_interval
+        while True:
+            _telegram = background_reader.get_telegram(max(0.0, _deadline - time.monotonic()))
+            if _telegram is not None:
+                _batch.append(_telegram)
+
+            _stopping = self._stop_requested.is_set() and background_reader.telegram_queue.empty()
+            if len(_batch) >= self.batch_size or time.monotonic() >= _deadline or _stopping:
+                if _batch:
+                    _batch.append(b'')  # Terminate the last telegram with a separator
+                    self._pending_batches[index].append(
+                        self._executor.submit(decode_batch, b'\x08'.join(_batch), self.scaled))
+                    _batch = list()
+                _deadline = time.monotonic() + self.batch_interval
+            if _stopping:
+                return
@@ -0,0 +1,186 @@
+import numpy as np
+
+# Columns of decode_batch and IPRTimeAxis that are not measurements
+HEADER_COLUMNS = ("timestamp", "sequence", "tick", "time")
+STATISTICS = ("min", "max", "mean", "rms")
+
+
+class IPRWindowAggregator:
+    """
+    Streaming min, max, mean and RMS of every channel of one packet type over fixed windows.
+
+    Windows hold a fixed number of packets, or cover a fixed duration of the time column (for
+    example the "tick" column added by IPRTimeAxis). Each block is aggregated with vectorized
+    operations, and the window spanning two blocks is completed with the parallel form of
+    Welford's algorithm (count, mean and sum of squared deviations), which stays accurate on
+    long windows. Only the current window is kept between blocks: memory does not depend on the
+    length of the capture.
+    """
+
+    def __init__(self, window_rows=None, window_time=None, time_column="tick", channels=None):
+        """
+        Initialize the aggregator.
+
+        Args:
+            window_rows (int): Number of packets per window
+            window_time (float): Duration of a window in units of the time column, used if
+                window_rows is not given. Windows are aligned on multiples of this duration
+            time_column (str): Column holding an increasing time (default: "tick", see IPRTimeAxis)
+            channels (list): Columns to aggregate (default: every measurement column)
+
+        Raises:
+            ValueError: If neither or both of window_rows and window_time are given
+        """
+        if (window_rows is None) == (window_time is None):
+            raise ValueError("Give either window_rows or window_time")
+        self.window_rows = window_rows
+        self.window_time = window_time
+        self.time_column = time_column
+        self.channels = list(channels) if channels is not None else None
+        self._rows_seen = 0
+        self._current = None  # Window not complete yet: index, start, count, per channel statistics
+        self._completed = list()  # Blocks of completed windows not returned by get_windows yet
+
+    def update(self, columns):
+        """
+        Add a block of packets of the packet type.
+
+        Args:
+            columns (dict): Column name -> numpy.ndarray of one packet type, e.g.
+                decode_batch(...)["STRAIN"]
+        """
+        _rows = len(columns["timestamp"])
+        if _rows == 0:
+            return
+        if self.channels is None:
+            self.channels = [_name for _name in columns if _name not in HEADER_COLUMNS]
+        _time = np.asarray(columns[self.time_column])
+        if self.window_rows is not None:
+            _index = (self._rows_seen + np.arange(_rows)) // self.window_rows
+        else:
+            _index = np.floor_divide(_time, self.window_time).astype(np.int64)
+        self._rows_seen += _rows
+
+        # Consecutive packets of the same window form a group
+        _starts = np.concatenate(([0], np.flatnonzero(np.diff(_index)) + 1))
+        _counts = np.diff(np.append(_starts, _rows))
+        _groups = {"index": _index[_starts], "start": _time[_starts], "count": _counts}
+        for _channel in self.channels:
+            _values = np.asarray(columns[_channel], dtype=np.float64)
+            _mean = np.add.reduceat(_values, _starts) / _counts
+            _deviation = _values - np.repeat(_mean, _counts)
+            _groups[_channel] = {"min": np.minimum.reduceat(_values, _starts),
+                                 "max": np.maximum.reduceat(_values, _starts),
+                                 "mean": _mean, "m2": np.add.reduceat(_deviation * _deviation, _starts)}
+
+        # The first group completes the current window if it belongs to it
+        _first = 0
+        if self._current is not None and self._current["index"] == _groups["index"][0]:
+            self._merge_first_group(_groups)
+            _first = 1
+        if len(_starts) > _first:
+            if self._current is not None:
+                self._completed.append(self._to_windows(self._current, None))
+            self._completed.append(self._to_windows(_groups, slice(_first, len(_starts) - 1)))
+            self._current = self._take_group(_groups, len(_starts) - 1)
+
+    def get_windows(self, flush=False):
+        """
+        Get the windows completed since the last call.
+
+        Args:
+            flush (bool): Also return the current window, although it is not complete (end of
+                the capture)
+
+        Returns:
+            dict: "start" (time of the first packet), "count" (packets in the window) and, for
+                  every channel, "<channel>_min", "<channel>_max", "<channel>_mean" and
+                  "<channel>_rms" as numpy.ndarray of one value per window
+        """
+        _blocks = self._completed
+        if flush and self._current is not None:
+            _blocks.append(self._to_windows(self._current, None))
+            self._current = None
+        self._completed = list()
+        _names = ["start", "count"] + ["{}_{}".format(_channel, _statistic)
+                                       for _channel in self.channels or () for _statistic in STATISTICS]
+        if not _blocks:
+            return {_name: np.empty(0) for _name in _names}
+        return {_name: np.concatenate([_block[_name] for _block in _blocks]) for _name in _names}
+
+    def _merge_first_group(self, groups):
+        """Add the first group of a block to the current window (Chan et al. parallel update)."""
+        _current = self._current
+        _count_a, _count_b = _current["count"], groups["count"][0]
+        _count = _count_a + _count_b
+        for _channel in self.channels:
+            _a, _b = _current[_channel], groups[_channel]
+            _delta = _b["mean"][0] - _a["mean"]
+            _a["m2"] += _b["m2"][0] + _delta * _delta * _count_a * _count_b / _count
+            _a["mean"] += _delta * _count_b / _count
+            _a["min"] = min(_a["min"], _b["min"][0])
+            _a["max"] = max(_a["max"], _b["max"][0])
+        _current["count"] = _count
+
+    def _take_group(self, groups, position):
+        """Copy one group as the current window."""
+        _window = {"index": groups["index"][position], "start": groups["start"][position],
+                   "count": groups["count"][position]}
+        for _channel in self.channels:
+            _window[_channel] = {_name: _values[position] for _name, _values in groups[_channel].items()}
+        return _window
+
+    def _to_windows(self, groups, selection):
+        """Convert groups (or the current window if selection is None) to output columns."""
+        _select = (lambda _values: np.atleast_1d(_values)) if selection is None else (lambda _values: _values[selection])
+        _windows = {"start": _select(groups["start"]), "count": _select(groups["count"])}
+        for _channel in self.channels:
+            _statistics = groups[_channel]
+            _mean = _select(_statistics["mean"])
+            _windows[_channel + "_min"] = _select(_statistics["min"])
+            _windows[_channel + "_max"] = _select(_statistics["max"])
+            _windows[_channel + "_mean"] = _mean
+            _windows[_channel + "_rms"] = np.sqrt(_mean * _mean + _select(_statistics["m2"]) / _windows["count"])
+        return _windows
+
+
+def lttb_downsample(x, y, threshold):
+    """
+    Reduce a series to a number of points that look the same once plotted (Largest Triangle
+    Three Buckets, S. Steinarsson 2013).
+
+    The first and last points are kept. The other points are split into threshold - 2 buckets
+    and, in each bucket, the point forming the largest triangle with the point kept in the
+    previous bucket and the mean of the next bucket is kept. Peaks are therefore preserved,
+    unlike with a plain decimation.
+
+    Args:
+        x (array-like): Increasing x values (time)
+        y (array-like): y values
+        threshold (int): Number of points to keep
+
+    Returns:
+        tuple: (x, y) numpy.ndarray of the points kept, the input if it is not longer than threshold
+    """
+    _x = np.asarray(x, dtype=np.float64)
+    _y = np.asarray(y, dtype=np.float64)
+    _length = len(_x)
+    if threshold >= _length or threshold < 3:
+        return _x, _y
+
+    # Bucket i covers the points [_edges[i], _edges[i + 1]) between the first and last points
+    _edges = (np.arange(threshold - 1) * ((_length - 2) / (threshold - 2))).astype(np.int64) + 1
+    _edges[-1] = _length - 1
+    _next_x = np.append(np.add.reduceat(_x[1:-1], _edges[:-1] - 1) / np.diff(_edges), _x[-1])
+    _next_y = np.append(np.add.reduceat(_y[1:-1], _edges[:-1] - 1) / np.diff(_edges), _y[-1])
+
+    _kept = np.empty(threshold, dtype=np.int64)
+    _kept[0], _kept[-1] = 0, _length - 1
+    _previous = 0
+    for _bucket in range(threshold - 2):
+        _start, _end = _edges[_bucket], _edges[_bucket + 1]
+        _area = np.abs((_x[_previous] - _next_x[_bucket + 1]) * (_y[_start:_end] - _y[_previous])
+                       - (_x[_previous] - _x[_start:_end]) * (_next_y[_bucket + 1] - _y[_previous]))
+        _previous = _start + int(np.argmax(_area))
+        _kept[_bucket + 1] = _previous
+    return _x[_kept], _y[_kept]
@@ -0,0 +1,171 @@
+import os
+import re
+
+# pyarrow is an optional dependency (pip install pyipr_sensor_lib[arrow]), imported on first use
+_pyarrow = None
+_parquet = None
+
+
+def _import_pyarrow():
+    """Import pyarrow and pyarrow.parquet, with an explicit message if they are not installed."""
+    global _pyarrow, _parquet
+    if _pyarrow is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("The Arrow export requires pyarrow: pip install pyipr_sensor_lib[arrow]") from e
+        _pyarrow, _parquet = pyarrow, pyarrow.parquet
+    return _pyarrow, _parquet
+
+
+def to_record_batches(columns):
+    """
+    Convert decoded data to Arrow record batches, one per packet type.
+
+    The numpy columns are wrapped without copy: no Python object is created per value.
+
+    Args:
+        columns (dict): Packet type name mapped to a dict of column name -> numpy.ndarray,
+            as returned by ipr_batch_decoder.decode_batch
+
+    Returns:
+        dict: Packet type name mapped to a pyarrow.RecordBatch (packet types without rows are
+              left out)
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    _pa, _ = _import_pyarrow()
+    _batches = dict()
+    for _packet_type, _columns in columns.items():
+        if not len(_columns["timestamp"]):
+            continue
+        _batches[_packet_type] = _pa.RecordBatch.from_arrays(
+            [_pa.array(_values) for _values in _columns.values()], names=list(_columns))
+    return _batches
+
+
+def _describe_schema(schema):
+    """List the column names and types of an Arrow schema."""
+    return ["{}: {}".format(_field.name, _field.type) for _field in schema]
+
+
+_PART_FILE_NAME = re.compile(r"part-(\d+)\.parquet$")
+
+
+def _list_part_files(directory):
+    """(number, path) of the part files of a packet type directory, by increasing number."""
+    if not os.path.isdir(directory):
+        return list()
+    _parts = list()
+    for _name in os.listdir(directory):
+        _match = _PART_FILE_NAME.match(_name)
+        if _match:
+            _parts.append((int(_match.group(1)), os.path.join(directory, _name)))
+    return sorted(_parts)
+
+
+class IPRParquetWriter:
+    """
+    Streaming writer of decoded sensor data to a Parquet dataset partitioned by packet type.
+
+    Batches returned by ipr_batch_decoder.decode_batch are written as they come, without keeping
+    the capture in memory. Each packet type is written in its own directory
+    (packet_type=STRAIN/, ...) with its own columns, in files of at most max_rows_per_file rows.
+    pandas, DuckDB, Spark and pyarrow.dataset read the directory of a packet type as one table.
+
+    Writing to an existing dataset adds files numbered after the existing ones, never overwriting
+    them, and the batches must keep the columns of the existing files.
+    """
+
+    DEFAULT_MAX_ROWS_PER_FILE = 10 * 1000 * 1000
+    DEFAULT_COMPRESSION = "zstd"
+
+    def __init__(self, filepath, dataset_name, max_rows_per_file=DEFAULT_MAX_ROWS_PER_FILE,
+                 compression=DEFAULT_COMPRESSION):
+        """
+        Initialize the writer, the dataset directory is created if it does not exist.
+
+        Args:
+            filepath (str): Directory path for saving the dataset
+            dataset_name (str): Name of the dataset directory
+            max_rows_per_file (int): Number of rows after which a new file is started
+            compression (str): Parquet compression codec ("zstd", "snappy", "gzip", "none", ...)
+
+        Raises:
+            ImportError: If pyarrow is not installed
+        """
+        _import_pyarrow()
+        self.directory = os.path.join(filepath + dataset_name, "")
+        self.max_rows_per_file = max_rows_per_file
+        self.compression = compression
+        self.rows_written = dict()  # Packet type -> total number of rows written
+        self._writers = dict()  # Packet type -> (pyarrow.parquet.ParquetWriter, rows in the file)
+        self._file_numbers = dict()  # Packet type -> number of the next file
+        self._schemas = dict()  # Packet type -> schema of its files
+        os.makedirs(self.directory, exist_ok=True)
+
+    def write_batch(self, columns):
+        """
+        Add decoded data to the dataset.
+
+        Args:
+            columns (dict): Packet type name mapped to a dict of column name -> numpy.ndarray,
+                as returned by ipr_batch_decoder.decode_batch. The columns of a packet type must
+                keep the same names and types from one batch to the next
+
+        Raises:
+            ValueError: If the columns of a packet type differ from its previous batches or from
+                the files already in the dataset
+        """
+        for _packet_type, _batch in to_record_batches(columns).items():
+            _start = 0
+            while _start < _batch.num_rows:
+                _writer, _rows = self._get_writer(_packet_type, _batch.schema)
+                _size = min(_batch.num_rows - _start, self.max_rows_per_file - _rows)
+                _writer.write_batch(_batch.slice(_start, _size))
+                self._writers[_packet_type] = (_writer, _rows + _size)
+                self.rows_written[_packet_type] = self.rows_written.get(_packet_type, 0) + _size
+                _start += _size
+
+    def close(self):
+        """Finish the open files. Files are only readable once closed."""
+        for _writer, _ in self._writers.values():
+            _writer.close()
+        self._writers.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_writer(self, packet_type, schema):
+        """Get the open file of a packet type, starting a new one if the current one is full."""
+        _, _pq = _import_pyarrow()
+        _directory = os.path.join(self.directory, "packet_type={}".format(packet_type))
+        if packet_type not in self._file_numbers:
+            # Continue after the files of a previous writer instead of overwriting them
+            _parts = _list_part_files(_directory)
+            self._file_numbers[packet_type] = _parts[-1][0] + 1 if _parts else 0
+            if _parts:
+                self._schemas[packet_type] = _pq.read_schema(_parts[-1][1])
+        _schema = self._schemas.setdefault(packet_type, schema)
+        if not _schema.equals(schema):
+            raise ValueError("The columns of {} changed: {} instead of {}".format(
+                packet_type, _describe_schema(schema), _describe_schema(_schema)))
+
+        _writer, _rows = self._writers.get(packet_type, (None, 0))
+        if _writer is not None and _rows < self.max_rows_per_file:
+            return _writer, _rows
+        if _writer is not None:
+            _writer.close()
+
+        os.makedirs(_directory, exist_ok=True)
+        _number = self._file_numbers[packet_type]
+        self._file_numbers[packet_type] = _number + 1
+        _writer = _pq.ParquetWriter(os.path.join(_directory, "part-{:05d}.parquet".format(_number)), schema,
+                                    compression=self.compression)
+        self._writers[packet_type] = (_writer, 0)
+        return _writer, 0
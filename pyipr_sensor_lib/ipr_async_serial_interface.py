@@ -0,0 +1,308 @@
+import asyncio
+from collections import deque
+from time import perf_counter
+
+import serial
+
+from pyipr_sensor_lib.ipr_frame_splitter import IPRFrameSplitter
+from pyipr_sensor_lib.ipr_metrics import IPRTimingHistogram
+from pyipr_sensor_lib.ipr_serial_interface import (STREAM_STOP_PROBE_COMMAND, find_stream_end, format_command,
+                                                    format_text_reply, is_binary_data, parse_command_reply)
+
+
+class AsyncIPRSerialInterface:
+    """
+    asyncio version of IPRSerialInterface.
+
+    The serial port is used in non-blocking mode and read by the event loop when data is
+    available, so a single event loop can serve many sensors along with other I/O without
+    a thread per serial port. The command set mirrors IPRSerialInterface with coroutines.
+    """
+
+    # Maximum number of bytes read from the serial port in a single call
+    READ_BLOCK_SIZE = 4096
+    # Maximum time to wait for the reply of the probe command sent after a stop command
+    STREAM_STOP_TIMEOUT = 1.0
+    # Silent period marking the end of the binary data stream if the probe is not answered
+    STREAM_STOP_DRAIN_TIME = 0.25
+    # Read timeout used when the serial port cannot be watched by the event loop (e.g. Windows)
+    POLL_TIMEOUT = 0.05
+
+    def __init__(self, metrics=None):
+        """
+        Initialize the asyncio IPR Serial Interface.
+        Sets up the serial port object and initial state variables.
+
+        Args:
+            metrics (IPRMetrics): Metrics receiving the durations of the switches from binary
+                streaming to command mode (default: none)
+        """
+        self._serial_port_obj = serial.Serial()
+        # Flag to track if sensor is in binary reading mode, None until known
+        self.is_binary_reading_running = None
+        # Durations of the switches from binary streaming to command mode, in seconds
+        self.stream_stop_timing = IPRTimingHistogram()
+        self.metrics = metrics
+
+        self._receive_buffer = bytearray()
+        self._data_received = asyncio.Event()
+        self._frame_splitter = IPRFrameSplitter()
+        self._telegram_queue = deque()
+        self._poll_task = None
+        self._watched_fd = None
+
+    def serial_setup(self, com_port_name):
+        """
+        Configure the serial port settings.
+
+        Args:
+            com_port_name (str): Name of the COM port to use (e.g., 'COM1' or a pseudo-terminal path)
+        """
+        self._serial_port_obj.port = com_port_name
+        self._serial_port_obj.baudrate = 921600  # High baudrate for fast data transfer
+        self._serial_port_obj.timeout = 0  # Non-blocking, the event loop waits for the data
+
+    async def serial_open(self):
+        """
+        Open the serial port connection and start watching it from the running event loop.
+        Only opens the port if it's not already open.
+        """
+        if self._serial_port_obj.is_open:
+            return
+        self._serial_port_obj.open()
+
+        _loop = asyncio.get_running_loop()
+        try:
+            self._watched_fd = self._serial_port_obj.fileno()
+            _loop.add_reader(self._watched_fd, self._on_data_ready)
+        except (AttributeError, NotImplementedError):
+            # No file descriptor or selector support: read from a worker thread instead
+            self._watched_fd = None
+            self._serial_port_obj.timeout = self.POLL_TIMEOUT
+            self._poll_task = _loop.create_task(self._poll_loop())
+
+    async def serial_close(self):
+        """Stop watching the serial port and close the connection."""
+        if self._watched_fd is not None:
+            asyncio.get_running_loop().remove_reader(self._watched_fd)
+            self._watched_fd = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        self._serial_port_obj.close()
+
+    def _on_data_ready(self):
+        """Event loop callback: move the available bytes into the receive buffer."""
+        _data = self._serial_port_obj.read(min(max(1, self._serial_port_obj.in_waiting), self.READ_BLOCK_SIZE))
+        if _data:
+            self._receive_buffer += _data
+            self._data_received.set()
+
+    async def _poll_loop(self):
+        """Fallback reader for serial ports that cannot be watched by the event loop."""
+        _loop = asyncio.get_running_loop()
+        while True:
+            _size = min(max(1, self._serial_port_obj.in_waiting), self.READ_BLOCK_SIZE)
+            _data = await _loop.run_in_executor(None, self._serial_port_obj.read, _size)
+            if _data:
+                self._receive_buffer += _data
+                self._data_received.set()
+
+    async def serial_read_available(self, timeout=None):
+        """
+        Wait for data and return all the bytes received so far.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds (default: wait forever)
+
+        Returns:
+            bytes: Bytes received, empty if the timeout was reached
+        """
+        if not self._receive_buffer:
+            self._data_received.clear()
+            try:
+                await asyncio.wait_for(self._data_received.wait(), timeout)
+            except asyncio.TimeoutError:
+                return b''
+        _data = bytes(self._receive_buffer)
+        self._receive_buffer.clear()
+        return _data
+
+    async def serial_ipr_get_system_status(self):
+        """
+        Query the sensor's system status.
+
+        Returns:
+            str: System status information with trailing '>' removed
+        """
+        return parse_command_reply("$", await self._serial_ipr_send_command("$"))
+
+    async def serial_ipr_get_sensor_tare(self):
+        """
+        Retrieve the tare value stored in sensor's memory.
+
+        Returns:
+            str: Tare value information
+        """
+        return parse_command_reply("tare", await self._serial_ipr_send_command("tare"))
+
+    async def serial_ipr_get_sensor_material_type(self):
+        """
+        Query the sensor's configured material type.
+
+        Returns:
+            str: Material type information
+        """
+        return parse_command_reply("material", await self._serial_ipr_send_command("material"))
+
+    async def serial_ipr_get_sensor_gain(self):
+        """
+        Retrieve the gain/multiplier value from sensor's memory.
+
+        Returns:
+            str: Gain value information
+        """
+        return parse_command_reply("transfer", await self._serial_ipr_send_command("transfer"))
+
+    async def serial_ipr_get_sensor_strain_offset(self):
+        """
+        Retrieve the strain offset value from sensor's memory.
+
+        Returns:
+            str: Offset value information
+        """
+        return parse_command_reply("offset", await self._serial_ipr_send_command("offset"))
+
+    async def serial_ipr_get_sensor_name(self):
+        """
+        Retrieve the sensor name from device memory.
+
+        Returns:
+            str: Sensor name
+        """
+        return parse_command_reply("name", await self._serial_ipr_send_command("name"))
+
+    async def serial_ipr_set_sensor_name(self, sensor_name):
+        """
+        Set a new name for the sensor.
+
+        Args:
+            sensor_name (str): New name to set for the sensor
+        """
+        await self._serial_ipr_send_command("name {}".format(sensor_name))
+
+    async def serial_ipr_start_binary_read(self):
+        """
+        Start binary data stream from sensor to PC.
+        Sets the binary reading flag to True.
+        """
+        self._serial_port_obj.write(format_command("<scanmb-start>"))
+        self.is_binary_reading_running = True
+        self.serial_reset_telegram_buffer()
+
+    async def serial_ipr_stop_binary_read(self):
+        """
+        Stop binary data stream from sensor.
+        Sets the binary reading flag to False.
+        """
+        self._serial_port_obj.write(format_command("<scanmb-stop>"))
+        self.is_binary_reading_running = False
+
+    async def serial_ipr_check_if_data_reading(self):
+        """
+        Check if sensor is in binary reading mode and stop if necessary.
+        Clears any remaining bytes in the buffer after stopping.
+
+        Like IPRSerialInterface.serial_ipr_check_if_data_reading, the binary bytes are discarded
+        up to the reply of a probe command sent after the stop command, and the duration of every
+        switch is recorded in stream_stop_timing (and in the metrics, if any).
+
+        Returns:
+            bool: True if binary data was received before the stream stopped
+        """
+        if self.is_binary_reading_running is False:
+            return False
+
+        _start_time = perf_counter()
+        await self.serial_ipr_stop_binary_read()
+        self._serial_port_obj.write(format_command(STREAM_STOP_PROBE_COMMAND))
+        _loop = asyncio.get_running_loop()
+        _deadline = _loop.time() + self.STREAM_STOP_TIMEOUT
+        _received = bytearray()
+        _stream_end = None
+        while _stream_end is None and _loop.time() < _deadline:
+            _received += await self.serial_read_available(_deadline - _loop.time())
+            _stream_end = find_stream_end(_received)
+
+        if _stream_end is not None:
+            # Keep what follows the prompt for the next read
+            self._receive_buffer[:0] = _received[_stream_end[1]:]
+            _was_streaming = is_binary_data(_received[:_stream_end[0]])
+        else:
+            while await self.serial_read_available(self.STREAM_STOP_DRAIN_TIME):
+                pass
+            _was_streaming = is_binary_data(_received)
+        self.serial_reset_telegram_buffer()
+
+        _duration = perf_counter() - _start_time
+        self.stream_stop_timing.record(_duration)
+        if self.metrics is not None:
+            self.metrics.record_time(self.metrics.STAGE_STREAM_STOP, _duration)
+        return _was_streaming
+
+    async def serial_ipr_read_text_from_sensor(self):
+        """
+        Read text response from sensor until end character ('>') is found.
+        Filters out unwanted control characters and formats the response.
+
+        Returns:
+            list: List of characters forming the complete response
+        """
+        _reply = bytearray()
+        while True:
+            _reply += await self.serial_read_available()
+            _end = _reply.find(b'>')
+            if _end != -1:
+                # Keep what follows the end character for the next read
+                self._receive_buffer[:0] = _reply[_end + 1:]
+                return format_text_reply(bytes(_reply[:_end]))
+
+    async def serial_ipr_read_telegram_binary(self):
+        """
+        Read a complete telegram from the serial port in binary mode.
+
+        Returns:
+            bytes: Complete telegram, without the SOF character (0x08)
+        """
+        while not self._telegram_queue:
+            self._telegram_queue.extend(self._frame_splitter.feed(await self.serial_read_available()))
+        return self._telegram_queue.popleft()
+
+    async def telegrams(self):
+        """
+        Iterate over the telegrams of the binary data stream.
+
+        Usage:
+            async for telegram in interface.telegrams():
+                decoder.analyse_packet(telegram)
+
+        Yields:
+            bytes: Complete telegram, without the SOF character (0x08)
+        """
+        while True:
+            yield await self.serial_ipr_read_telegram_binary()
+
+    def serial_reset_telegram_buffer(self):
+        """Discard the partially received telegram and the telegrams not read yet."""
+        self._frame_splitter.reset()
+        self._telegram_queue.clear()
+
+    async def _serial_ipr_send_command(self, command):
+        """Stop the binary stream if needed, send a command and read the text reply."""
+        await self.serial_ipr_check_if_data_reading()
+        self._serial_port_obj.write(format_command(command))
+        return await self.serial_ipr_read_text_from_sensor()
@@ -0,0 +1,265 @@
+from time import perf_counter
+
+import numpy as np
+
+from pyipr_sensor_lib.ipr_packet_layout import (HEADER_BYTES, PACKET_LAYOUTS, STRAIN_LAYOUT, ENVIRONMENT_LAYOUT,
+                                                ACCELERATION_LAYOUT)
+from pyipr_sensor_lib.ipr_parser import IPRParser
+
+# Byte used by the sensor to separate telegrams in the binary stream
+TELEGRAM_SEPARATOR = IPRParser.TELEGRAM_SEPARATOR
+# Escape byte: 0x07 0x55 encodes 0x08 and 0x07 0xAA encodes 0x07
+TELEGRAM_ESCAPE = IPRParser.TELEGRAM_ESCAPE
+ESCAPED_SEPARATOR = IPRParser.ESCAPED_SEPARATOR
+ESCAPED_ESCAPE = IPRParser.ESCAPED_ESCAPE
+
+# Minimum unescaped telegram length in bytes, of any packet type and of each of them
+MIN_TELEGRAM_BYTES = IPRParser.MIN_TELEGRAM_BYTES
+MIN_PACKET_BYTES_STRAIN = IPRParser.MIN_PACKET_BYTES_STRAIN
+MIN_PACKET_BYTES_ENVIRONMENT = IPRParser.MIN_PACKET_BYTES_ENVIRONMENT
+MIN_PACKET_BYTES_ACCELERATION = IPRParser.MIN_PACKET_BYTES_ACCELERATION
+
+# Number of unescaped bytes read by each field extractor
+DECODE_WIDTH_STRAIN = STRAIN_LAYOUT.decode_width
+DECODE_WIDTH_ENVIRONMENT = ENVIRONMENT_LAYOUT.decode_width
+DECODE_WIDTH_ACCELERATION = ACCELERATION_LAYOUT.decode_width
+
+# Column names of the arrays returned by decode_batch()
+HEADER_COLUMNS = ("timestamp", "sequence")
+STRAIN_COLUMNS = STRAIN_LAYOUT.columns
+ENVIRONMENT_COLUMNS = ENVIRONMENT_LAYOUT.columns
+ACCELERATION_COLUMNS = ACCELERATION_LAYOUT.columns
+
+# IDs of the packet types decoded, the other IDs are counted as unknown packet types
+_KNOWN_PACKET_IDS = [_layout.packet_id for _layout in PACKET_LAYOUTS]
+
+
+def batch_scale(raw_values, scale_table):
+    """
+    Convert raw sensor values to real units with a lookup table built by IPRParser.build_scale_table.
+
+    Args:
+        raw_values (numpy.ndarray): Raw sensor values
+        scale_table (array): Lookup table of the channel
+
+    Returns:
+        numpy.ndarray: Scaled values as float32
+    """
+    return np.frombuffer(scale_table, dtype=np.float32).take(raw_values)
+
+
+def batch_split_telegrams(data):
+    """
+    Locate the telegrams of a raw capture.
+
+    Telegrams are terminated by the 0x08 separator. Bytes following the last separator
+    belong to an incomplete telegram and are ignored, like in IPRSensorDecoder.load_from_binary_file.
+
+    Args:
+        data (numpy.ndarray): Raw capture as uint8 array
+
+    Returns:
+        tuple: (starts, ends) index arrays, telegram i being data[starts[i]:ends[i]]
+    """
+    ends = np.flatnonzero(data == TELEGRAM_SEPARATOR)
+    starts = np.empty_like(ends)
+    if len(ends):
+        starts[0] = 0
+        starts[1:] = ends[:-1] + 1
+    return starts, ends
+
+
+def batch_unescape(data, starts, ends):
+    """
+    Remove the 0x07 escape sequences from every telegram of a raw capture at once.
+
+    An escape byte always consumes the byte following it: 0x55 becomes 0x08, 0xAA becomes 0x07
+    and any other byte is dropped. Escape sequences never cross a separator.
+
+    Args:
+        data (numpy.ndarray): Raw capture as uint8 array
+        starts (numpy.ndarray): Telegram start positions returned by batch_split_telegrams
+        ends (numpy.ndarray): Separator positions returned by batch_split_telegrams
+
+    Returns:
+        tuple: (clean, clean_starts, clean_lengths) where clean holds the concatenated unescaped
+               telegrams without separators
+    """
+    _length = len(data)
+    _keep = np.ones(_length, dtype=bool)
+    _keep[ends] = False
+    _values = data
+
+    _escape_pos = np.flatnonzero(data == TELEGRAM_ESCAPE)
+    _removed = np.empty(0, dtype=np.int64)
+    if len(_escape_pos):
+        # Within a run of consecutive escape bytes, only every other byte starts a sequence
+        _index = np.arange(len(_escape_pos))
+        _new_run = np.ones(len(_escape_pos), dtype=bool)
+        _new_run[1:] = np.diff(_escape_pos) != 1
+        _run_start = np.maximum.accumulate(np.where(_new_run, _index, 0))
+        _leaders = _escape_pos[((_index - _run_start) & 1) == 0]
+        _keep[_leaders] = False
+
+        _followers = _leaders + 1
+        _followers = _followers[_followers < _length]
+        _follower_values = data[_followers]
+        _values = data.copy()
+        _values[_followers[_follower_values == ESCAPED_SEPARATOR]] = TELEGRAM_SEPARATOR
+        _values[_followers[_follower_values == ESCAPED_ESCAPE]] = TELEGRAM_ESCAPE
+        _dropped = _followers[(_follower_values != ESCAPED_SEPARATOR) &
+                              (_follower_values != ESCAPED_ESCAPE) &
+                              (_follower_values != TELEGRAM_SEPARATOR)]
+        _keep[_dropped] = False
+        _removed = np.concatenate((_leaders, _dropped))
+
+    _raw_lengths = ends - starts
+    _removed = _removed[_removed < (ends[-1] if len(ends) else 0)]
+    _clean_lengths = _raw_lengths - np.bincount(np.searchsorted(ends, _removed), minlength=len(ends))
+    _clean_starts = np.zeros(len(ends), dtype=np.int64)
+    np.cumsum(_clean_lengths[:-1], out=_clean_starts[1:])
+
+    if len(ends):
+        _clean = _values[:ends[-1]][_keep[:ends[-1]]]
+    else:
+        _clean = np.empty(0, dtype=np.uint8)
+    return _clean, _clean_starts, _clean_lengths
+
+
+def _batch_gather(clean, clean_starts, width):
+    """Build a (telegrams x width) int32 matrix of the first unescaped bytes of each telegram."""
+    return clean[clean_starts[:, None] + np.arange(width)].astype(np.int32)
+
+
+def _batch_get_header(b):
+    """Vectorized counterpart of IPRParser.parser_get_sequence and parser_get_timestamp."""
+    _sequence = (b[:, 0] & 0x38).astype(np.uint8)
+    _timestamp = (((b[:, 4] & 0x01) << 26) +
+                  (b[:, 3] << 18) +
+                  (b[:, 2] << 10) +
+                  (b[:, 1] << 2) +
+                  ((b[:, 0] & 0xC0) >> 6)).astype(np.uint32)
+    return _timestamp, _sequence
+
+
+def decode_batch(raw_data, scaled=True, scale_tables=None, metrics=None, headers=None):
+    """
+    Decode a whole raw capture into columnar arrays, one set of columns per packet type.
+
+    The same validation rules as IPRSensorDecoder.analyse_packet are applied to the unescaped
+    telegrams (minimum length, ID CRC and per-type minimum length), but every step is computed with vectorized bit masks
+    and shifts over all telegrams at once instead of one telegram at a time. The measurements are
+    read with the extractors compiled from the layouts of ipr_packet_layout.PACKET_LAYOUTS.
+
+    Args:
+        raw_data (bytes/bytearray/memoryview/numpy.ndarray): Raw binary data as received from the sensor
+        scaled (bool): Whether to return scaled values (default True) or raw sensor values
+        scale_tables (dict): Lookup tables used to scale the raw values, as returned by
+            IPRParser.build_scale_tables (default: tables without calibration)
+        metrics (IPRMetrics): Metrics receiving the counters of the batch and the time spent in
+            the frame, unescape, decode and scale stages (default: none)
+        headers (dict): Dict receiving, for every packet type, the "timestamp", "sequence" and
+            "valid" (bool) columns of all the telegrams of this type in reception order, including
+            those too short for their type, as expected by IPRContinuityTracker.update_batch
+            (default: none)
+
+    Returns:
+        dict: Packet type name ("STRAIN", "ENVIRONMENT", "ACCELERATION") mapped to a dict of
+              column name -> numpy.ndarray. Every packet type holds the "timestamp" (uint32) and
+              "sequence" (uint8) columns followed by its measurement columns (float32 when scaled,
+              uint16 otherwise)
+    """
+    _time = perf_counter()
+    _data = np.frombuffer(raw_data, dtype=np.uint8) if not isinstance(raw_data, np.ndarray) else raw_data
+    _starts, _ends = batch_split_telegrams(_data)
+    _frame_time = perf_counter() - _time
+    _time = perf_counter()
+    _clean, _clean_starts, _clean_lengths = batch_unescape(_data, _starts, _ends)
+    _unescape_time = perf_counter() - _time
+
+    _time = perf_counter()
+    _byte0 = np.zeros(len(_ends), dtype=np.int32)
+    _not_empty = _clean_lengths > 0
+    _byte0[_not_empty] = _clean[_clean_starts[_not_empty]]
+
+    # Telegram validity: minimum length and ID CRC, computed on the unescaped telegram
+    _crc_computed = ((_byte0 >> 1) & 0x01) ^ (_byte0 & 0x01)
+    _is_long_enough = _clean_lengths >= MIN_TELEGRAM_BYTES
+    _is_crc_valid = ((_byte0 & 0x04) >> 2) == _crc_computed
+    _is_valid = _is_long_enough & _is_crc_valid
+    _packet_id = _byte0 & 0x03
+
+    if scale_tables is None:
+        scale_tables = IPRParser.get_default_scale_tables()
+
+    _result = dict()
+    _scale_time = 0.0
+    _short_packets = dict()
+    for _layout in PACKET_LAYOUTS:
+        _name = _layout.name
+        _is_type = _is_valid & (_packet_id == _layout.packet_id)
+        _is_selected = _is_type & (_clean_lengths >= _layout.telegram_length)
+        _selected = np.flatnonzero(_is_selected)
+        _short_packets[_name] = _is_type & ~_is_selected
+        if headers is not None:
+            _typed = np.flatnonzero(_is_type)
+            _timestamp, _sequence = _batch_get_header(_batch_gather(_clean, _clean_starts[_typed], HEADER_BYTES))
+            headers[_name] = {"timestamp": _timestamp, "sequence": _sequence, "valid": _is_selected[_typed]}
+        _bytes = _batch_gather(_clean, _clean_starts[_selected], _layout.decode_width)
+        _timestamp, _sequence = _batch_get_header(_bytes)
+        _values = _layout.extract_batch(_bytes)
+        _scale_start = perf_counter()
+        if scaled:
+            _values = tuple(batch_scale(_value, _table) for _value, _table in zip(_values, scale_tables[_name]))
+        else:
+            _values = tuple(_value.astype(np.uint16) for _value in _values)
+        _scale_time += perf_counter() - _scale_start
+
+        _result[_name] = {"timestamp": _timestamp, "sequence": _sequence}
+        _result[_name].update(zip(_layout.columns, _values))
+
+    if metrics is not None:
+        metrics.record_time(metrics.STAGE_FRAME, _frame_time)
+        metrics.record_time(metrics.STAGE_UNESCAPE, _unescape_time)
+        metrics.record_time(metrics.STAGE_DECODE, perf_counter() - _time - _scale_time)
+        metrics.record_time(metrics.STAGE_SCALE, _scale_time)
+        _is_unknown = _is_valid & ~np.isin(_packet_id, _KNOWN_PACKET_IDS)
+        _report_batch_metrics(metrics, _data, _starts, _ends, _result, ~_is_long_enough,
+                              _is_long_enough & ~_is_crc_valid, _is_unknown, _short_packets)
+    return _result
+
+
+def _report_batch_metrics(metrics, data, starts, ends, result, is_short, is_crc_failure, is_unknown, short_packets):
+    """Add the counters of a decoded batch to the metrics and sample its invalid telegrams."""
+    metrics.increment(metrics.TELEGRAMS_FRAMED, len(ends))
+    metrics.increment(metrics.TELEGRAMS_DECODED, sum(len(_columns["timestamp"]) for _columns in result.values()))
+    metrics.increment(metrics.ESCAPE_SEQUENCES, int(np.count_nonzero(data[:ends[-1] if len(ends) else 0]
+                                                                     == TELEGRAM_ESCAPE)))
+    _invalid = [(metrics.SHORT_TELEGRAMS, is_short), (metrics.CRC_FAILURES, is_crc_failure),
+                (metrics.UNKNOWN_PACKET_TYPES, is_unknown),
+                (metrics.SHORT_PACKETS_STRAIN, short_packets["STRAIN"]),
+                (metrics.SHORT_PACKETS_ENVIRONMENT, short_packets["ENVIRONMENT"]),
+                (metrics.SHORT_PACKETS_ACCELERATION, short_packets["ACCELERATION"])]
+    for _counter, _mask in _invalid:
+        _indexes = np.flatnonzero(_mask)
+        metrics.increment(_counter, len(_indexes))
+        for _index in _indexes[max(0, len(_indexes) - metrics.invalid_samples.maxlen):]:
+            metrics.add_invalid_telegram(data[starts[_index]:ends[_index]].tobytes(), _counter)
+
+
+def concatenate_batches(batches):
+    """
+    Concatenate decoded batches into a single set of columns, keeping their order.
+
+    Args:
+        batches (list): Results of decode_batch, in time order
+
+    Returns:
+        dict: Packet type name mapped to a dict of column name -> numpy.ndarray, like decode_batch
+    """
+    batches = list(batches)
+    if not batches:
+        return decode_batch(b'')
+    return {_name: {_column: np.concatenate([_batch[_name][_column] for _batch in batches])
+                    for _column in batches[0][_name]}
+            for _name in batches[0]}
@@ -0,0 +1,98 @@
+import re
+
+from pyipr_sensor_lib.ipr_parser import IPRParser
+
+# "X=12.5", "Y : -3" or chained "X=Y=Z=0"
+_AXIS_VALUE_PATTERN = re.compile(r'((?:[XYZ]\s*[=:]\s*)+)([-+]?\d+(?:\.\d+)?)', re.IGNORECASE)
+_NUMBER_PATTERN = re.compile(r'[-+]?\d+(?:\.\d+)?')
+
+
+class IPRCalibration:
+    """
+    Strain calibration of a sensor: tare, gain and offset of the X, Y and Z axes.
+
+    The calibration is folded into the lookup tables used to scale the raw values, so that
+    calibrated values cost the same as uncalibrated ones:
+        strain = (scaled strain - tare) * gain + offset
+
+    A gain of 0 is the sensor default and means that no gain is applied.
+    """
+
+    def __init__(self, tare=(0.0, 0.0, 0.0), gain=(0.0, 0.0, 0.0), strain_offset=(0.0, 0.0, 0.0)):
+        """
+        Initialize the calibration.
+
+        Args:
+            tare (tuple): Tare of strain X, Y and Z in microstrain
+            gain (tuple): Gain of strain X, Y and Z (0 for no gain)
+            strain_offset (tuple): Offset of strain X, Y and Z in microstrain
+        """
+        self.tare = tuple(tare)
+        self.gain = tuple(gain)
+        self.strain_offset = tuple(strain_offset)
+
+    @staticmethod
+    def parse_axis_values(text):
+        """
+        Extract the X, Y and Z values from a sensor reply.
+
+        Accepts labelled values ("X=1.5 Y=-2 Z=0", "X=Y=Z=0") or, as a fallback, the first three
+        numbers of the reply.
+
+        Args:
+            text (str): Reply from serial_ipr_get_sensor_tare, _gain or _strain_offset
+
+        Returns:
+            tuple: (X, Y, Z) values, 0 for the axes not found
+        """
+        _values = {"X": 0.0, "Y": 0.0, "Z": 0.0}
+        _matches = _AXIS_VALUE_PATTERN.findall(text)
+        if _matches:
+            for _axes, _value in _matches:
+                for _axis in re.findall(r'[XYZ]', _axes.upper()):
+                    _values[_axis] = float(_value)
+        else:
+            for _axis, _value in zip("XYZ", _NUMBER_PATTERN.findall(text)):
+                _values[_axis] = float(_value)
+        return _values["X"], _values["Y"], _values["Z"]
+
+    @classmethod
+    def from_sensor_replies(cls, tare_text, gain_text, strain_offset_text):
+        """
+        Create a calibration from the replies of the sensor.
+
+        Args:
+            tare_text (str): Reply of serial_ipr_get_sensor_tare
+            gain_text (str): Reply of serial_ipr_get_sensor_gain
+            strain_offset_text (str): Reply of serial_ipr_get_sensor_strain_offset
+
+        Returns:
+            IPRCalibration: Calibration of the sensor
+        """
+        return cls(cls.parse_axis_values(tare_text), cls.parse_axis_values(gain_text),
+                   cls.parse_axis_values(strain_offset_text))
+
+    @classmethod
+    def from_serial_interface(cls, serial_interface):
+        """
+        Read the calibration stored in the sensor memory.
+
+        Args:
+            serial_interface (IPRSerialInterface): Opened serial interface of the sensor
+
+        Returns:
+            IPRCalibration: Calibration of the sensor
+        """
+        return cls.from_sensor_replies(serial_interface.serial_ipr_get_sensor_tare(),
+                                       serial_interface.serial_ipr_get_sensor_gain(),
+                                       serial_interface.serial_ipr_get_sensor_strain_offset())
+
+    def build_scale_tables(self):
+        """
+        Build the lookup tables with the calibration folded in.
+
+        Returns:
+            dict: Lookup tables, as returned by IPRParser.build_scale_tables
+        """
+        return IPRParser.build_scale_tables(self.tare, tuple(_gain if _gain != 0 else 1.0 for _gain in self.gain),
+                                            self.strain_offset)
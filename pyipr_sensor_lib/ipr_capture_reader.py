@@ -0,0 +1,295 @@
+import json
+import mmap
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pyipr_sensor_lib.ipr_batch_decoder import concatenate_batches, decode_batch
+
+
+class IPRCaptureReader:
+    """
+    Streaming reader for binary capture files saved from IPR sensors.
+
+    The file is memory-mapped and the telegrams are located with a bytes search for the
+    '0x08' separator, so only the part of the file being processed is loaded in memory.
+    This allows captures much larger than the available memory to be processed.
+    """
+
+    # Default amount of data decoded at once by read_batches (4 MB)
+    DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+    def __init__(self, filepath, filename, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Initialize the capture reader.
+
+        Args:
+            filepath (str): Path to the directory containing the file
+            filename (str): Name of the binary file to process
+            chunk_size (int): Approximate number of bytes decoded at once by read_batches
+        """
+        self.filepath = filepath
+        self.filename = filename
+        self.chunk_size = chunk_size
+
+    def read_telegrams(self):
+        """
+        Iterate over the telegrams of the capture file.
+
+        Yields:
+            bytes: Telegram without the '0x08' separator. Data following the last separator
+                   is incomplete and is not returned
+        """
+        for _chunk in self.read_chunks():
+            yield from _chunk.split(b'\x08')[:-1]
+
+    def read_chunks(self):
+        """
+        Iterate over the capture file in blocks of complete telegrams.
+
+        Each block ends right after a '0x08' separator and is close to chunk_size bytes long,
+        unless a single telegram is longer than chunk_size.
+
+        Yields:
+            bytes: Block of complete telegrams, separators included
+        """
+        for _chunk, _ in self._read_chunks_from(0):
+            yield _chunk
+
+    def _read_chunks_from(self, start):
+        """Iterate over the blocks of complete telegrams following a byte offset, with their end offset."""
+        with open(self.filepath + self.filename, 'rb') as file:
+            if os.fstat(file.fileno()).st_size <= start:
+                return  # Nothing new, and empty files cannot be memory-mapped
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as _mapped_file:
+                _position = start
+                _size = len(_mapped_file)
+                while _position < _size:
+                    _separator = _mapped_file.rfind(b'\x08', _position, _position + self.chunk_size)
+                    if _separator == -1:
+                        _separator = _mapped_file.find(b'\x08', _position + self.chunk_size)
+                        if _separator == -1:
+                            break
+                    yield _mapped_file[_position:_separator + 1], _separator + 1
+                    _position = _separator + 1
+
+    def read_batches(self, scaled=True):
+        """
+        Iterate over the capture file and decode it one block at a time.
+
+        Args:
+            scaled (bool): Whether to return scaled values (default True)
+
+        Yields:
+            dict: Decoded columns of one block, as returned by ipr_batch_decoder.decode_batch
+        """
+        for _chunk in self.read_chunks():
+            yield decode_batch(_chunk, scaled)
+
+    def split_ranges(self):
+        """
+        Split the capture file into byte ranges of complete telegrams.
+
+        Every range ends right after a '0x08' separator. An 0x08 byte inside a telegram is always
+        sent escaped (0x07 0x55), so any 0x08 found in the file is a telegram boundary and the
+        ranges never cut a telegram or an escape sequence.
+
+        Returns:
+            list: (start, end) byte offsets of consecutive ranges of about chunk_size bytes
+        """
+        _ranges = list()
+        with open(self.filepath + self.filename, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return _ranges  # Empty files cannot be memory-mapped
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as _mapped_file:
+                _start = 0
+                _end_of_data = _mapped_file.rfind(b'\x08') + 1
+                while _start < _end_of_data:
+                    _end = _mapped_file.find(b'\x08', min(_start + self.chunk_size, _end_of_data) - 1) + 1
+                    _ranges.append((_start, _end))
+                    _start = _end
+        return _ranges
+
+    def read_range(self, start, end, scaled=True):
+        """
+        Decode one byte range of the capture file.
+
+        Args:
+            start (int): Offset of the first byte, at the beginning of a telegram
+            end (int): Offset following the last byte, right after a separator
+            scaled (bool): Whether to return scaled values (default True)
+
+        Returns:
+            dict: Decoded columns, as returned by ipr_batch_decoder.decode_batch
+        """
+        with open(self.filepath + self.filename, 'rb') as file:
+            file.seek(start)
+            return decode_batch(file.read(end - start), scaled)
+
+
+class IPRCaptureFollower(IPRCaptureReader):
+    """
+    Incremental reader of a capture file that is still being written (tail -f).
+
+    The follower remembers the offset following the last complete telegram it returned. Every
+    call to read_chunks, read_telegrams or read_batches only reads the data appended since, and
+    an incomplete telegram at the end of the file is read again once its separator is written.
+    The offset can be saved in a checkpoint file, so that a restarted analysis resumes where it
+    stopped instead of reading the whole capture again.
+
+    The offset moves past a block as soon as it is returned: save the checkpoint once the block
+    is processed.
+    """
+
+    FINGERPRINT_SIZE = 16  # Bytes preceding the offset stored in the checkpoint to recognize the file
+
+    def __init__(self, filepath, filename, chunk_size=IPRCaptureReader.DEFAULT_CHUNK_SIZE, offset=0):
+        """
+        Initialize the follower.
+
+        Args:
+            filepath (str): Path to the directory containing the file
+            filename (str): Name of the binary file to follow
+            chunk_size (int): Approximate number of bytes decoded at once by read_batches
+            offset (int): Offset to start from, right after a separator (default: beginning of the file)
+        """
+        super().__init__(filepath, filename, chunk_size)
+        self.offset = offset
+        self.restart_count = 0  # Number of times the file was truncated or replaced
+        self._stop_requested = threading.Event()
+
+    def read_chunks(self):
+        """
+        Iterate over the blocks of complete telegrams appended since the last call.
+
+        Yields:
+            bytes: Block of complete telegrams, separators included
+        """
+        if self._check_file() <= self.offset:
+            return
+        for _chunk, _end in self._read_chunks_from(self.offset):
+            self.offset = _end
+            yield _chunk
+
+    def follow(self, scaled=True, poll_interval=0.5, idle_timeout=None):
+        """
+        Decode the capture file as it grows, until stop is called.
+
+        Args:
+            scaled (bool): Whether to return scaled values (default True)
+            poll_interval (float): Time in seconds between two checks for new data
+            idle_timeout (float): Stop after this time in seconds without new data (default: never)
+
+        Yields:
+            dict: Decoded columns of the new data, as returned by ipr_batch_decoder.decode_batch
+        """
+        self._stop_requested.clear()
+        _last_data_time = time.monotonic()
+        while not self._stop_requested.is_set():
+            _offset = self.offset
+            for _batch in self.read_batches(scaled):
+                yield _batch
+                _last_data_time = time.monotonic()
+            if self.offset == _offset:
+                if idle_timeout is not None and time.monotonic() - _last_data_time >= idle_timeout:
+                    return
+                self._stop_requested.wait(poll_interval)
+
+    def stop(self):
+        """Make follow return, from another thread."""
+        self._stop_requested.set()
+
+    def save_checkpoint(self, filepath, filename):
+        """
+        Save the current offset, written atomically so that a crash never leaves a broken checkpoint.
+
+        Args:
+            filepath (str): Path to the directory of the checkpoint file
+            filename (str): Name of the checkpoint file
+        """
+        _checkpoint = {"filename": self.filename, "offset": self.offset, "fingerprint": self._read_fingerprint()}
+        with open(filepath + filename + ".tmp", 'w') as file:
+            json.dump(_checkpoint, file)
+        os.replace(filepath + filename + ".tmp", filepath + filename)
+
+    def load_checkpoint(self, filepath, filename):
+        """
+        Resume from a checkpoint saved by save_checkpoint.
+
+        The offset is only restored if the bytes preceding it are unchanged. Otherwise the capture
+        was replaced and is read again from the beginning.
+
+        Args:
+            filepath (str): Path to the directory of the checkpoint file
+            filename (str): Name of the checkpoint file
+
+        Returns:
+            bool: True if the offset was restored, False if the follower starts from the beginning
+                  (no checkpoint, or checkpoint of another file)
+        """
+        self.offset = 0
+        try:
+            with open(filepath + filename, 'r') as file:
+                _checkpoint = json.load(file)
+        except FileNotFoundError:
+            return False
+        if _checkpoint.get("filename") != self.filename:
+            return False
+        self.offset = _checkpoint["offset"]
+        if self._read_fingerprint() != _checkpoint.get("fingerprint"):
+            self.offset = 0
+            return False
+        return True
+
+    def _read_fingerprint(self):
+        """Hexadecimal bytes preceding the offset, None if the file is shorter than the offset."""
+        try:
+            with open(self.filepath + self.filename, 'rb') as file:
+                _start = max(0, self.offset - self.FINGERPRINT_SIZE)
+                file.seek(_start)
+                _data = file.read(self.offset - _start)
+        except FileNotFoundError:
+            return None
+        return _data.hex() if len(_data) == self.offset - _start else None
+
+    def _check_file(self):
+        """Get the file size (0 if not created yet), starting again from the beginning if it shrank."""
+        try:
+            _size = os.path.getsize(self.filepath + self.filename)
+        except FileNotFoundError:
+            return 0
+        if _size < self.offset:
+            self.offset = 0
+            self.restart_count += 1
+        return _size
+
+
+def _decode_file_range(filepath, filename, start, end, scaled):
+    """Decode one byte range of a capture file in a worker process."""
+    return IPRCaptureReader(filepath, filename).read_range(start, end, scaled)
+
+
+def decode_file_parallel(filepath, filename, workers=None, scaled=True,
+                         chunk_size=IPRCaptureReader.DEFAULT_CHUNK_SIZE):
+    """
+    Decode a capture file using several processes.
+
+    The file is split into byte ranges aligned on the telegram separators, the ranges are decoded
+    in a process pool and the results are concatenated in the original order.
+
+    Args:
+        filepath (str): Path to the directory containing the file
+        filename (str): Name of the binary file to process
+        workers (int): Number of processes (default: number of CPUs)
+        scaled (bool): Whether to return scaled values (default True)
+        chunk_size (int): Approximate size in bytes of the range decoded by a process at once
+
+    Returns:
+        dict: Decoded columns of the whole file, as returned by ipr_batch_decoder.decode_batch
+    """
+    _ranges = IPRCaptureReader(filepath, filename, chunk_size).split_ranges()
+    with ProcessPoolExecutor(workers) as _executor:
+        _futures = [_executor.submit(_decode_file_range, filepath, filename, _start, _end, scaled)
+                    for _start, _end in _ranges]
+        return concatenate_batches(_future.result() for _future in _futures)
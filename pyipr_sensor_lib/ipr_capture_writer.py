@@ -0,0 +1,128 @@
+import os
+import time
+
+
+class IPRCaptureWriter:
+    """
+    Writer saving the raw binary data stream of a sensor to capture files.
+
+    Unlike IPRSensorDecoder.save_binary_data, the file stays open and the data is buffered in
+    large blocks. Capture files can be rotated by size or by duration; a file is always closed
+    right after a '0x08' separator so that each file can be decoded on its own. The flush and
+    fsync policies define how much data can be lost on a power failure.
+    """
+
+    # fsync policies
+    FSYNC_NEVER = 0  # Leave the data in the OS cache
+    FSYNC_ON_ROTATE = 1  # Force the data to the disk when a file is closed
+    FSYNC_ON_FLUSH = 2  # Force the data to the disk at every flush
+
+    DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+    def __init__(self, filepath, filename, buffer_size=DEFAULT_BUFFER_SIZE, max_file_size=None,
+                 max_file_duration=None, flush_interval=None, fsync_policy=FSYNC_ON_ROTATE):
+        """
+        Initialize the capture writer and open the first file.
+
+        Args:
+            filepath (str): Directory path for saving the files
+            filename (str): Name of the capture file, data is appended if it exists. When rotation
+                is enabled, a sequence number is added before the extension (e.g. 'data.bin' ->
+                'data_0001.bin') and existing files are skipped
+            buffer_size (int): Size of the write buffer in bytes
+            max_file_size (int): Size in bytes after which a new file is started (default: no limit)
+            max_file_duration (float): Duration in seconds after which a new file is started
+                (default: no limit)
+            flush_interval (float): Maximum time in seconds data stays in the buffer
+                (default: only flushed when the buffer is full)
+            fsync_policy (int): FSYNC_NEVER, FSYNC_ON_ROTATE or FSYNC_ON_FLUSH
+        """
+        self.filepath = filepath
+        self.filename = filename
+        self.buffer_size = buffer_size
+        self.max_file_size = max_file_size
+        self.max_file_duration = max_file_duration
+        self.flush_interval = flush_interval
+        self.fsync_policy = fsync_policy
+
+        self._file = None
+        self._file_index = 0
+        self._file_size = 0
+        self._file_opened_time = 0
+        self._last_flush_time = 0
+        self.current_filename = None
+        self._open_next_file()
+
+    def write(self, raw_data):
+        """
+        Write binary sensor data.
+
+        Args:
+            raw_data (bytes/bytearray/memoryview): Binary sensor data to be written
+        """
+        if self._is_rotation_due():
+            # Finish the current file on a telegram boundary, or wait for one
+            _separator = bytes(raw_data).rfind(b'\x08')
+            if _separator != -1:
+                self._write_to_file(memoryview(raw_data)[:_separator + 1])
+                self.rotate()
+                raw_data = memoryview(raw_data)[_separator + 1:]
+        self._write_to_file(raw_data)
+
+        if self.flush_interval is not None and time.monotonic() - self._last_flush_time >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered data to the file, and to the disk if the fsync policy requires it."""
+        self._file.flush()
+        if self.fsync_policy == self.FSYNC_ON_FLUSH:
+            os.fsync(self._file.fileno())
+        self._last_flush_time = time.monotonic()
+
+    def rotate(self):
+        """Close the current file and start a new one."""
+        self._close_file()
+        self._open_next_file()
+
+    def close(self):
+        """Flush the buffered data and close the current file."""
+        if self._file is not None:
+            self._close_file()
+            self._file = None
+
+    def _is_rotation_due(self):
+        """Check if the size or duration limit of the current file is reached."""
+        if self.max_file_size is not None and self._file_size >= self.max_file_size:
+            return True
+        if self.max_file_duration is not None and time.monotonic() - self._file_opened_time >= self.max_file_duration:
+            return True
+        return False
+
+    def _write_to_file(self, data):
+        """Write data to the current file buffer."""
+        self._file.write(data)
+        self._file_size += len(data)
+
+    def _open_next_file(self):
+        """Open the next capture file in append mode."""
+        if self.max_file_size is None and self.max_file_duration is None:
+            self.current_filename = self.filename
+        else:
+            # Skip the files left by a previous capture
+            _name, _extension = os.path.splitext(self.filename)
+            while True:
+                self._file_index += 1
+                self.current_filename = "{}_{:04d}{}".format(_name, self._file_index, _extension)
+                if not os.path.exists(self.filepath + self.current_filename):
+                    break
+        self._file = open(self.filepath + self.current_filename, 'ab', buffering=self.buffer_size)
+        self._file_size = self._file.tell()
+        self._file_opened_time = time.monotonic()
+        self._last_flush_time = self._file_opened_time
+
+    def _close_file(self):
+        """Flush and close the current file, applying the fsync policy."""
+        self._file.flush()
+        if self.fsync_policy != self.FSYNC_NEVER:
+            os.fsync(self._file.fileno())
+        self._file.close()
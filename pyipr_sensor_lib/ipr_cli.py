@@ -0,0 +1,399 @@
+"""
+Command-line tool of the IPR library, installed as the 'pyipr' console script.
+
+    pyipr decode capture.bin --type ENVIRONMENT > environment.csv
+    pyipr convert captures/*.bin --format columnar --output-dir converted/ --workers 8
+    pyipr stats captures/*.bin --tick-rate 1e6 --json
+    pyipr record /dev/ttyUSB0 capture.bin --duration 3600
+
+Several capture files are processed in parallel by worker processes, and the results are written
+in the order of the files as soon as they are ready. Only the modules needed by the command are
+imported: pyserial is only loaded by 'record' and pyarrow by 'convert --format parquet'.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+
+from pyipr_sensor_lib import __version__
+from pyipr_sensor_lib.ipr_packet_layout import PACKET_LAYOUTS
+
+PACKET_TYPE_NAMES = tuple(_layout.name for _layout in PACKET_LAYOUTS)
+CONVERT_FORMATS = ("csv", "columnar", "parquet")
+COLUMNAR_EXTENSION = ".iprcol"
+SCALED_FORMAT = "%.7g"  # Text format of the scaled values, float32 hold about 7 significant digits
+
+# Amount of data decoded at once from a capture file (4 MB, IPRCaptureReader.DEFAULT_CHUNK_SIZE)
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+# Tasks submitted in advance per worker process, keeping the workers busy while results are written
+TASKS_PER_WORKER = 2
+
+
+def _split_path(path):
+    """Split a path into the directory (ending with a separator) and the file name used by the readers."""
+    return os.path.join(os.path.dirname(path), ""), os.path.basename(path)
+
+
+def _csv_text(value):
+    """Quote a text value for CSV if needed."""
+    if any(_character in value for _character in ',"\n\r'):
+        return '"{}"'.format(value.replace('"', '""'))
+    return value
+
+
+def _column_text(values):
+    """
+    Convert a column to text. Scaled values come from lookup tables and take few distinct values:
+    each distinct value is formatted once.
+    """
+    import numpy as np
+
+    if values.dtype.kind != "f":
+        return list(map(str, values.tolist()))
+    _unique, _inverse = np.unique(values, return_inverse=True)
+    _text = np.array([SCALED_FORMAT % _value for _value in _unique.tolist()], dtype=object)
+    return _text[_inverse.reshape(-1)].tolist()
+
+
+def format_csv(columns, prefix=None):
+    """
+    Format the decoded columns of one packet type as CSV rows.
+
+    Integer columns are written as integers, scaled values with 7 significant digits.
+
+    Args:
+        columns (dict): Column name -> numpy.ndarray, e.g. decode_batch(...)["STRAIN"]
+        prefix (str): Text value written in a first column of every row (default: none)
+
+    Returns:
+        bytes: CSV rows without header, each ending with a new line
+    """
+    _texts = [_column_text(_values) for _values in columns.values()]
+    if not _texts or not _texts[0]:
+        return b''
+    if prefix is not None:
+        _texts.insert(0, [_csv_text(prefix)] * len(_texts[0]))
+    return ("\n".join(map(",".join, zip(*_texts))) + "\n").encode("utf-8")
+
+
+def _decode_range(path, start, end, packet_type, scaled, with_filename):
+    """Decode one byte range of a capture file and format its packets of one type as CSV, in a worker."""
+    from pyipr_sensor_lib.ipr_capture_reader import IPRCaptureReader
+
+    _filepath, _filename = _split_path(path)
+    _columns = IPRCaptureReader(_filepath, _filename).read_range(start, end, scaled)[packet_type]
+    return format_csv(_columns, path if with_filename else None)
+
+
+def _convert_file(path, output_dir, output_format, scaled, chunk_size):
+    """Convert a whole capture file block by block, in a worker. Returns the output and the rows per type."""
+    from pyipr_sensor_lib.ipr_capture_reader import IPRCaptureReader
+
+    _filepath, _filename = _split_path(path)
+    _output_path = os.path.join(output_dir if output_dir is not None else _filepath, "")
+    _stem = os.path.splitext(_filename)[0]
+    _rows = dict.fromkeys(PACKET_TYPE_NAMES, 0)
+
+    if output_format == "csv":
+        _output = _output_path + _stem + "_{}.csv"
+        _files = dict()
+        try:
+            for _columns in IPRCaptureReader(_filepath, _filename, chunk_size).read_batches(scaled):
+                for _name, _type_columns in _columns.items():
+                    if _name not in _files:
+                        _files[_name] = open(_output.format(_name), 'wb')
+                        _files[_name].write(",".join(_type_columns).encode("utf-8") + b"\n")
+                    _files[_name].write(format_csv(_type_columns))
+                    _rows[_name] += len(_type_columns["timestamp"])
+        finally:
+            for _file in _files.values():
+                _file.close()
+        return _output.format("*"), _rows
+
+    _time_axis = None
+    if output_format == "columnar":
+        from pyipr_sensor_lib.ipr_columnar_store import IPRColumnarWriter
+        from pyipr_sensor_lib.ipr_time_axis import IPRTimeAxis
+        _output = _stem + COLUMNAR_EXTENSION
+        # The chunks are indexed on the unwrapped "tick" column: the raw timestamp rolls over
+        _time_axis = IPRTimeAxis()
+        _writer = IPRColumnarWriter(_output_path, _output, time_column="tick")
+    else:
+        from pyipr_sensor_lib.ipr_arrow_export import IPRParquetWriter
+        _output = _stem
+        _writer = IPRParquetWriter(_output_path, _output)
+    try:
+        for _columns in IPRCaptureReader(_filepath, _filename, chunk_size).read_batches(scaled):
+            if _time_axis is not None:
+                _time_axis.update(_columns)
+            _writer.write_batch(_columns)
+            for _name, _type_columns in _columns.items():
+                _rows[_name] += len(_type_columns["timestamp"])
+    finally:
+        _writer.close()
+    return _output_path + _output, _rows
+
+
+def _file_stats(path, tick_rate, chunk_size):
+    """Count the telegrams and the lost packets of a capture file, in a worker."""
+    from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+    from pyipr_sensor_lib.ipr_capture_reader import IPRCaptureReader
+    from pyipr_sensor_lib.ipr_continuity import IPRContinuityTracker
+    from pyipr_sensor_lib.ipr_metrics import IPRMetrics
+
+    _filepath, _filename = _split_path(path)
+    _metrics = IPRMetrics(invalid_sample_size=0)
+    _tracker = IPRContinuityTracker(tick_rate=tick_rate)
+    for _chunk in IPRCaptureReader(_filepath, _filename, chunk_size).read_chunks():
+        _headers = dict()
+        decode_batch(_chunk, False, metrics=_metrics, headers=_headers)
+        _tracker.update_batch(_headers)
+    _counters = {_name: _value for _name, _value in _metrics.counters.items()
+                 if _name not in (IPRMetrics.BYTES_READ, IPRMetrics.DISCARDED_BYTES,
+                                  IPRMetrics.RING_BUFFER_OVERFLOW_BYTES, IPRMetrics.QUEUE_OVERFLOWS)}
+    return {"file": path, "bytes": os.path.getsize(path), "counters": _counters, "packets": _tracker.get_report()}
+
+
+def run_tasks(function, tasks, workers):
+    """
+    Call a function on every task, in worker processes if workers > 1.
+
+    Only a few tasks per worker are submitted in advance, so results are streamed and the memory
+    used does not depend on the number of tasks.
+
+    Args:
+        function (callable): Function defined at module level (it is sent to the workers)
+        tasks (iterable): Tuple of arguments of each call
+        workers (int): Number of worker processes, 1 to run the tasks in this process
+
+    Yields:
+        tuple: (task, result, error) in the order of the tasks, error being the OSError or
+               ValueError raised by the task (result is then None)
+    """
+    if workers <= 1:
+        for _task in tasks:
+            try:
+                yield _task, function(*_task), None
+            except (OSError, ValueError) as _error:
+                yield _task, None, _error
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    _tasks = iter(tasks)
+    _pending = deque()
+    with ProcessPoolExecutor(workers) as _executor:
+        for _task in _tasks:
+            _pending.append((_task, _executor.submit(function, *_task)))
+            if len(_pending) < workers * TASKS_PER_WORKER:
+                continue
+            yield _get_task_result(*_pending.popleft())
+        while _pending:
+            yield _get_task_result(*_pending.popleft())
+
+
+def _get_task_result(task, future):
+    """Wait for a task submitted by run_tasks."""
+    try:
+        return task, future.result(), None
+    except (OSError, ValueError) as _error:
+        return task, None, _error
+
+
+def _report_error(path, error):
+    """Write the error of a file on the standard error."""
+    sys.stderr.write("pyipr: {}: {}\n".format(path, error))
+
+
+def command_decode(arguments):
+    """Write the packets of one type of the capture files as CSV on the standard output."""
+    from pyipr_sensor_lib.ipr_batch_decoder import HEADER_COLUMNS
+    from pyipr_sensor_lib.ipr_capture_reader import IPRCaptureReader
+
+    _layout = PACKET_LAYOUTS[PACKET_TYPE_NAMES.index(arguments.type)]
+    _output = sys.stdout.buffer
+    if not arguments.no_header:
+        _header = (["file"] if arguments.with_filename else []) + list(HEADER_COLUMNS) + list(_layout.columns)
+        _output.write(",".join(_header).encode("utf-8") + b"\n")
+
+    _errors = list()
+
+    def _tasks():
+        for _path in arguments.files:
+            _filepath, _filename = _split_path(_path)
+            try:
+                _ranges = IPRCaptureReader(_filepath, _filename, arguments.chunk_size).split_ranges()
+            except OSError as _error:
+                _report_error(_path, _error)
+                _errors.append(_path)
+                continue
+            for _start, _end in _ranges:
+                yield _path, _start, _end, arguments.type, not arguments.raw, arguments.with_filename
+
+    for _task, _text, _error in run_tasks(_decode_range, _tasks(), arguments.workers):
+        if _error is not None:
+            _report_error(_task[0], _error)
+            _errors.append(_task[0])
+        else:
+            _output.write(_text)
+    _output.flush()
+    return 1 if _errors else 0
+
+
+def command_convert(arguments):
+    """Convert the capture files to CSV, columnar or Parquet files."""
+    if arguments.format == "parquet":
+        from pyipr_sensor_lib.ipr_arrow_export import _import_pyarrow
+        _import_pyarrow()  # Fail before starting the workers if pyarrow is missing
+    if arguments.output_dir is not None:
+        os.makedirs(arguments.output_dir, exist_ok=True)
+
+    _tasks = ((_path, arguments.output_dir, arguments.format, not arguments.raw, arguments.chunk_size)
+              for _path in arguments.files)
+    _failed = 0
+    for _task, _result, _error in run_tasks(_convert_file, _tasks, min(arguments.workers, len(arguments.files))):
+        if _error is not None:
+            _report_error(_task[0], _error)
+            _failed += 1
+            continue
+        _output, _rows = _result
+        print("{} -> {} ({})".format(_task[0], _output, ", ".join(
+            "{} {}".format(_count, _name) for _name, _count in _rows.items())), flush=True)
+    return 1 if _failed else 0
+
+
+def command_stats(arguments):
+    """Print the telegram counters and the packet losses of the capture files."""
+    _tasks = ((_path, arguments.tick_rate, arguments.chunk_size) for _path in arguments.files)
+    _failed = 0
+    for _task, _stats, _error in run_tasks(_file_stats, _tasks, min(arguments.workers, len(arguments.files))):
+        if _error is not None:
+            _report_error(_task[0], _error)
+            _failed += 1
+            continue
+        if arguments.json:
+            print(json.dumps(_stats), flush=True)
+            continue
+        _counters = _stats["counters"]
+        print("{}: {} bytes, {} telegrams, {} decoded, {} too short, {} CRC failures".format(
+            _stats["file"], _stats["bytes"], _counters["telegrams_framed"], _counters["telegrams_decoded"],
+            _counters["short_telegrams"], _counters["crc_failures"]))
+        for _name, _report in _stats["packets"].items():
+            _rate = "" if _report["sample_rate"] is None else ", {:.6g} packets/{}".format(
+                _report["sample_rate"], "s" if arguments.tick_rate else "tick")
+            print("  {:<13} {} received, {} invalid, {} lost ({:.2f} %){}".format(
+                _name, _report["received"], _report["invalid"], _report["lost"], _report["loss_percent"], _rate))
+        sys.stdout.flush()
+    return 1 if _failed else 0
+
+
+def command_record(arguments):
+    """Record the binary stream of a sensor to capture files."""
+    from pyipr_sensor_lib.ipr_capture_writer import IPRCaptureWriter
+    from pyipr_sensor_lib.ipr_serial_interface import IPRSerialInterface
+
+    _interface = IPRSerialInterface()
+    _interface.serial_setup(arguments.port)
+    _interface.serial_open()
+    if not _interface.serial_is_open():
+        _report_error(arguments.port, "cannot open the serial port")
+        return 1
+
+    _filepath, _filename = _split_path(arguments.output)
+    _writer = IPRCaptureWriter(_filepath, _filename, max_file_size=arguments.max_file_size,
+                               max_file_duration=arguments.max_file_duration,
+                               flush_interval=arguments.flush_interval)
+    _start_time = time.monotonic()
+    _written = 0
+    try:
+        _interface.serial_ipr_start_binary_read()
+        while arguments.duration is None or time.monotonic() - _start_time < arguments.duration:
+            _data = _interface.serial_read_available()
+            _writer.write(_data)
+            _written += len(_data)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _interface.serial_ipr_stop_binary_read()
+        _writer.close()
+        _interface.serial_close()
+    sys.stderr.write("pyipr: {} bytes recorded in {:.1f} s\n".format(_written, time.monotonic() - _start_time))
+    return 0
+
+
+def build_parser():
+    """
+    Build the command-line parser of the 'pyipr' tool.
+
+    Returns:
+        argparse.ArgumentParser: Parser of the decode, convert, stats and record commands
+    """
+    _parser = argparse.ArgumentParser(prog="pyipr", description="Decode, convert and record IPR sensor captures")
+    _parser.add_argument("--version", action="version", version="%(prog)s " + __version__)
+    _commands = _parser.add_subparsers(dest="command", metavar="command")
+    _commands.required = True
+
+    _files = argparse.ArgumentParser(add_help=False)
+    _files.add_argument("files", nargs="+", help="Binary capture files")
+    _files.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: number of CPUs, 1: no worker process)")
+    _files.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Bytes decoded at once (default: %(default)s)")
+
+    _decode = _commands.add_parser("decode", parents=[_files], help="Write the packets of one type as CSV on stdout")
+    _decode.add_argument("--type", choices=PACKET_TYPE_NAMES, default=PACKET_TYPE_NAMES[0],
+                         help="Packet type (default: %(default)s)")
+    _decode.add_argument("--raw", action="store_true", help="Write raw sensor values instead of scaled values")
+    _decode.add_argument("--with-filename", action="store_true", help="Start every row with the capture file")
+    _decode.add_argument("--no-header", action="store_true", help="Do not write the header row")
+    _decode.set_defaults(function=command_decode)
+
+    _convert = _commands.add_parser("convert", parents=[_files], help="Convert to CSV, columnar or Parquet files")
+    _convert.add_argument("--format", choices=CONVERT_FORMATS, default="csv",
+                          help="csv: one file per packet type, columnar: IPRColumnarWriter file ({}) "
+                               "indexed on the unwrapped 'tick' column, "
+                               "parquet: dataset directory (requires pyarrow)".format(COLUMNAR_EXTENSION))
+    _convert.add_argument("--output-dir", help="Directory of the converted files (default: next to each capture)")
+    _convert.add_argument("--raw", action="store_true", help="Convert raw sensor values instead of scaled values")
+    _convert.set_defaults(function=command_convert)
+
+    _stats = _commands.add_parser("stats", parents=[_files], help="Print telegram counters and packet losses")
+    _stats.add_argument("--tick-rate", type=float, help="Timestamp ticks per second, to report packets per second")
+    _stats.add_argument("--json", action="store_true", help="Write one JSON object per file")
+    _stats.set_defaults(function=command_stats)
+
+    _record = _commands.add_parser("record", help="Record the binary stream of a sensor (requires pyserial)")
+    _record.add_argument("port", help="Serial port of the sensor (COM5, /dev/ttyUSB0, ...)")
+    _record.add_argument("output", help="Capture file, data is appended if it exists")
+    _record.add_argument("--duration", type=float, help="Recording time in seconds (default: until Ctrl+C)")
+    _record.add_argument("--max-file-size", type=int, help="Bytes after which a new file is started")
+    _record.add_argument("--max-file-duration", type=float, help="Seconds after which a new file is started")
+    _record.add_argument("--flush-interval", type=float, default=1.0,
+                         help="Maximum seconds data stays in the write buffer (default: %(default)s)")
+    _record.set_defaults(function=command_record)
+    return _parser
+
+
+def main(argv=None):
+    """
+    Run the 'pyipr' tool.
+
+    Args:
+        argv (list): Command-line arguments (default: sys.argv[1:])
+
+    Returns:
+        int: Exit status, 1 if a file could not be processed
+    """
+    _arguments = build_parser().parse_args(argv)
+    try:
+        return _arguments.function(_arguments)
+    except BrokenPipeError:
+        # Output closed early (e.g. piped to head): stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import json
+import mmap
+import struct
+
+import numpy as np
+
+# File layout:
+#   MAGIC | chunk data ... | index (JSON) | index length (uint64, little endian) | MAGIC
+# Each chunk holds a fixed number of rows of one packet type, stored column after column as
+# little endian fixed-width arrays aligned on 8 bytes. The index lists, for every chunk, the
+# packet type, the number of rows, the offset and type of every column and the minimum and
+# maximum value of the time column, so that time range queries only read the matching chunks.
+COLUMNAR_MAGIC = b'IPRCOL01'
+_INDEX_FOOTER = struct.Struct('<Q')
+_ALIGNMENT = 8
+
+
+class IPRColumnarWriter:
+    """
+    Writer storing decoded sensor data in a compact columnar file.
+
+    Batches returned by ipr_batch_decoder.decode_batch are accumulated per packet type and
+    written in chunks of chunk_rows rows, each chunk being indexed by its time range.
+    """
+
+    DEFAULT_CHUNK_ROWS = 65536
+
+    def __init__(self, filepath, filename, chunk_rows=DEFAULT_CHUNK_ROWS, time_column="timestamp"):
+        """
+        Create the columnar file.
+
+        Args:
+            filepath (str): Directory path for saving the file
+            filename (str): Name of the file to create (overwritten if it exists)
+            chunk_rows (int): Number of rows per chunk
+            time_column (str): Column used to index the chunks, which must not decrease. The raw
+                27-bit "timestamp" rolls over every 2^27 ticks, so the default only suits
+                captures shorter than one rollover: index longer captures on the "tick" column
+                added by ipr_time_axis.IPRTimeAxis
+        """
+        self.chunk_rows = chunk_rows
+        self.time_column = time_column
+        self._last_time = dict()  # Packet type -> last value of the time column
+        self._file = open(filepath + filename, 'wb')
+        self._file.write(COLUMNAR_MAGIC)
+        self._index = list()
+        self._pending = dict()  # Packet type -> list of batches not written yet
+        self._pending_rows = dict()
+
+    def write_batch(self, columns):
+        """
+        Add decoded data to the file.
+
+        Args:
+            columns (dict): Packet type name mapped to a dict of column name -> numpy.ndarray,
+                as returned by ipr_batch_decoder.decode_batch
+
+        Raises:
+            ValueError: If the time column of a packet type decreases, within the batch or from
+                the previous batch: the time ranges of the chunks would overlap
+        """
+        for _packet_type, _columns in columns.items():
+            _time = _columns[self.time_column]
+            _rows = len(_time)
+            if _rows == 0:
+                continue
+            _last_time = self._last_time.get(_packet_type)
+            if (_last_time is not None and _time[0] < _last_time) or np.any(_time[1:] < _time[:-1]):
+                raise ValueError("{}: the time column '{}' decreases (timestamp rollover?), "
+                                 "index on the 'tick' column of IPRTimeAxis".format(_packet_type, self.time_column))
+            self._last_time[_packet_type] = _time[-1]
+            self._pending.setdefault(_packet_type, list()).append(_columns)
+            self._pending_rows[_packet_type] = self._pending_rows.get(_packet_type, 0) + _rows
+            if self._pending_rows[_packet_type] >= self.chunk_rows:
+                self._flush_packet_type(_packet_type, False)
+
+    def close(self):
+        """Write the remaining rows and the index, then close the file."""
+        if self._file.closed:
+            return
+        for _packet_type in list(self._pending):
+            self._flush_packet_type(_packet_type, True)
+
+        _index = json.dumps({"time_column": self.time_column, "chunks": self._index}).encode("utf-8")
+        self._file.write(_index)
+        self._file.write(_INDEX_FOOTER.pack(len(_index)))
+        self._file.write(COLUMNAR_MAGIC)
+        self._file.close()
+
+    def _flush_packet_type(self, packet_type, flush_all):
+        """Write the full chunks (and the last partial one if flush_all) of a packet type."""
+        _batches = self._pending.pop(packet_type, list())
+        self._pending_rows[packet_type] = 0
+        if not _batches:
+            return
+        _columns = {_name: np.concatenate([_batch[_name] for _batch in _batches]) for _name in _batches[0]}
+        _rows = len(_columns[self.time_column])
+
+        _start = 0
+        while _rows - _start >= self.chunk_rows or (flush_all and _start < _rows):
+            _end = min(_start + self.chunk_rows, _rows)
+            self._write_chunk(packet_type, {_name: _values[_start:_end] for _name, _values in _columns.items()})
+            _start = _end
+
+        if _start < _rows:
+            self._pending[packet_type] = [{_name: _values[_start:] for _name, _values in _columns.items()}]
+            self._pending_rows[packet_type] = _rows - _start
+
+    def _write_chunk(self, packet_type, columns):
+        """Write one chunk and add it to the index."""
+        _time = columns[self.time_column]
+        _entry = {"packet_type": packet_type, "rows": len(_time),
+                  "time_min": _time.min().item(), "time_max": _time.max().item(), "columns": dict()}
+        for _name, _values in columns.items():
+            _padding = -self._file.tell() % _ALIGNMENT
+            self._file.write(b'\x00' * _padding)
+            _values = np.ascontiguousarray(_values, dtype=_values.dtype.newbyteorder('<'))
+            _entry["columns"][_name] = {"offset": self._file.tell(), "dtype": _values.dtype.str}
+            self._file.write(_values.tobytes())
+        self._index.append(_entry)
+
+
+class IPRColumnarReader:
+    """
+    Reader for the columnar files created by IPRColumnarWriter.
+
+    The file is memory-mapped: only the index is parsed when the file is opened, and a query
+    only touches the chunks whose time range matches.
+    """
+
+    def __init__(self, filepath, filename):
+        """
+        Open a columnar file and load its index.
+
+        Args:
+            filepath (str): Path to the directory containing the file
+            filename (str): Name of the columnar file
+
+        Raises:
+            ValueError: If the file is not a columnar file or was not closed properly
+        """
+        self._file = open(filepath + filename, 'rb')
+        self._mapped_file = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        _footer_size = _INDEX_FOOTER.size + len(COLUMNAR_MAGIC)
+        if (len(self._mapped_file) < len(COLUMNAR_MAGIC) + _footer_size or
+                self._mapped_file[:len(COLUMNAR_MAGIC)] != COLUMNAR_MAGIC or
+                self._mapped_file[-len(COLUMNAR_MAGIC):] != COLUMNAR_MAGIC):
+            self.close()
+            raise ValueError("Not a complete IPR columnar file: {}".format(filepath + filename))
+
+        _index_length, = _INDEX_FOOTER.unpack_from(self._mapped_file, len(self._mapped_file) - _footer_size)
+        _index_start = len(self._mapped_file) - _footer_size - _index_length
+        _index = json.loads(self._mapped_file[_index_start:_index_start + _index_length].decode("utf-8"))
+        self.time_column = _index["time_column"]
+        self._chunks = _index["chunks"]
+
+    def get_packet_types(self):
+        """
+        Get the packet types stored in the file.
+
+        Returns:
+            list: Packet type names, e.g. ["STRAIN", "ENVIRONMENT", "ACCELERATION"]
+        """
+        return list(dict.fromkeys(_chunk["packet_type"] for _chunk in self._chunks))
+
+    def get_row_count(self, packet_type):
+        """
+        Get the number of rows stored for a packet type.
+
+        Args:
+            packet_type (str): Packet type name
+
+        Returns:
+            int: Number of rows
+        """
+        return sum(_chunk["rows"] for _chunk in self._chunks if _chunk["packet_type"] == packet_type)
+
+    def read(self, packet_type, columns=None, time_start=None, time_end=None):
+        """
+        Read the rows of a packet type, optionally restricted to a time range.
+
+        Args:
+            packet_type (str): Packet type name, e.g. "STRAIN"
+            columns (list): Names of the columns to read (default: all columns)
+            time_start: Minimum value of the time column, included (default: no limit)
+            time_end: Maximum value of the time column, included (default: no limit)
+
+        Returns:
+            dict: Column name mapped to numpy.ndarray
+        """
+        _selected = [_chunk for _chunk in self._chunks
+                     if _chunk["packet_type"] == packet_type and
+                     (time_start is None or _chunk["time_max"] >= time_start) and
+                     (time_end is None or _chunk["time_min"] <= time_end)]
+        if not _selected:
+            return dict()
+        if columns is None:
+            columns = list(_selected[0]["columns"])
+
+        _names = list(dict.fromkeys(list(columns) + [self.time_column]))
+        _parts = {_name: [self._get_column(_chunk, _name) for _chunk in _selected] for _name in _names}
+        _result = {_name: np.concatenate(_values) for _name, _values in _parts.items()}
+
+        if time_start is not None or time_end is not None:
+            _time = _result[self.time_column]
+            _mask = np.ones(len(_time), dtype=bool)
+            if time_start is not None:
+                _mask &= _time >= time_start
+            if time_end is not None:
+                _mask &= _time <= time_end
+            _result = {_name: _values[_mask] for _name, _values in _result.items()}
+        return {_name: _result[_name] for _name in columns}
+
+    def close(self):
+        """Close the file."""
+        try:
+            self._mapped_file.close()
+        except BufferError:
+            pass  # Arrays still reference the mapped memory, it is released with them
+        self._file.close()
+
+    def _get_column(self, chunk, name):
+        """Get a column of a chunk as a read-only array backed by the mapped file."""
+        _column = chunk["columns"][name]
+        return np.frombuffer(self._mapped_file, dtype=np.dtype(_column["dtype"]),
+                             count=chunk["rows"], offset=_column["offset"])
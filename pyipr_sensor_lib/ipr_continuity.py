@@ -0,0 +1,244 @@
+import numpy as np
+
+# Events returned by IPRContinuityTracker.update
+EVENT_FIRST = 0  # First packet of its type
+EVENT_CONTINUOUS = 1  # Next packet expected
+EVENT_GAP = 2  # Packets are missing before this one
+EVENT_DUPLICATE = 3  # Same sequence and timestamp as the previous packet
+EVENT_OUT_OF_ORDER = 4  # Older than the previous packet
+EVENT_RESYNC = 5  # Timestamp jumped back too far to be a late packet (sensor restarted)
+
+PACKET_TYPE_NAMES = ("STRAIN", "ENVIRONMENT", "ACCELERATION")
+
+_TIMESTAMP_MODULO = 1 << 27
+_HALF_TIMESTAMP_MODULO = 1 << 26
+
+
+class _StreamState:
+    """Continuity state and counters of one packet type."""
+
+    def __init__(self):
+        self.last_sequence = None
+        self.last_timestamp = None
+        self.period = None  # Ticks between two packets, learned from the first packets
+        self.learn_minimum = None
+        self.learn_count = 0
+        self.received = 0
+        self.invalid = 0  # Received but rejected by the decoders
+        self.lost = 0
+        self.duplicates = 0
+        self.out_of_order = 0
+        self.resyncs = 0
+        self.elapsed_ticks = 0
+
+
+class IPRContinuityTracker:
+    """
+    Streaming detection of lost, duplicated and out-of-order packets, per packet type.
+
+    Each packet carries a 3-bit sequence counter and a 27-bit timestamp. The sequence counter
+    alone cannot tell apart 1 and 9 lost packets, so the timestamp difference, divided by the
+    packet period, is used to pick the number of missing packets matching the sequence counter.
+    The period is given or learned as the shortest time between packets received with
+    consecutive sequences, which is robust to packets lost by multiples of 8.
+
+    Packets rejected by the decoders once their type is known (too short for their type) are
+    accounted for as received but invalid: they fill their place in the sequence and are never
+    counted as lost. A late packet is counted as out of order and no longer as lost. Timestamp differences are
+    computed modulo 2^27: gaps longer than half the timestamp range look like a restart of the
+    sensor and are counted as resynchronizations.
+    """
+
+    LEARN_COUNT = 16  # Consecutive packets observed to learn the period
+    RESYNC_PERIODS = 8  # Backward jump, in periods, above which the stream is resynchronized
+
+    def __init__(self, periods=None, tick_rate=None):
+        """
+        Initialize the tracker.
+
+        Args:
+            periods (dict): Packet type name mapped to the period in ticks (default: learned)
+            tick_rate (float): Timestamp ticks per second, to report rates in packets per second
+                (default: rates in packets per tick)
+        """
+        self.tick_rate = tick_rate
+        self._streams = [_StreamState() for _ in PACKET_TYPE_NAMES]
+        for _index, _name in enumerate(PACKET_TYPE_NAMES):
+            if periods and periods.get(_name):
+                self._streams[_index].period = float(periods[_name])
+
+    def update(self, packet_type, sequence, timestamp, valid=True):
+        """
+        Account for a decoded packet.
+
+        Args:
+            packet_type (int): 0 strain, 1 environment, 2 acceleration
+            sequence (int): Sequence as returned by the decoders (bits 3-5 of byte 0)
+            timestamp (int): Header timestamp
+            valid (bool): False for a packet received but rejected by the decoders (default True)
+
+        Returns:
+            int: EVENT_FIRST, EVENT_CONTINUOUS, EVENT_GAP, EVENT_DUPLICATE, EVENT_OUT_OF_ORDER
+                 or EVENT_RESYNC
+        """
+        _stream = self._streams[packet_type]
+        _sequence = (int(sequence) >> 3) & 0x07
+        _timestamp = int(timestamp)
+        _stream.received += 1
+        if not valid:
+            _stream.invalid += 1
+        if _stream.last_timestamp is None:
+            _stream.last_sequence, _stream.last_timestamp = _sequence, _timestamp
+            return EVENT_FIRST
+
+        _delta_time = (_timestamp - _stream.last_timestamp) % _TIMESTAMP_MODULO
+        if _delta_time >= _HALF_TIMESTAMP_MODULO:
+            _delta_time -= _TIMESTAMP_MODULO
+        _delta_sequence = (_sequence - _stream.last_sequence) & 0x07
+
+        if _delta_time <= 0:
+            if _delta_time == 0 and _delta_sequence == 0:
+                _stream.duplicates += 1
+                return EVENT_DUPLICATE
+            if _stream.period is not None and -_delta_time > self.RESYNC_PERIODS * _stream.period:
+                _stream.resyncs += 1
+                _stream.last_sequence, _stream.last_timestamp = _sequence, _timestamp
+                return EVENT_RESYNC
+            _stream.out_of_order += 1
+            if _stream.lost:
+                _stream.lost -= 1
+            return EVENT_OUT_OF_ORDER
+
+        _lost = self._count_missing(_delta_time, _delta_sequence, _stream.period)
+        if _stream.period is None and _delta_sequence == 1:
+            if _stream.learn_minimum is None or _delta_time < _stream.learn_minimum:
+                _stream.learn_minimum = _delta_time
+            _stream.learn_count += 1
+            if _stream.learn_count == self.LEARN_COUNT:
+                _stream.period = float(_stream.learn_minimum)
+        _stream.lost += _lost
+        _stream.elapsed_ticks += _delta_time
+        _stream.last_sequence, _stream.last_timestamp = _sequence, _timestamp
+        return EVENT_GAP if _lost else EVENT_CONTINUOUS
+
+    def update_batch(self, columns):
+        """
+        Account for the packets decoded by ipr_batch_decoder.decode_batch.
+
+        Batches without late packets are processed with vectorized operations, other batches
+        packet by packet. Both give the same counts.
+
+        Args:
+            columns (dict): Packet type name mapped to a dict holding the "sequence" and
+                "timestamp" columns, in reception order, and optionally the "valid" column of
+                the headers filled by decode_batch, to account for the invalid packets too
+        """
+        for _packet_type, _name in enumerate(PACKET_TYPE_NAMES):
+            if _name not in columns or not len(columns[_name]["timestamp"]):
+                continue
+            _sequences = (np.asarray(columns[_name]["sequence"], dtype=np.int64) >> 3) & 0x07
+            _timestamps = np.asarray(columns[_name]["timestamp"], dtype=np.int64)
+            _valid = columns[_name].get("valid")
+            _stream = self._streams[_packet_type]
+            if self._update_vectorized(_stream, _sequences, _timestamps):
+                if _valid is not None:
+                    _stream.invalid += len(_valid) - int(np.count_nonzero(_valid))
+            else:
+                _valid = _valid.tolist() if _valid is not None else [True] * len(_timestamps)
+                for _sequence, _timestamp, _is_valid in zip(_sequences.tolist(), _timestamps.tolist(), _valid):
+                    self.update(_packet_type, _sequence << 3, _timestamp, _is_valid)
+
+    def get_report(self):
+        """
+        Get the continuity statistics of every packet type.
+
+        Returns:
+            dict: Packet type name mapped to a dict with received, invalid (received but rejected by
+                  the decoders, included in received), lost, duplicates, out_of_order,
+                  resyncs, loss_percent, period (ticks) and sample_rate (packets per second if the
+                  tick rate is known, else per tick)
+        """
+        _report = dict()
+        for _name, _stream in zip(PACKET_TYPE_NAMES, self._streams):
+            _expected = _stream.received - _stream.duplicates + _stream.lost
+            _rate = None
+            if _stream.elapsed_ticks:
+                _rate = (_stream.received - 1) / _stream.elapsed_ticks
+                if self.tick_rate is not None:
+                    _rate *= self.tick_rate
+            _report[_name] = {"received": _stream.received, "invalid": _stream.invalid, "lost": _stream.lost,
+                              "duplicates": _stream.duplicates, "out_of_order": _stream.out_of_order,
+                              "resyncs": _stream.resyncs,
+                              "loss_percent": 100.0 * _stream.lost / _expected if _expected else 0.0,
+                              "period": _stream.period, "sample_rate": _rate}
+        return _report
+
+    def reset(self):
+        """Forget the previous packets and clear the counters, keeping the known periods."""
+        _periods = [_stream.period for _stream in self._streams]
+        self._streams = [_StreamState() for _ in PACKET_TYPE_NAMES]
+        for _stream, _period in zip(self._streams, _periods):
+            _stream.period = _period
+
+    @staticmethod
+    def _count_missing(delta_time, delta_sequence, period):
+        """Number of packets missing between two packets, consistent with both counters."""
+        _steps = delta_sequence if delta_sequence else 8
+        if period is not None:
+            # Closest step count to the elapsed time among those matching the sequence counter
+            _steps += 8 * max(0, int(round((delta_time / period - _steps) / 8)))
+        return _steps - 1
+
+    def _update_vectorized(self, stream, sequences, timestamps):
+        """
+        Vectorized counterpart of update for a batch of one packet type.
+
+        Returns:
+            bool: False if the batch holds late or duplicated packets and was not processed
+        """
+        _is_first = stream.last_timestamp is None
+        if _is_first:
+            _first_sequence, _first_timestamp = int(sequences[0]), int(timestamps[0])
+            _previous_timestamps, _previous_sequences = timestamps[:-1], sequences[:-1]
+            sequences, timestamps = sequences[1:], timestamps[1:]
+        else:
+            _previous_timestamps = np.concatenate(([stream.last_timestamp], timestamps[:-1]))
+            _previous_sequences = np.concatenate(([stream.last_sequence], sequences[:-1]))
+        _delta_time = (timestamps - _previous_timestamps) % _TIMESTAMP_MODULO
+        _delta_time[_delta_time >= _HALF_TIMESTAMP_MODULO] -= _TIMESTAMP_MODULO
+        if np.any(_delta_time <= 0):
+            return False
+        if _is_first:
+            stream.received += 1
+            stream.last_sequence, stream.last_timestamp = _first_sequence, _first_timestamp
+            if not len(timestamps):
+                return True
+        _delta_sequence = (sequences - _previous_sequences) & 0x07
+        _steps = np.where(_delta_sequence == 0, 8, _delta_sequence)
+
+        # Packets up to the one completing the learning use the sequence counter only
+        _learned_from = 0
+        if stream.period is None:
+            _samples = np.flatnonzero(_delta_sequence == 1)
+            _needed = self.LEARN_COUNT - stream.learn_count
+            _samples = _samples[:_needed]
+            if len(_samples):
+                _minimum = int(_delta_time[_samples].min())
+                if stream.learn_minimum is None or _minimum < stream.learn_minimum:
+                    stream.learn_minimum = _minimum
+            stream.learn_count += len(_samples)
+            if stream.learn_count == self.LEARN_COUNT:
+                _learned_from = _samples[-1] + 1
+                stream.period = float(stream.learn_minimum)
+            else:
+                _learned_from = len(_steps)
+        if stream.period is not None and _learned_from < len(_steps):
+            _tail = slice(_learned_from, None)
+            _extra = np.rint((_delta_time[_tail] / stream.period - _steps[_tail]) / 8)
+            _steps[_tail] += 8 * np.maximum(0, _extra).astype(np.int64)
+
+        stream.received += len(timestamps)
+        stream.lost += int((_steps - 1).sum())
+        stream.elapsed_ticks += int(_delta_time.sum())
+        stream.last_sequence, stream.last_timestamp = int(sequences[-1]), int(timestamps[-1])
+        return True
@@ -0,0 +1,351 @@
+import math
+
+import numpy as np
+
+from pyipr_sensor_lib.ipr_packet_layout import (PACKET_LAYOUTS, PACKET_LAYOUTS_BY_ID, STRAIN_LAYOUT, ENVIRONMENT_LAYOUT,
+                                                ACCELERATION_LAYOUT)
+from pyipr_sensor_lib.ipr_parser import IPRParser
+
+# Packet type IDs, same values as IPRSensorDecoder.TYPE_*
+TYPE_STRAIN = 0
+TYPE_ENVIRONMENT = 1
+TYPE_ACCELERATION = 2
+
+# Unescaped telegram length in bytes, including the trailing checksum
+TELEGRAM_LENGTH_STRAIN = STRAIN_LAYOUT.telegram_length
+TELEGRAM_LENGTH_ENVIRONMENT = ENVIRONMENT_LAYOUT.telegram_length
+TELEGRAM_LENGTH_ACCELERATION = ACCELERATION_LAYOUT.telegram_length
+_MAX_TELEGRAM_LENGTH = max(_layout.telegram_length for _layout in PACKET_LAYOUTS)
+
+# The timestamp is a 27-bit tick counter
+TIMESTAMP_MODULO = 1 << 27
+
+
+def _build_checksum_table():
+    """CRC-8 table, polynomial 0x07."""
+    _table = bytearray(256)
+    for _value in range(256):
+        _crc = _value
+        for _ in range(8):
+            _crc = ((_crc << 1) ^ 0x07) & 0xFF if _crc & 0x80 else (_crc << 1) & 0xFF
+        _table[_value] = _crc
+    return bytes(_table)
+
+
+_CHECKSUM_TABLE = _build_checksum_table()
+_CHECKSUM_INIT = 0xFF
+
+
+def compute_checksum(data):
+    """
+    Compute the checksum ending every telegram: CRC-8, polynomial 0x07, initial value 0xFF,
+    over the unescaped bytes preceding it.
+
+    Args:
+        data (bytes/bytearray): Unescaped telegram without its checksum byte
+
+    Returns:
+        int: Checksum byte
+    """
+    _crc = _CHECKSUM_INIT
+    for _byte in data:
+        _crc = _CHECKSUM_TABLE[_crc ^ _byte]
+    return _crc
+
+
+def escape_telegram(data):
+    """
+    Add the escape sequences to an unescaped telegram, inverse of ipr_parser.unescape_telegram.
+
+    Escape sequences:
+    0x08 -> 0x07 0x55
+    0x07 -> 0x07 0xAA
+
+    Args:
+        data (bytes/bytearray): Unescaped telegram
+
+    Returns:
+        bytes: Telegram as sent by the sensor, without the 0x08 separator
+    """
+    return (bytes(data).replace(b'\x07', b'\x07\xaa').replace(b'\x08', b'\x07\x55'))
+
+
+def unscale_value(value, scale_range):
+    """
+    Convert a value in real units back to the raw sensor value, inverse of
+    IPRParser.convert_numeric_to_scale. The result is rounded and limited to the input range.
+
+    Args:
+        value (float): Value in real units
+        scale_range (tuple): (in_min, in_max, out_min, out_max) of the channel
+
+    Returns:
+        int: Raw sensor value
+    """
+    _in_min, _in_max, _out_min, _out_max = scale_range
+    _slope = (_out_max - _out_min) / (_in_max - _in_min)
+    return min(max(int(round((value - _out_min) / _slope + 1)), _in_min), _in_max)
+
+
+def _pack_telegram(packet_type, timestamp, sequence, values):
+    """
+    Pack the header and raw values of a telegram, inverse of the parser_get_* extractors.
+
+    The arguments can be integers, or numpy integer arrays to pack many telegrams at once.
+    The measurements are packed with the layout of the packet type (see ipr_packet_layout),
+    including the bits that the decoders do not read yet (bits 8-10 of P2 and bit 7 of the
+    battery voltage).
+
+    Returns:
+        list: Unescaped bytes without the checksum (integers or arrays)
+    """
+    _layout = PACKET_LAYOUTS_BY_ID[packet_type] if 0 <= packet_type < len(PACKET_LAYOUTS_BY_ID) else None
+    if _layout is None:
+        raise ValueError("Unknown packet type: {}".format(packet_type))
+    _crc = ((packet_type >> 1) ^ packet_type) & 0x01
+    _b = [packet_type | (_crc << 2) | ((sequence & 0x07) << 3) | ((timestamp & 0x03) << 6),
+          (timestamp >> 2) & 0xFF,
+          (timestamp >> 10) & 0xFF,
+          (timestamp >> 18) & 0xFF,
+          (timestamp >> 26) & 0x01]
+    _b += [0] * (_layout.decode_width - len(_b))
+    _layout.pack_into(_b, values)
+    return _b
+
+
+def encode_telegram(packet_type, timestamp, sequence, raw_values):
+    """
+    Encode raw sensor values into a telegram, byte for byte as sent by the sensor.
+
+    Args:
+        packet_type (int): TYPE_STRAIN, TYPE_ENVIRONMENT or TYPE_ACCELERATION
+        timestamp (int): 27-bit timestamp in sensor ticks
+        sequence (int): 3-bit sequence counter. The decoders report it in bits 3-5
+            (sequence << 3), as stored in byte 0
+        raw_values (sequence): Raw values in the order of the raw arrays of IPRParser
+
+    Returns:
+        bytes: Escaped telegram without the 0x08 separator, as accepted by analyse_packet
+    """
+    _data = bytearray(_pack_telegram(packet_type, int(timestamp) % TIMESTAMP_MODULO, int(sequence),
+                                     [int(_value) for _value in raw_values]))
+    _data.append(compute_checksum(_data))
+    return escape_telegram(_data)
+
+
+def encode_sample(sample, scaled=True):
+    """
+    Encode a record returned by ipr_sample_decoder.decode back into a telegram.
+
+    Args:
+        sample (StrainSample/EnvSample/AccelSample): Decoded packet
+        scaled (bool): Whether the record holds scaled values (default True) or raw sensor values.
+            Scaled values are converted with the ranges of IPRParser, without calibration
+
+    Returns:
+        bytes: Escaped telegram without the 0x08 separator
+    """
+    _packet_type = {"StrainSample": TYPE_STRAIN, "EnvSample": TYPE_ENVIRONMENT,
+                    "AccelSample": TYPE_ACCELERATION}[type(sample).__name__]
+    _values = sample[2:]
+    if scaled:
+        _values = [unscale_value(_value, _range) if _value != 0 else 0
+                   for _value, _range in zip(_values, PACKET_LAYOUTS_BY_ID[_packet_type].scale_ranges)]
+    return encode_telegram(_packet_type, sample.timestamp, int(sample.sequence) >> 3, _values)
+
+
+def encode_batch(packet_type, timestamps, sequences, raw_values):
+    """
+    Encode many telegrams of one packet type at once.
+
+    Args:
+        packet_type (int): TYPE_STRAIN, TYPE_ENVIRONMENT or TYPE_ACCELERATION
+        timestamps (numpy.ndarray): Timestamps in sensor ticks, reduced modulo 2^27
+        sequences (numpy.ndarray): 3-bit sequence counters
+        raw_values (list): One numpy.ndarray of raw values per channel
+
+    Returns:
+        numpy.ndarray: Unescaped telegrams including the checksum, one per row (uint8)
+    """
+    _timestamps = np.asarray(timestamps, dtype=np.int64) % TIMESTAMP_MODULO
+    _columns = _pack_telegram(packet_type, _timestamps, np.asarray(sequences, dtype=np.int64),
+                              [np.asarray(_values, dtype=np.int64) for _values in raw_values])
+    _telegrams = np.empty((len(_timestamps), PACKET_LAYOUTS_BY_ID[packet_type].telegram_length), dtype=np.uint8)
+    for _index, _column in enumerate(_columns):
+        _telegrams[:, _index] = _column
+    _table = np.frombuffer(_CHECKSUM_TABLE, dtype=np.uint8)
+    _crc = np.full(len(_timestamps), _CHECKSUM_INIT, dtype=np.uint8)
+    for _index in range(len(_columns)):
+        _crc = _table[_crc ^ _telegrams[:, _index]]
+    _telegrams[:, -1] = _crc
+    return _telegrams
+
+
+def escape_and_join(telegrams, lengths):
+    """
+    Escape telegrams and join them into a binary stream, each followed by the 0x08 separator.
+
+    Args:
+        telegrams (numpy.ndarray): Unescaped telegrams, one per row, padded to the widest one (uint8)
+        lengths (numpy.ndarray): Length of each telegram in bytes
+
+    Returns:
+        bytes: Binary stream as sent by the sensor
+    """
+    _rows, _width = telegrams.shape
+    _cells = np.empty((_rows, _width + 1), dtype=np.uint8)
+    _cells[:, :_width] = telegrams
+    _cells[np.arange(_rows), lengths] = IPRParser.TELEGRAM_SEPARATOR
+
+    _position = np.arange(_width + 1)
+    _is_data = _position < np.asarray(lengths)[:, None]
+    _is_used = _position <= np.asarray(lengths)[:, None]
+    _is_escaped = _is_data & ((_cells == IPRParser.TELEGRAM_SEPARATOR) | (_cells == IPRParser.TELEGRAM_ESCAPE))
+
+    _cells = _cells.ravel()
+    _is_escaped = _is_escaped.ravel()
+    _counts = _is_used.ravel().astype(np.int64) + _is_escaped
+    _stream = np.repeat(_cells, _counts)
+    _first = (np.cumsum(_counts) - _counts)[_is_escaped]
+    _stream[_first + 1] = np.where(_cells[_is_escaped] == IPRParser.TELEGRAM_SEPARATOR,
+                                   IPRParser.ESCAPED_SEPARATOR, IPRParser.ESCAPED_ESCAPE)
+    _stream[_first] = IPRParser.TELEGRAM_ESCAPE
+    return _stream.tobytes()
+
+
+class IPRCaptureGenerator:
+    """
+    Generator of synthetic sensor captures for load tests.
+
+    Each packet type is emitted at a fixed period in sensor ticks, with an optional jitter, and
+    carries slow sine waves with noise around the middle of each channel range. Corruption (a
+    flipped bit) and sequence gaps (lost telegrams) can be injected at a given rate. The same seed
+    always produces the same capture, whose telegrams all pass the decoders unless corrupted. As
+    on a real sensor, a first byte equal to the 0x08 separator is sent escaped.
+    """
+
+    # Periods in ticks observed on the example capture
+    DEFAULT_STRAIN_PERIOD = 24000
+    DEFAULT_ENVIRONMENT_PERIOD = 24000000
+    DEFAULT_ACCELERATION_PERIOD = 96000
+
+    DEFAULT_BLOCK_TICKS = 1 << 26  # Ticks generated per block when writing a file
+
+    def __init__(self, strain_period=DEFAULT_STRAIN_PERIOD, environment_period=DEFAULT_ENVIRONMENT_PERIOD,
+                 acceleration_period=DEFAULT_ACCELERATION_PERIOD, start_timestamp=0, jitter=0,
+                 corruption_rate=0.0, gap_rate=0.0, seed=0):
+        """
+        Initialize the generator.
+
+        Args:
+            strain_period (int): Ticks between strain telegrams (None: no strain telegram)
+            environment_period (int): Ticks between environment telegrams (None: none)
+            acceleration_period (int): Ticks between acceleration telegrams (None: none)
+            start_timestamp (int): Timestamp of the first telegrams, wraps at 2^27
+            jitter (int): Maximum random delay in ticks added to each timestamp
+            corruption_rate (float): Fraction of telegrams with one bit flipped after the checksum
+            gap_rate (float): Fraction of telegrams dropped, leaving gaps in the sequence counters
+            seed (int): Seed of the random generator
+
+        Raises:
+            ValueError: If every packet type is disabled
+        """
+        if not any((strain_period, environment_period, acceleration_period)):
+            raise ValueError("At least one packet type period is required")
+        self.periods = (strain_period, environment_period, acceleration_period)
+        self.jitter = jitter
+        self.corruption_rate = corruption_rate
+        self.gap_rate = gap_rate
+        self._random = np.random.default_rng(seed)
+        self._time = int(start_timestamp)  # Unwrapped ticks
+        self._next_time = [self._time] * 3
+        self._sequence = [0, 0, 0]
+        self.telegram_count = 0
+        self.corrupted_count = 0
+        self.dropped_count = 0
+
+    def generate(self, ticks):
+        """
+        Generate the telegrams of the next period of time.
+
+        Args:
+            ticks (int): Duration to generate in sensor ticks
+
+        Returns:
+            bytes: Binary stream, ending with a separator
+        """
+        _end_time = self._time + int(ticks)
+        _parts = list()
+        for _packet_type, _period in enumerate(self.periods):
+            if not _period:
+                continue
+            _times = np.arange(self._next_time[_packet_type], _end_time, _period, dtype=np.int64)
+            if not len(_times):
+                continue
+            self._next_time[_packet_type] = int(_times[-1]) + _period
+            _sequences = (self._sequence[_packet_type] + np.arange(len(_times))) & 0x07
+            self._sequence[_packet_type] = int(_sequences[-1] + 1) & 0x07
+            _timestamps = _times
+            if self.jitter:
+                _timestamps = _times + self._random.integers(0, self.jitter + 1, len(_times))
+
+            _values = [self._generate_values(_times, _range, _channel)
+                       for _channel, _range in enumerate(PACKET_LAYOUTS_BY_ID[_packet_type].scale_ranges)]
+            _telegrams = encode_batch(_packet_type, _timestamps, _sequences, _values)
+            _padded = np.zeros((len(_times), _MAX_TELEGRAM_LENGTH), dtype=np.uint8)
+            _padded[:, :_telegrams.shape[1]] = _telegrams
+            _parts.append((_timestamps, _padded, np.full(len(_times), _telegrams.shape[1])))
+        self._time = _end_time
+        if not _parts:
+            return b''
+
+        _timestamps = np.concatenate([_part[0] for _part in _parts])
+        _order = np.argsort(_timestamps, kind="stable")
+        _telegrams = np.concatenate([_part[1] for _part in _parts])[_order]
+        _lengths = np.concatenate([_part[2] for _part in _parts])[_order]
+
+        if self.gap_rate:
+            _kept = self._random.random(len(_lengths)) >= self.gap_rate
+            self.dropped_count += int(len(_kept) - _kept.sum())
+            _telegrams, _lengths = _telegrams[_kept], _lengths[_kept]
+        if self.corruption_rate:
+            _corrupted = np.flatnonzero(self._random.random(len(_lengths)) < self.corruption_rate)
+            _bytes = (self._random.random(len(_corrupted)) * _lengths[_corrupted]).astype(np.int64)
+            _telegrams[_corrupted, _bytes] ^= (1 << self._random.integers(0, 8, len(_corrupted))).astype(np.uint8)
+            self.corrupted_count += len(_corrupted)
+        self.telegram_count += len(_lengths)
+        return escape_and_join(_telegrams, _lengths)
+
+    def write_file(self, filepath, filename, size):
+        """
+        Write a synthetic capture of about size bytes, generated block by block.
+
+        Args:
+            filepath (str): Directory path for saving the file
+            filename (str): Name of the capture file (overwritten if it exists)
+            size (int): Minimum size of the capture in bytes
+
+        Returns:
+            int: Size of the capture in bytes
+        """
+        _written = 0
+        _block_ticks = self.DEFAULT_BLOCK_TICKS
+        with open(filepath + filename, 'wb') as _file:
+            while _written < size:
+                _data = self.generate(_block_ticks)
+                if _written == 0 and _data:
+                    # Adjust the block duration to about 4 MB per block
+                    _block_ticks = max(1, int(_block_ticks * 4000000 / len(_data)))
+                _file.write(_data)
+                _written += len(_data)
+        return _written
+
+    def _generate_values(self, times, scale_range, channel):
+        """Raw values of a channel: sine wave with noise around the middle of the range."""
+        _in_min, _in_max = scale_range[0], scale_range[1]
+        _middle = (_in_min + _in_max) / 2
+        _amplitude = (_in_max - _in_min) / 10
+        _period = 1e7 * (channel + 1)
+        _values = (_middle + _amplitude * np.sin(2 * math.pi * times / _period) +
+                   self._random.normal(0, _amplitude / 20, len(times)))
+        return np.clip(np.rint(_values), _in_min, _in_max).astype(np.int64)
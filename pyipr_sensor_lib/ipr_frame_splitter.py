@@ -0,0 +1,61 @@
+class IPRFrameSplitter:
+    """
+    Incremental splitter turning blocks of raw bytes from the sensor into complete telegrams.
+
+    Blocks can be of any size and cut the stream anywhere: the bytes following the last '0x08'
+    separator are kept until the rest of the telegram is received. The sensor escapes any 0x08
+    inside a telegram (0x07 0x55), so escape sequences split across two blocks stay intact in
+    the pending bytes and are removed later by IPRParser.parser_unescape.
+    """
+
+    # Telegram separator sent by the sensor after each telegram
+    TELEGRAM_SEPARATOR = b'\x08'
+    # Pending bytes kept without finding a separator before they are considered garbage
+    DEFAULT_MAX_PENDING_BYTES = 4096
+
+    def __init__(self, max_pending_bytes=DEFAULT_MAX_PENDING_BYTES):
+        """
+        Initialize the splitter with an empty buffer.
+
+        Args:
+            max_pending_bytes (int): Maximum size of an incomplete telegram. Larger data without any
+                separator (e.g. text replies or line noise) is discarded
+        """
+        self._buffer = bytearray()
+        self.max_pending_bytes = max_pending_bytes
+        self.discarded_bytes = 0
+
+    def feed(self, data):
+        """
+        Add a block of raw bytes and extract the telegrams it completes.
+
+        Args:
+            data (bytes/bytearray/memoryview): Raw bytes as read from the serial port
+
+        Returns:
+            list: Complete telegrams (bytes) without the separator, in reception order
+        """
+        _search_start = len(self._buffer)
+        self._buffer += data
+        if self._buffer.find(self.TELEGRAM_SEPARATOR, _search_start) == -1:
+            if len(self._buffer) > self.max_pending_bytes:
+                self.discarded_bytes += len(self._buffer)
+                self._buffer.clear()
+            return []
+
+        _telegrams = bytes(self._buffer).split(self.TELEGRAM_SEPARATOR)
+        self._buffer[:] = _telegrams.pop()
+        return _telegrams
+
+    def get_pending_length(self):
+        """
+        Get the number of bytes received after the last separator.
+
+        Returns:
+            int: Length of the incomplete telegram kept in the buffer
+        """
+        return len(self._buffer)
+
+    def reset(self):
+        """Discard the incomplete telegram kept in the buffer."""
+        self._buffer.clear()
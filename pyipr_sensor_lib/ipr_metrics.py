@@ -0,0 +1,241 @@
+import threading
+import time
+from collections import deque
+
+
+class IPRTimingHistogram:
+    """
+    Histogram of durations with power-of-two buckets, from 1 microsecond to about 1 hour.
+
+    Recording a duration costs a few operations and no allocation, so it can stay enabled on
+    production gateways. Percentiles are estimated from the bucket upper bounds.
+    """
+
+    BUCKET_COUNT = 32  # Bucket i holds durations below 2^i microseconds
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.buckets = [0] * self.BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def record(self, seconds):
+        """
+        Add a duration to the histogram.
+
+        Args:
+            seconds (float): Duration in seconds
+        """
+        _bucket = min(int(seconds * 1e6).bit_length(), self.BUCKET_COUNT - 1)
+        self.buckets[_bucket] += 1
+        self.count += 1
+        self.total += seconds
+        if self.minimum is None or seconds < self.minimum:
+            self.minimum = seconds
+        if self.maximum is None or seconds > self.maximum:
+            self.maximum = seconds
+
+    def get_percentile(self, percentile):
+        """
+        Estimate a percentile of the recorded durations.
+
+        Args:
+            percentile (float): Percentile between 0 and 100
+
+        Returns:
+            float: Upper bound in seconds of the bucket holding the percentile, None if empty
+        """
+        if self.count == 0:
+            return None
+        _rank = percentile / 100.0 * self.count
+        _cumulated = 0
+        for _bucket, _count in enumerate(self.buckets):
+            _cumulated += _count
+            if _cumulated >= _rank and _count:
+                return min((1 << _bucket) * 1e-6, self.maximum)
+        return self.maximum
+
+    def to_dict(self):
+        """
+        Summarize the histogram.
+
+        Returns:
+            dict: count, total, min, max, mean, p50, p90 and p99 in seconds, and the bucket counts
+        """
+        return {"count": self.count, "total": self.total, "min": self.minimum, "max": self.maximum,
+                "mean": self.total / self.count if self.count else None,
+                "p50": self.get_percentile(50), "p90": self.get_percentile(90), "p99": self.get_percentile(99),
+                "buckets": list(self.buckets)}
+
+
+class IPRMetrics:
+    """
+    Runtime metrics of the acquisition and decoding pipeline.
+
+    Collects counters, per-stage timing histograms and a bounded sample of the last invalid
+    telegrams. The same object can be given to IPRSerialInterface, IPRSensorDecoder and
+    ipr_batch_decoder.decode_batch to follow a telegram through every stage. Snapshots can be
+    pushed to callbacks (logging, Prometheus, MQTT, ...) on demand or periodically.
+    """
+
+    # Counters
+    BYTES_READ = "bytes_read"  # Bytes read from the serial port
+    TELEGRAMS_FRAMED = "telegrams_framed"  # Telegrams split from the byte stream
+    TELEGRAMS_DECODED = "telegrams_decoded"  # Valid packets decoded
+    SHORT_TELEGRAMS = "short_telegrams"  # Telegrams shorter than the minimum telegram length
+    CRC_FAILURES = "crc_failures"  # Telegrams with a wrong ID CRC
+    UNKNOWN_PACKET_TYPES = "unknown_packet_types"  # Telegrams with the unused packet ID 3
+    SHORT_PACKETS_STRAIN = "short_packets_strain"  # Packets too short for their type
+    SHORT_PACKETS_ENVIRONMENT = "short_packets_environment"
+    SHORT_PACKETS_ACCELERATION = "short_packets_acceleration"
+    ESCAPE_SEQUENCES = "escape_sequences"  # Escape bytes (0x07) received
+    DISCARDED_BYTES = "discarded_bytes"  # Bytes dropped by the frame splitter (oversized telegrams)
+    RING_BUFFER_OVERFLOW_BYTES = "ring_buffer_overflow_bytes"  # Bytes lost because the ring buffer was full
+    QUEUE_OVERFLOWS = "queue_overflows"  # Telegrams dropped because the telegram queue was full
+
+    COUNTERS = (BYTES_READ, TELEGRAMS_FRAMED, TELEGRAMS_DECODED, SHORT_TELEGRAMS, CRC_FAILURES,
+                UNKNOWN_PACKET_TYPES, SHORT_PACKETS_STRAIN, SHORT_PACKETS_ENVIRONMENT, SHORT_PACKETS_ACCELERATION,
+                ESCAPE_SEQUENCES, DISCARDED_BYTES, RING_BUFFER_OVERFLOW_BYTES, QUEUE_OVERFLOWS)
+
+    # Timed stages
+    STAGE_READ = "read"  # Serial port read calls, including the wait for data
+    STAGE_FRAME = "frame"  # Splitting the byte stream into telegrams
+    STAGE_UNESCAPE = "unescape"  # Removing the escape sequences
+    STAGE_DECODE = "decode"  # Validation and field extraction
+    STAGE_SCALE = "scale"  # Conversion to real units
+    STAGE_STREAM_STOP = "stream_stop"  # Switch from binary streaming to command mode
+
+    STAGES = (STAGE_READ, STAGE_FRAME, STAGE_UNESCAPE, STAGE_DECODE, STAGE_SCALE, STAGE_STREAM_STOP)
+
+    DEFAULT_INVALID_SAMPLE_SIZE = 100
+
+    def __init__(self, invalid_sample_size=DEFAULT_INVALID_SAMPLE_SIZE):
+        """
+        Initialize the metrics with every counter at zero.
+
+        Args:
+            invalid_sample_size (int): Number of invalid telegrams kept for inspection
+        """
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.timings = {_stage: IPRTimingHistogram() for _stage in self.STAGES}
+        self.invalid_samples = deque(maxlen=invalid_sample_size)
+        self.start_time = time.time()
+
+        self._callbacks = list()
+        self._export_thread = None
+        self._export_stop = threading.Event()
+
+    def increment(self, counter, value=1):
+        """
+        Increase a counter.
+
+        Args:
+            counter (str): Counter name, one of COUNTERS or a custom name
+            value (int): Amount to add
+        """
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def record_time(self, stage, seconds):
+        """
+        Add the duration of a stage to its histogram.
+
+        Args:
+            stage (str): Stage name, one of STAGES or a custom name
+            seconds (float): Duration in seconds
+        """
+        with self._lock:
+            _histogram = self.timings.get(stage)
+            if _histogram is None:
+                _histogram = self.timings[stage] = IPRTimingHistogram()
+            _histogram.record(seconds)
+
+    def add_invalid_telegram(self, telegram, reason):
+        """
+        Keep an invalid telegram in the bounded sample, the oldest one is discarded when full.
+
+        Args:
+            telegram (bytes/str): Telegram as received
+            reason (str): Counter name explaining why it is invalid
+        """
+        _telegram = bytes(telegram) if not isinstance(telegram, str) else telegram
+        with self._lock:
+            self.invalid_samples.append((time.time(), reason, _telegram))
+
+    def get_counter(self, counter):
+        """
+        Get the value of a counter.
+
+        Args:
+            counter (str): Counter name
+
+        Returns:
+            int: Counter value
+        """
+        return self.counters.get(counter, 0)
+
+    def snapshot(self):
+        """
+        Get a copy of every metric.
+
+        Returns:
+            dict: "time", "uptime", "counters" (name -> value), "timings" (stage -> histogram
+                  summary) and "invalid_samples" (list of (time, reason, hexadecimal telegram))
+        """
+        with self._lock:
+            return {"time": time.time(), "uptime": time.time() - self.start_time,
+                    "counters": dict(self.counters),
+                    "timings": {_stage: _histogram.to_dict() for _stage, _histogram in self.timings.items()},
+                    "invalid_samples": [(_time, _reason, _telegram.hex() if isinstance(_telegram, bytes) else _telegram)
+                                        for _time, _reason, _telegram in self.invalid_samples]}
+
+    def reset(self):
+        """Set every counter back to zero and clear the histograms and the invalid sample."""
+        with self._lock:
+            self.counters = dict.fromkeys(self.counters, 0)
+            self.timings = {_stage: IPRTimingHistogram() for _stage in self.timings}
+            self.invalid_samples.clear()
+            self.start_time = time.time()
+
+    def add_callback(self, callback):
+        """
+        Register an exporter called with every snapshot published by export.
+
+        Args:
+            callback (callable): Function taking the snapshot dict as single argument
+        """
+        self._callbacks.append(callback)
+
+    def export(self):
+        """Publish a snapshot to every registered callback."""
+        _snapshot = self.snapshot()
+        for _callback in self._callbacks:
+            _callback(_snapshot)
+
+    def start_periodic_export(self, interval):
+        """
+        Publish a snapshot to the callbacks at a fixed interval from a background thread.
+
+        Args:
+            interval (float): Time between two exports in seconds
+        """
+        self.stop_periodic_export()
+        self._export_stop.clear()
+        self._export_thread = threading.Thread(target=self._export_loop, args=(interval,),
+                                               name="IPRMetricsExport", daemon=True)
+        self._export_thread.start()
+
+    def stop_periodic_export(self):
+        """Stop the periodic export started by start_periodic_export."""
+        if self._export_thread is not None:
+            self._export_stop.set()
+            self._export_thread.join()
+            self._export_thread = None
+
+    def _export_loop(self, interval):
+        """Export thread: publish a snapshot every interval seconds."""
+        while not self._export_stop.wait(interval):
+            self.export()
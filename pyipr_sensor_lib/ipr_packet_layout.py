@@ -0,0 +1,173 @@
+from collections import namedtuple
+
+# Bits 0-32 of a telegram hold the header: ID (bits 0-1), ID CRC (bit 2), sequence (bits 3-5)
+# and timestamp (bits 6-32). The measurement fields start at bit 33 (byte 4, bit 1)
+HEADER_BITS = 33
+HEADER_BYTES = (HEADER_BITS + 7) // 8
+
+PacketField = namedtuple("PacketField", ("column", "byte", "shift", "width", "scale_range", "unit", "ignored_bits"),
+                         defaults=(0,))
+PacketField.__doc__ = """
+Bit layout of one measurement of a packet type.
+
+The field is stored least significant bit first from bit shift of byte byte of the unescaped
+telegram, continuing in the next bytes.
+
+Fields:
+    column (str): Column name in the results of ipr_batch_decoder.decode_batch
+    byte (int): Byte holding the least significant bit
+    shift (int): Position of the least significant bit in this byte (0-7)
+    width (int): Number of bits
+    scale_range (tuple): (in_min, in_max, out_min, out_max) converting the raw value to real units
+    unit (str): Unit of the scaled value
+    ignored_bits (int): Mask of the bits of the value that the decoders do not read (default: none),
+        the encoder still writes them
+"""
+
+
+def _field_parts(field, ignored_bits):
+    """(byte index, mask, shift) of each byte holding bits of a field, a positive shift moving bits left."""
+    _start = field.byte * 8 + field.shift
+    _parts = list()
+    for _index in range(_start // 8, (_start + field.width - 1) // 8 + 1):
+        _mask = 0
+        for _bit in range(field.width):
+            if (_start + _bit) // 8 == _index and not (ignored_bits >> _bit) & 1:
+                _mask |= 1 << ((_start + _bit) % 8)
+        if _mask:
+            _parts.append((_index, _mask, _index * 8 - _start))
+    return _parts
+
+
+def _field_expression(field, byte_format):
+    """Python expression extracting a field, the bytes being read with byte_format ("_b[{}]", ...)."""
+    _terms = list()
+    for _index, _mask, _shift in reversed(_field_parts(field, field.ignored_bits)):
+        _term = byte_format.format(_index)
+        if _mask != 0xFF:
+            _term = "({} & 0x{:02X})".format(_term, _mask)
+        if _shift > 0:
+            _term = "({} << {})".format(_term, _shift)
+        elif _shift < 0:
+            _term = "({} >> {})".format(_term, -_shift)
+        _terms.append(_term)
+    return " + ".join(_terms)
+
+
+class IPRPacketLayout:
+    """
+    Declarative layout of a packet type, compiled into its decoders and encoder.
+
+    The field table is turned once into the source code of two extractors, then compiled: a scalar
+    extractor made of the same shift and mask expressions as hand-written code, and a vectorized
+    extractor applying them to the columns of a byte matrix. The parser, the sample decoder, the
+    batch decoder and the encoder all use these extractors, so a packet type only has to be
+    described once to be decoded consistently everywhere.
+
+    Compiled extractors:
+        extract_into(_b, values, start=0): Write the raw values read from the unescaped telegram _b
+            (at least decode_width bytes) into values, from index start
+        extract_batch(_b): Return one numpy.ndarray of raw values per field, read from a
+            (telegrams x decode_width) signed integer matrix of unescaped bytes
+    """
+
+    def __init__(self, name, packet_id, fields):
+        """
+        Initialize the layout and compile its extractors.
+
+        Args:
+            name (str): Packet type name ("STRAIN", ...)
+            packet_id (int): ID stored in bits 0-1 of the telegram
+            fields (list): PacketField of each measurement, in the order of the decoded values
+
+        Raises:
+            ValueError: If a field overlaps the header or another field, or if the input range of
+                its scale range does not match its width: the scale tables are indexed by every raw
+                value the decoders can read
+        """
+        self.name = name
+        self.packet_id = packet_id
+        self.fields = tuple(fields)
+        self._check_fields()
+
+        self.columns = tuple(_field.column for _field in self.fields)
+        self.scale_ranges = tuple(_field.scale_range for _field in self.fields)
+        self.units = tuple(_field.unit for _field in self.fields)
+        # Unescaped bytes read by the extractors, and telegram length including the checksum: the
+        # decoders reject the shorter telegrams of the packet type
+        self.decode_width = max((_field.byte * 8 + _field.shift + _field.width + 7) // 8 for _field in self.fields)
+        self.telegram_length = self.decode_width + 1
+        self._pack_parts = tuple(_field_parts(_field, 0) for _field in self.fields)
+
+        _scalar = ["def extract_into(_b, values, start=0):"]
+        _scalar += ["    values[start{}] = {}".format(" + {}".format(_index) if _index else "",
+                                                   _field_expression(_field, "_b[{}]"))
+                    for _index, _field in enumerate(self.fields)]
+        _batch = ["def extract_batch(_b):", "    return ("]
+        _batch += ["        {},".format(_field_expression(_field, "_b[:, {}]")) for _field in self.fields]
+        _batch += ["    )"]
+        self.source = "\n".join(_scalar + [""] + _batch) + "\n"
+        _namespace = dict()
+        exec(compile(self.source, "<IPRPacketLayout {}>".format(name), "exec"), _namespace)
+        self.extract_into = _namespace["extract_into"]
+        self.extract_batch = _namespace["extract_batch"]
+
+    def pack_into(self, data, values):
+        """
+        Write the raw values of the packet type into the bytes of a telegram, inverse of extract_into.
+
+        The bits ignored by the decoders are written too. The arguments can be integers, or numpy
+        integer arrays to pack many telegrams at once.
+
+        Args:
+            data (list): Unescaped bytes of at least decode_width items, bits of the fields cleared
+            values (sequence): Raw value of each field
+        """
+        for _parts, _value in zip(self._pack_parts, values):
+            for _index, _mask, _shift in _parts:
+                data[_index] |= ((_value >> _shift) if _shift >= 0 else (_value << -_shift)) & _mask
+
+    def _check_fields(self):
+        """Check that the fields fit their ranges and use distinct bits after the header."""
+        _used = (1 << HEADER_BITS) - 1
+        for _field in self.fields:
+            if _field.scale_range[1] >= 1 << _field.width:
+                raise ValueError("{} {}: {} bits cannot hold {}".format(
+                    self.name, _field.column, _field.width, _field.scale_range[1]))
+            _max_raw = ((1 << _field.width) - 1) & ~_field.ignored_bits
+            if _field.scale_range[1] < _max_raw:
+                raise ValueError("{} {}: the scale range ends at {}, below the raw values up to {}".format(
+                    self.name, _field.column, _field.scale_range[1], _max_raw))
+            _bits = ((1 << _field.width) - 1) << (_field.byte * 8 + _field.shift)
+            if _used & _bits:
+                raise ValueError("{} {}: bits already used by the header or another field".format(
+                    self.name, _field.column))
+            _used |= _bits
+
+
+# Bit layouts of the packet types sent by the sensor
+STRAIN_LAYOUT = IPRPacketLayout("STRAIN", 0x00, (
+    PacketField("strain_x", 4, 1, 13, (1, 8191, -3000, 3000), "microstrain"),
+    PacketField("strain_y", 5, 6, 13, (1, 8191, -3000, 3000), "microstrain"),
+    PacketField("strain_z", 7, 3, 13, (1, 8191, -3000, 3000), "microstrain"),
+    PacketField("strain_p1", 9, 0, 13, (1, 8191, -3000, 3000), "microstrain"),
+    PacketField("strain_p2", 10, 5, 13, (1, 8191, -3000, 3000), "microstrain", 0x0700),
+    PacketField("strain_angle", 12, 2, 13, (1, 8191, -90, 90), "degree"),
+))
+ENVIRONMENT_LAYOUT = IPRPacketLayout("ENVIRONMENT", 0x01, (
+    PacketField("env_vbat", 4, 1, 9, (1, 511, 0, 4), "V", 0x0080),
+    PacketField("env_pres", 5, 2, 14, (1, 16383, 0, 1200), "hPa"),
+    PacketField("env_humi", 7, 0, 10, (1, 1023, 0, 100), "%"),
+    PacketField("env_temp", 8, 2, 11, (1, 2047, -60, 115), "degC"),
+))
+ACCELERATION_LAYOUT = IPRPacketLayout("ACCELERATION", 0x02, (
+    PacketField("accel_x", 4, 1, 12, (1, 4095, -16, 16), "g"),
+    PacketField("accel_y", 5, 5, 12, (1, 4095, -16, 16), "g"),
+    PacketField("accel_z", 7, 1, 12, (1, 4095, -16, 16), "g"),
+))
+
+# Packet types known by the decoders, in ID order
+PACKET_LAYOUTS = (STRAIN_LAYOUT, ENVIRONMENT_LAYOUT, ACCELERATION_LAYOUT)
+# Packet ID (0-3) mapped to its layout, None for the IDs without a packet type
+PACKET_LAYOUTS_BY_ID = tuple(next((_layout for _layout in PACKET_LAYOUTS if _layout.packet_id == _id), None)
+                             for _id in range(4))
@@ -1,4 +1,47 @@
 from array import array
+from collections import deque
+
+from pyipr_sensor_lib.ipr_packet_layout import (PACKET_LAYOUTS, PACKET_LAYOUTS_BY_ID, STRAIN_LAYOUT,
+                                                ENVIRONMENT_LAYOUT, ACCELERATION_LAYOUT)
+
+
+def unescape_telegram(data, out=None):
+    """
+    Remove the escape sequences from a binary telegram.
+
+    Escape sequences:
+    0x07 0x55 -> 0x08
+    0x07 0xAA -> 0x07
+    Any other byte following 0x07 is dropped along with it.
+
+    Args:
+        data (bytes/bytearray/memoryview): Telegram as received, without the 0x08 separator
+        out (bytearray): Buffer receiving the result, cleared first (default: new bytearray)
+
+    Returns:
+        bytearray: Unescaped telegram
+    """
+    if out is None:
+        out = bytearray()
+    else:
+        out.clear()
+    if len(data) < 2 or IPRParser.TELEGRAM_ESCAPE not in data:
+        out.extend(data)
+        return out
+
+    _escape_found = False
+    for current_byte in data:
+        if _escape_found:
+            _escape_found = False
+            if current_byte == IPRParser.ESCAPED_SEPARATOR:
+                out.append(IPRParser.TELEGRAM_SEPARATOR)
+            elif current_byte == IPRParser.ESCAPED_ESCAPE:
+                out.append(IPRParser.TELEGRAM_ESCAPE)
+        elif current_byte == IPRParser.TELEGRAM_ESCAPE:
+            _escape_found = True
+        else:
+            out.append(current_byte)
+    return out
 
 
 class IPRParser:
@@ -9,26 +52,54 @@ class IPRParser:
     - Acceleration data
     """
 
-    # Minimum required length for different packet types
+    # Minimum required length for different packet types (in hexadecimal characters)
     MIN_PACKET_LENGTH_STRAIN = 27
     MIN_PACKET_LENGTH_ENVIRONMENT = 20
     MIN_PACKET_LENGTH_ACCELERATION = 20
 
-    def __init__(self, packet=0):
+    # Minimum required length of a telegram and of the different packet types, once unescaped (in bytes):
+    # the telegram length of each layout, measurements and checksum included
+    MIN_TELEGRAM_BYTES = min(_layout.telegram_length for _layout in PACKET_LAYOUTS)
+    MIN_PACKET_BYTES_STRAIN = STRAIN_LAYOUT.telegram_length
+    MIN_PACKET_BYTES_ENVIRONMENT = ENVIRONMENT_LAYOUT.telegram_length
+    MIN_PACKET_BYTES_ACCELERATION = ACCELERATION_LAYOUT.telegram_length
+
+    # Escape byte: 0x07 0x55 encodes the 0x08 separator and 0x07 0xAA encodes 0x07
+    TELEGRAM_SEPARATOR = 0x08
+    TELEGRAM_ESCAPE = 0x07
+    ESCAPED_SEPARATOR = 0x55
+    ESCAPED_ESCAPE = 0xAA
+
+    # Conversion ranges (in_min, in_max, out_min, out_max) of each channel, in the order of the raw arrays,
+    # declared with the bit layouts in ipr_packet_layout
+    SCALE_RANGES_STRAIN = STRAIN_LAYOUT.scale_ranges
+    SCALE_RANGES_ENVIRONMENT = ENVIRONMENT_LAYOUT.scale_ranges
+    SCALE_RANGES_ACCELERATION = ACCELERATION_LAYOUT.scale_ranges
+
+    # Number of invalid telegrams kept in invalid_data_list
+    INVALID_DATA_LIST_SIZE = 100
+
+    # Lookup tables without calibration, built on first use by get_default_scale_tables
+    _default_scale_tables = None
+
+    def __init__(self, packet=0, scale_tables=None):
         """
         Initialize the parser with optional packet data.
 
         Args:
             packet: Initial packet data (default: 0)
+            scale_tables (dict): Lookup tables used to scale the raw values, as returned by
+                build_scale_tables (default: tables without calibration)
         """
-        # Store raw byte data and track invalid packets
-        self._byte_data = list()
-        self.invalid_data_list = list()
+        # Store unescaped byte data (reused for every telegram) and track invalid packets,
+        # keeping only the last ones so that a long-lived parser does not grow without limit
+        self._byte_data = bytearray()
+        self.invalid_data_list = deque(maxlen=self.INVALID_DATA_LIST_SIZE)
         self.invalid_data_number = 0
 
         # Header information arrays
-        # [ID, ID_CRC, Sequence, Timestamp]
-        self.raw_header = array('f', [-1, -1, -1, -1])
+        # [ID, ID_CRC, Sequence, Timestamp], integers: a float32 cannot hold a 27-bit timestamp exactly
+        self.raw_header = array('l', [-1, -1, -1, -1])
         self.packet_type = None
 
         # Raw measurement arrays
@@ -44,19 +115,42 @@ class IPRParser:
         self.scaled_env = array('f', [-1, -1, -1, -1])
         self.scaled_acc = array('f', [-1, -1, -1])
 
+        self.scale_tables = scale_tables if scale_tables is not None else self.get_default_scale_tables()
         self.packet = packet
 
     def parser_set_packet(self, packet):
         """Set a new packet for parsing."""
         self.packet = packet
 
+    def reset(self, packet, scale_tables=None):
+        """
+        Prepare the parser for a new telegram, reusing its buffers and arrays.
+
+        A single parser can decode a whole stream without allocating anything per telegram. The
+        measurement arrays keep the values of the previous telegram until they are decoded again,
+        and invalid_data_list keeps the last invalid telegrams of the stream.
+
+        Args:
+            packet: Telegram to parse next
+            scale_tables (dict): Lookup tables used to scale the raw values (default: unchanged)
+        """
+        self.packet = packet
+        self.packet_type = None
+        if scale_tables is not None:
+            self.scale_tables = scale_tables
+
     @staticmethod
     def parser_compute_crc(byte0):
         """
         Compute CRC (Cyclic Redundancy Check) for the first byte.
         Returns XOR of bits 1 and 0 of BYTE 0.
+
+        Args:
+            byte0 (int/str): First byte as integer, or as 2-character hexadecimal string
         """
-        return bool(int(byte0, 16) & 0x02) ^ bool(int(byte0, 16) & 0x01)
+        if isinstance(byte0, str):
+            byte0 = int(byte0, 16)
+        return bool(byte0 & 0x02) ^ bool(byte0 & 0x01)
 
     @staticmethod
     def convert_numeric_to_scale(value_to_convert, in_min, in_max, out_min, out_max):
@@ -81,92 +175,144 @@ class IPRParser:
             _interpolation = _slope * value_to_convert + _offset
         return _interpolation
 
+    @classmethod
+    def build_scale_table(cls, scale_range, tare=0.0, gain=1.0, offset=0.0):
+        """
+        Build the lookup table converting every possible raw value of a channel to real units.
+
+        The calibration is folded into the table: value = (scaled - tare) * gain + offset.
+        A raw value of 0 still converts to 0.
+
+        Args:
+            scale_range (tuple): (in_min, in_max, out_min, out_max) of the channel
+            tare (float): Tare subtracted from the scaled value
+            gain (float): Gain applied after the tare
+            offset (float): Offset added after the gain
+
+        Returns:
+            array: Scaled value (float32) for each raw value from 0 to in_max
+        """
+        _in_min, _in_max, _out_min, _out_max = scale_range
+        _table = array('f', [(cls.convert_numeric_to_scale(_raw, _in_min, _in_max, _out_min, _out_max) - tare)
+                             * gain + offset for _raw in range(_in_max + 1)])
+        _table[0] = 0
+        return _table
+
+    @classmethod
+    def build_scale_tables(cls, strain_tare=(0.0, 0.0, 0.0), strain_gain=(1.0, 1.0, 1.0),
+                           strain_offset=(0.0, 0.0, 0.0)):
+        """
+        Build the lookup tables of every channel.
+
+        The calibration only applies to strain X, Y and Z.
+
+        Args:
+            strain_tare (tuple): Tare of strain X, Y and Z in microstrain
+            strain_gain (tuple): Gain of strain X, Y and Z
+            strain_offset (tuple): Offset of strain X, Y and Z in microstrain
+
+        Returns:
+            dict: Packet type name ("STRAIN", "ENVIRONMENT", "ACCELERATION") mapped to a tuple
+                  holding one lookup table per channel, in the order of the raw arrays
+        """
+        _strain = [cls.build_scale_table(cls.SCALE_RANGES_STRAIN[_axis], strain_tare[_axis],
+                                         strain_gain[_axis], strain_offset[_axis]) for _axis in range(3)]
+        _strain += [cls.build_scale_table(_range) for _range in cls.SCALE_RANGES_STRAIN[3:]]
+        return {"STRAIN": tuple(_strain),
+                "ENVIRONMENT": tuple(cls.build_scale_table(_range) for _range in cls.SCALE_RANGES_ENVIRONMENT),
+                "ACCELERATION": tuple(cls.build_scale_table(_range) for _range in cls.SCALE_RANGES_ACCELERATION)}
+
+    @classmethod
+    def get_default_scale_tables(cls):
+        """
+        Get the lookup tables without calibration, shared by all the parsers.
+
+        Returns:
+            dict: Lookup tables, as returned by build_scale_tables
+        """
+        if IPRParser._default_scale_tables is None:
+            IPRParser._default_scale_tables = cls.build_scale_tables()
+        return IPRParser._default_scale_tables
+
+    def parser_unescape(self, _data):
+        """
+        Remove the escape sequences from a binary telegram.
+        Stores results in self._byte_data, which is reused from one telegram to the next.
+
+        Escape sequences:
+        0x07 0x55 -> 0x08
+        0x07 0xAA -> 0x07
+
+        Args:
+            _data (bytes/bytearray/memoryview): Telegram as received, without the 0x08 separator
+
+        Returns:
+            bytearray: Unescaped telegram
+        """
+        return unescape_telegram(_data, self._byte_data)
+
     def parser_hex_to_byte(self, _data, _length):
         """
-        Convert hexadecimal string to bytes, processing two characters at a time.
+        Convert hexadecimal string to bytes and remove the escape sequences.
         Stores results in self._byte_data.
+
+        Compatibility wrapper around parser_unescape for telegrams given as hexadecimal strings.
         """
-        self._byte_data = list()
-        for i in range(0, _length, 2):
-            self._byte_data.append(_data[i:i + 2])
-
-        if len(self._byte_data) >= 2:
-            previous_byte = '00'
-            new_byte_list = list()
-            for current_byte in self._byte_data:
-                if previous_byte == '07':
-                    previous_byte = '00'
-                    if current_byte == '55':
-                        new_byte_list.append('08')
-                    elif current_byte == 'aa':
-                        new_byte_list.append('07')
-                else:
-                    if current_byte == '07':
-                        previous_byte = current_byte
-                    else:
-                        new_byte_list.append(current_byte)
-
-            self._byte_data = new_byte_list.copy()
+        self.parser_unescape(bytes.fromhex(_data[:_length]))
 
     def parser_check_telegram_validity(self, telegram):
         """
         Validate incoming telegram data.
+        Unescapes the telegram into self._byte_data first, so that the checks apply to the bytes
+        sent by the sensor: the first byte itself may have been escaped.
 
         Checks:
-        1. Minimum length
+        1. Minimum length (of the shortest packet type)
         2. Valid CRC
 
+        Args:
+            telegram (bytes/bytearray/memoryview/str): Telegram as bytes, or as hexadecimal string
+
         Returns:
             bool: True if telegram is valid, False otherwise
         """
-        _is_valid = False
-        if len(telegram) >= 1:
-            self.parser_hex_to_byte(telegram, 2)  # Convert first byte for CRC check
-            _id_crc_computed = self.parser_compute_crc(self._byte_data[0])
-
-            if (self.parser_get_id_crc() != _id_crc_computed) or (len(telegram) <= 20):
-                self.invalid_data_list.append(telegram)
-                self.invalid_data_number += 1
-            else:
-                _is_valid = True
+        if isinstance(telegram, str):
+            self.parser_hex_to_byte(telegram, len(telegram))
         else:
+            self.parser_unescape(telegram)
+        _is_valid = (len(self._byte_data) >= self.MIN_TELEGRAM_BYTES and
+                     self.parser_get_id_crc() == self.parser_compute_crc(self._byte_data[0]))
+        if not _is_valid:
             self.invalid_data_list.append(telegram)
             self.invalid_data_number += 1
-
         return _is_valid
 
     def parser_get_id(self):
         """Extract telegram ID from first two bits of BYTE 0."""
-        self.raw_header[0] = int(self._byte_data[0], 16) & 0x03
+        self.raw_header[0] = self._byte_data[0] & 0x03
         return self.raw_header[0]
 
     def parser_get_id_name(self):
         """
         Convert telegram ID to packet type name.
 
-        ID mapping:
+        ID mapping (see ipr_packet_layout.PACKET_LAYOUTS):
         0x00 -> STRAIN
         0x01 -> ENVIRONMENT
         0x02 -> ACCELERATION
         """
-        if self.parser_get_id() == 0x00:
-            self.packet_type = "STRAIN"
-        elif self.parser_get_id() == 0x01:
-            self.packet_type = "ENVIRONMENT"
-        elif self.parser_get_id() == 0x02:
-            self.packet_type = "ACCELERATION"
-        else:
-            self.packet_type = "PACKET ERROR"
+        _layout = PACKET_LAYOUTS_BY_ID[self.parser_get_id()]
+        self.packet_type = _layout.name if _layout is not None else "PACKET ERROR"
         return self.packet_type
 
     def parser_get_id_crc(self):
         """Extract CRC bit (3rd bit) from BYTE 0."""
-        self.raw_header[1] = (int(self._byte_data[0], 16) & 0x04) >> 2
+        self.raw_header[1] = (self._byte_data[0] & 0x04) >> 2
         return self.raw_header[1]
 
     def parser_get_sequence(self):
         """Extract sequence number bits from BYTE 0."""
-        self.raw_header[2] = int(self._byte_data[0], 16) & 0x38
+        self.raw_header[2] = self._byte_data[0] & 0x38
         return self.raw_header[2]
 
     def parser_get_timestamp(self):
@@ -174,11 +320,12 @@ class IPRParser:
         Extract timestamp from header bytes.
         Combines bits from BYTE 0-4 to form complete timestamp.
         """
-        self.raw_header[3] = (((int(self._byte_data[4], 16) & 0x01) << 26) +
-                              (int(self._byte_data[3], 16) << 18) +
-                              (int(self._byte_data[2], 16) << 10) +
-                              (int(self._byte_data[1], 16) << 2) +
-                              ((int(self._byte_data[0], 16) & 0xC0) >> 6))
+        _b = self._byte_data
+        self.raw_header[3] = (((_b[4] & 0x01) << 26) +
+                              (_b[3] << 18) +
+                              (_b[2] << 10) +
+                              (_b[1] << 2) +
+                              ((_b[0] & 0xC0) >> 6))
         return self.raw_header[3]
 
     def parser_get_header(self):
@@ -196,18 +343,8 @@ class IPRParser:
         - Principal strains P1, P2 (indexes 3-4)
         - Angle (index 5)
         """
-        # Extract strain XYZ from bytes 4-8
-        self.raw_strain[0] = ((int(self._byte_data[5], 16) & 0x3F) << 7) + ((int(self._byte_data[4], 16) & 0xFE) >> 1)
-        self.raw_strain[1] = ((int(self._byte_data[7], 16) & 0x07) << 10) + (int(self._byte_data[6], 16) << 2) + (
-                    (int(self._byte_data[5], 16) & 0xC0) >> 6)
-        self.raw_strain[2] = (int(self._byte_data[8], 16) << 5) + ((int(self._byte_data[7], 16) & 0xF8) >> 3)
-
-        # Extract principal strains and angle from bytes 9-13
-        self.raw_strain[3] = ((int(self._byte_data[10], 16) & 0x1F) << 8) + int(self._byte_data[9], 16)
-        self.raw_strain[4] = (
-                    ((int(self._byte_data[12], 16) & 0x03) << 11) + ((int(self._byte_data[11], 16) & 0x1F) << 3) + (
-                        (int(self._byte_data[10], 16) & 0xE0) >> 5))
-        self.raw_strain[5] = ((int(self._byte_data[13], 16) & 0x7F) << 6) + ((int(self._byte_data[12], 16) & 0xFC) >> 2)
+        # XYZ from bytes 4-8, principal strains and angle from bytes 9-13 (see STRAIN_LAYOUT)
+        STRAIN_LAYOUT.extract_into(self._byte_data, self.raw_strain)
         return self.raw_strain
 
     def parser_get_environment(self):
@@ -219,10 +356,7 @@ class IPRParser:
         - Humidity (index 2)
         - Temperature (index 3)
         """
-        self.raw_env[0] = ((int(self._byte_data[5], 16) & 0x02) << 7) + ((int(self._byte_data[4], 16) & 0xFE) >> 1)
-        self.raw_env[1] = (int(self._byte_data[6], 16) << 6) + ((int(self._byte_data[5], 16) & 0xFC) >> 2)
-        self.raw_env[2] = ((int(self._byte_data[8], 16) & 0x03) << 8) + int(self._byte_data[7], 16)
-        self.raw_env[3] = ((int(self._byte_data[9], 16) & 0x1F) << 6) + ((int(self._byte_data[8], 16) & 0xFC) >> 2)
+        ENVIRONMENT_LAYOUT.extract_into(self._byte_data, self.raw_env)
         return self.raw_env
 
     def parser_get_acceleration(self):
@@ -230,17 +364,15 @@ class IPRParser:
         Extract acceleration measurements from packet.
         Returns array containing XYZ acceleration values.
         """
-        self.raw_acc[0] = ((int(self._byte_data[5], 16) & 0x1F) << 7) + ((int(self._byte_data[4], 16) & 0xFE) >> 1)
-        self.raw_acc[1] = ((int(self._byte_data[7], 16) & 0x01) << 11) + (int(self._byte_data[6], 16) << 3) + (
-                    (int(self._byte_data[5], 16) & 0xE0) >> 5)
-        self.raw_acc[2] = ((int(self._byte_data[8], 16) & 0x1F) << 7) + ((int(self._byte_data[7], 16) & 0xFE) >> 1)
+        ACCELERATION_LAYOUT.extract_into(self._byte_data, self.raw_acc)
         return self.raw_acc
 
     def parser_scale_strain_xyz(self):
         """Convert raw strain XYZ values to microstrain units (-3000 to 3000)."""
-        self.scaled_strain[0] = self.convert_numeric_to_scale(self.raw_strain[0], 1, 8191, -3000, 3000)
-        self.scaled_strain[1] = self.convert_numeric_to_scale(self.raw_strain[1], 1, 8191, -3000, 3000)
-        self.scaled_strain[2] = self.convert_numeric_to_scale(self.raw_strain[2], 1, 8191, -3000, 3000)
+        _tables = self.scale_tables["STRAIN"]
+        self.scaled_strain[0] = _tables[0][int(self.raw_strain[0])]
+        self.scaled_strain[1] = _tables[1][int(self.raw_strain[1])]
+        self.scaled_strain[2] = _tables[2][int(self.raw_strain[2])]
         return self.scaled_strain
 
     def parser_scale_strain_p1p2(self):
@@ -249,9 +381,10 @@ class IPRParser:
         - P1, P2: microstrain (-3000 to 3000)
         - Angle: degrees (-90 to 90)
         """
-        self.scaled_strain[3] = self.convert_numeric_to_scale(self.raw_strain[3], 1, 8191, -3000, 3000)
-        self.scaled_strain[4] = self.convert_numeric_to_scale(self.raw_strain[4], 1, 8191, -3000, 3000)
-        self.scaled_strain[5] = self.convert_numeric_to_scale(self.raw_strain[5], 1, 8191, -90, 90)
+        _tables = self.scale_tables["STRAIN"]
+        self.scaled_strain[3] = _tables[3][int(self.raw_strain[3])]
+        self.scaled_strain[4] = _tables[4][int(self.raw_strain[4])]
+        self.scaled_strain[5] = _tables[5][int(self.raw_strain[5])]
         return self.scaled_strain
 
     def parser_scale_environment(self):
@@ -262,15 +395,17 @@ class IPRParser:
         - Humidity: % (0 to 100)
         - Temperature: °C (-60 to 115)
         """
-        self.scaled_env[0] = self.convert_numeric_to_scale(self.raw_env[0], 1, 511, 0, 4)
-        self.scaled_env[1] = self.convert_numeric_to_scale(self.raw_env[1], 1, 16383, 0, 1200)
-        self.scaled_env[2] = self.convert_numeric_to_scale(self.raw_env[2], 1, 1023, 0, 100)
-        self.scaled_env[3] = self.convert_numeric_to_scale(self.raw_env[3], 1, 2047, -60, 115)
+        _tables = self.scale_tables["ENVIRONMENT"]
+        self.scaled_env[0] = _tables[0][int(self.raw_env[0])]
+        self.scaled_env[1] = _tables[1][int(self.raw_env[1])]
+        self.scaled_env[2] = _tables[2][int(self.raw_env[2])]
+        self.scaled_env[3] = _tables[3][int(self.raw_env[3])]
         return self.scaled_env
 
     def parser_scale_acceleration(self):
         """Convert raw acceleration values to g units (-16g to 16g)."""
-        self.scaled_acc[0] = self.convert_numeric_to_scale(self.raw_acc[0], 1, 4095, -16, 16)
-        self.scaled_acc[1] = self.convert_numeric_to_scale(self.raw_acc[1], 1, 4095, -16, 16)
-        self.scaled_acc[2] = self.convert_numeric_to_scale(self.raw_acc[2], 1, 4095, -16, 16)
-        return self.scaled_acc
\ No newline at end of file
+        _tables = self.scale_tables["ACCELERATION"]
+        self.scaled_acc[0] = _tables[0][int(self.raw_acc[0])]
+        self.scaled_acc[1] = _tables[1][int(self.raw_acc[1])]
+        self.scaled_acc[2] = _tables[2][int(self.raw_acc[2])]
+        return self.scaled_acc
@@ -0,0 +1,90 @@
+from collections import namedtuple
+
+from pyipr_sensor_lib.ipr_packet_layout import PACKET_LAYOUTS, PACKET_LAYOUTS_BY_ID
+from pyipr_sensor_lib.ipr_parser import IPRParser, unescape_telegram
+
+# Immutable records returned by decode(), one per packet type
+StrainSample = namedtuple("StrainSample", ("timestamp", "sequence", "x", "y", "z", "p1", "p2", "angle"))
+StrainSample.__doc__ = "Strain packet: XYZ strain and principal strains P1, P2 in microstrain, angle in degrees"
+EnvSample = namedtuple("EnvSample", ("timestamp", "sequence", "vbat", "pressure", "humidity", "temperature"))
+EnvSample.__doc__ = "Environment packet: battery voltage (V), pressure (hP), humidity (%) and temperature (°C)"
+AccelSample = namedtuple("AccelSample", ("timestamp", "sequence", "x", "y", "z"))
+AccelSample.__doc__ = "Acceleration packet: XYZ acceleration in g"
+
+# Packet type IDs returned by decode_into, same values as IPRSensorDecoder.TYPE_*
+TYPE_INVALID = -1
+TYPE_STRAIN = 0
+TYPE_ENVIRONMENT = 1
+TYPE_ACCELERATION = 2
+
+# Size of the buffer needed by decode_into: timestamp, sequence and up to 6 measurements
+DECODE_BUFFER_LENGTH = 2 + max(len(_layout.fields) for _layout in PACKET_LAYOUTS)
+
+_SAMPLE_TYPES = (StrainSample, EnvSample, AccelSample)
+
+
+def decode_into(telegram, values, scale_tables=None, scaled=True):
+    """
+    Decode a binary telegram into a buffer supplied by the caller.
+
+    The function keeps no state and the lookup tables are only read, so it can be called from
+    several threads at once. No parser object or intermediate buffer is created for telegrams
+    without escape sequences.
+
+    Args:
+        telegram (bytes/bytearray/memoryview): Telegram without the 0x08 separator
+        values: Mutable sequence of at least DECODE_BUFFER_LENGTH items (list, array('d'), ...)
+            receiving [timestamp, sequence, measurements...] in the order of the raw arrays of IPRParser
+        scale_tables (dict): Lookup tables, as returned by IPRParser.build_scale_tables
+            (default: tables without calibration)
+        scaled (bool): Whether to write scaled values (default True) or raw sensor values
+
+    Returns:
+        int: TYPE_STRAIN, TYPE_ENVIRONMENT or TYPE_ACCELERATION, or TYPE_INVALID if the unescaped
+             telegram is too short for its packet type or its ID CRC is wrong
+    """
+    _b = telegram if IPRParser.TELEGRAM_ESCAPE not in telegram else unescape_telegram(telegram)
+    _length = len(_b)
+    if _length < IPRParser.MIN_TELEGRAM_BYTES:
+        return TYPE_INVALID
+    _byte0 = _b[0]
+    if (_byte0 & 0x04) >> 2 != ((_byte0 >> 1) ^ _byte0) & 0x01:
+        return TYPE_INVALID
+
+    _packet_type = _byte0 & 0x03
+    _layout = PACKET_LAYOUTS_BY_ID[_packet_type]
+    if _layout is None or _length < _layout.telegram_length:
+        return TYPE_INVALID
+    _layout.extract_into(_b, values, 2)
+
+    values[0] = ((_b[4] & 0x01) << 26) + (_b[3] << 18) + (_b[2] << 10) + (_b[1] << 2) + ((_byte0 & 0xC0) >> 6)
+    values[1] = _byte0 & 0x38
+    if scaled:
+        _tables = (scale_tables if scale_tables is not None else IPRParser.get_default_scale_tables())[_layout.name]
+        for _index, _table in enumerate(_tables, 2):
+            values[_index] = _table[int(values[_index])]
+    return _packet_type
+
+
+def decode(telegram, scale_tables=None, scaled=True):
+    """
+    Decode a binary telegram into an immutable record.
+
+    Unlike IPRSensorDecoder.analyse_packet, no decoder state is modified: the function can be
+    used from several threads at once and the record stays valid after the next telegram.
+
+    Args:
+        telegram (bytes/bytearray/memoryview): Telegram without the 0x08 separator
+        scale_tables (dict): Lookup tables, as returned by IPRParser.build_scale_tables
+            (default: tables without calibration)
+        scaled (bool): Whether to return scaled values (default True) or raw sensor values
+
+    Returns:
+        StrainSample/EnvSample/AccelSample: Decoded packet, or None if the telegram is invalid
+    """
+    _values = [0] * DECODE_BUFFER_LENGTH
+    _packet_type = decode_into(telegram, _values, scale_tables, scaled)
+    if _packet_type == TYPE_INVALID:
+        return None
+    _sample_type = _SAMPLE_TYPES[_packet_type]
+    return _sample_type._make(_values[:len(_sample_type._fields)])
@@ -1,4 +1,11 @@
+from time import perf_counter
+
 from pyipr_sensor_lib.ipr_parser import *
+from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+from pyipr_sensor_lib.ipr_metrics import IPRMetrics
+
+# Global configuration flags for debugging purposes
+DEBUG_MODE = False  # Enable/disable the report of packets too short for their type
 
 
 class IPRSensorDecoder:
@@ -36,7 +43,12 @@ class IPRSensorDecoder:
     TYPE_ENVIRONMENT = 1  # Environmental measurement packet
     TYPE_ACCELERATION = 2  # Acceleration measurement packet
 
-    def __init__(self):
+    # Metrics counter of the packets too short for their type
+    _SHORT_PACKET_COUNTERS = {"STRAIN": IPRMetrics.SHORT_PACKETS_STRAIN,
+                              "ENVIRONMENT": IPRMetrics.SHORT_PACKETS_ENVIRONMENT,
+                              "ACCELERATION": IPRMetrics.SHORT_PACKETS_ACCELERATION}
+
+    def __init__(self, metrics=None, continuity_tracker=None):
         """
         Initialize the IPR sensor decoder with default values and required objects.
 
@@ -45,14 +57,21 @@ class IPRSensorDecoder:
         - Parser object for processing IPR packets
         - Packet type tracking
         - Packet validity flag
+        - Scaling lookup tables (without calibration until set_calibration is called)
+
+        Args:
+            metrics (IPRMetrics): Metrics updated by analyse_packet and decode_batch (default: none)
+            continuity_tracker (IPRContinuityTracker): Tracker of the lost, duplicated and
+                out-of-order packets, updated by analyse_packet and decode_batch (default: none)
         """
         self._list_of_data = 0
-        self.ipr_parser_obj = IPRParser()  # Initialize parser for IPR packets
+        self.metrics = metrics
+        self.continuity_tracker = continuity_tracker
+        self.scale_tables = IPRParser.get_default_scale_tables()
+        self.ipr_parser_obj = IPRParser(0, self.scale_tables)  # Parser reused for every IPR packet
         self.packet_type = 0  # Track current packet type
         self.is_packet_valid = False  # Flag for packet validation status
 
-        print("Initiating IPRSensorDecoder -> DONE")
-
     def load_from_binary_file(self, filepath, filename):
         """
         Read and decode IPR sensor data from a binary file.
@@ -65,25 +84,83 @@ class IPRSensorDecoder:
             filename (str): Name of the binary file to process
 
         Returns:
-            list: List of telegrams extracted from the file, each telegram represents
-                 a separate sensor measurement
+            list: List of telegrams extracted from the file as hexadecimal strings, each telegram
+                 represents a separate sensor measurement
+
+        Notes:
+            - Kept for compatibility, load_telegrams_from_binary_file returns the telegrams as bytes
+              and avoids the conversion to hexadecimal strings
+        """
+        return [_telegram.hex() for _telegram in self.load_telegrams_from_binary_file(filepath, filename)]
+
+    def load_telegrams_from_binary_file(self, filepath, filename):
+        """
+        Read IPR sensor data from a binary file and split it into binary telegrams.
+
+        Args:
+            filepath (str): Path to the directory containing the file
+            filename (str): Name of the binary file to process
+
+        Returns:
+            list: List of telegrams (bytes) extracted from the file, without the '0x08' separator.
+                 Data following the last separator is incomplete and is not returned
         """
         # Open file in binary read mode
         with open(filepath + filename, 'rb') as file:
             file_content = file.read()
 
-        # Process content into telegrams
-        packet_list = list()
-        tmp_str = ""
-        # Split data on 0x08 marker bytes
-        for byte_data in file_content:
-            if byte_data == 0x8:  # Check for telegram separator
-                packet_list.append(tmp_str)
-                tmp_str = ""
-            else:
-                tmp_str += f"{byte_data:02x}"  # Convert bytes to hex string
+        # Split data on 0x08 marker bytes, the last element is an incomplete telegram
+        return file_content.split(b'\x08')[:-1]
+
+    def decode_batch(self, raw_data, scaled=True):
+        """
+        Decode a whole block of raw sensor data at once into columnar arrays.
+
+        Faster alternative to calling analyse_packet for every telegram returned by
+        load_from_binary_file: the raw bytes are framed, unescaped, validated and decoded
+        with vectorized operations.
+
+        Args:
+            raw_data (bytes/bytearray/memoryview): Raw binary data as received from the sensor
+            scaled (bool): Whether to return scaled values (default True)
+
+        Returns:
+            dict: Packet type name ("STRAIN", "ENVIRONMENT", "ACCELERATION") mapped to a dict of
+                  column name -> numpy.ndarray (see ipr_batch_decoder.decode_batch)
+        """
+        if self.continuity_tracker is None:
+            return decode_batch(raw_data, scaled, self.scale_tables, self.metrics)
+        _headers = dict()
+        _result = decode_batch(raw_data, scaled, self.scale_tables, self.metrics, _headers)
+        self.continuity_tracker.update_batch(_headers)
+        return _result
+
+    def get_continuity_report(self):
+        """
+        Get the packet loss statistics of the decoded packets.
+
+        Returns:
+            dict: Packet type name mapped to its statistics (see IPRContinuityTracker.get_report),
+                  or None if the decoder has no continuity tracker
+        """
+        if self.continuity_tracker is None:
+            return None
+        return self.continuity_tracker.get_report()
+
+    def set_calibration(self, calibration):
+        """
+        Apply a strain calibration to the scaled values of the next packets.
 
-        return packet_list
+        The calibration is folded into the scaling lookup tables once, so calibrated values
+        are computed as fast as uncalibrated ones.
+
+        Args:
+            calibration (IPRCalibration): Calibration of the sensor, or None to remove it
+        """
+        if calibration is None:
+            self.scale_tables = IPRParser.get_default_scale_tables()
+        else:
+            self.scale_tables = calibration.build_scale_tables()
 
     def save_binary_data(self, filepath, filename, raw_data):
         """
@@ -99,6 +176,7 @@ class IPRSensorDecoder:
             - Creates new file if it doesn't exist
             - Appends to existing file if it exists
             - Preserves binary format of the data
+            - Opens and closes the file on every call, use IPRCaptureWriter for continuous recording
 
         Raises:
             Exception: Captures and reports file operation errors (permissions, disk space, etc.)
@@ -114,62 +192,99 @@ class IPRSensorDecoder:
         Analyze and decode an IPR sensor packet based on its type.
 
         This method:
-        1. Creates a new parser instance for the packet
-        2. Validates the telegram format
-        3. Converts hex to bytes and extracts header
+        1. Resets the parser of the decoder for the packet, reusing its buffers
+        2. Removes escape sequences and validates the telegram format
+        3. Extracts header
         4. Identifies packet type (strain/environment/acceleration)
         5. Processes data according to packet type
         6. Sets validity flag based on successful processing
 
         Args:
-            packet: Raw packet data to analyze
+            packet (bytes/bytearray/memoryview/str): Raw telegram without the 0x08 separator,
+                as bytes or as hexadecimal string
 
         Notes:
-            - Different packet types have different minimum length requirements
+            - Different packet types have different minimum length requirements, checked like the
+              ID CRC on the unescaped telegram
             - Sets is_packet_valid flag to indicate successful processing
             - Handles three types of measurements: strain, environment, and acceleration
+            - When metrics are set, counts the invalid packets and times the unescape, decode
+              and scale stages
+            - When a continuity tracker is set, valid packets and packets too short for their type
+              update the packet loss statistics, the latter counted as invalid
         """
-        self.ipr_parser_obj = IPRParser(packet)
-
-        # Validate telegram format
-        if self.ipr_parser_obj.parser_check_telegram_validity(packet):
-            # Convert hex to bytes and extract header
-            self.ipr_parser_obj.parser_hex_to_byte(packet, len(packet))
-            self.ipr_parser_obj.parser_get_header()
-
-            # Process based on packet type
-            if self.ipr_parser_obj.parser_get_id_name() == "STRAIN":
-                if len(packet) >= self.ipr_parser_obj.MIN_PACKET_LENGTH_STRAIN:
-                    self.packet_type = self.TYPE_STRAIN
-                    self.ipr_parser_obj.parser_get_strain()
-                    self.ipr_parser_obj.parser_scale_strain_xyz()
-                    self.ipr_parser_obj.parser_scale_strain_p1p2()
-                    self.is_packet_valid = True
-                else:
-                    self.is_packet_valid = False
-                    print("STRAIN: Data string too short to be process")
-
-            elif self.ipr_parser_obj.parser_get_id_name() == "ENVIRONMENT":
-                if len(packet) >= self.ipr_parser_obj.MIN_PACKET_LENGTH_ENVIRONMENT:
-                    self.packet_type = self.TYPE_ENVIRONMENT
-                    self.ipr_parser_obj.parser_get_environment()
-                    self.ipr_parser_obj.parser_scale_environment()
-                    self.is_packet_valid = True
-                else:
-                    self.is_packet_valid = False
-                    print("ENVIRONMENT: Data string too short to be process")
-
-            elif self.ipr_parser_obj.parser_get_id_name() == "ACCELERATION":
-                if len(packet) >= self.ipr_parser_obj.MIN_PACKET_LENGTH_ACCELERATION:
-                    self.packet_type = self.TYPE_ACCELERATION
-                    self.ipr_parser_obj.parser_get_acceleration()
-                    self.ipr_parser_obj.parser_scale_acceleration()
-                    self.is_packet_valid = True
-                else:
-                    self.is_packet_valid = False
-                    print("ACCELERATION: Data string too short to be process")
-        else:
-            self.is_packet_valid = False
+        _metrics = self.metrics
+        self.ipr_parser_obj.reset(packet, self.scale_tables)
+        self.is_packet_valid = False
+        if _metrics is not None and not isinstance(packet, str):
+            _metrics.increment(_metrics.ESCAPE_SEQUENCES, packet.count(IPRParser.TELEGRAM_ESCAPE))
+
+        # Remove escape sequences and validate the telegram format
+        if _metrics is not None:
+            _start_time = perf_counter()
+        if not self.ipr_parser_obj.parser_check_telegram_validity(packet):
+            if _metrics is not None:
+                _reason = (_metrics.SHORT_TELEGRAMS if len(self.ipr_parser_obj._byte_data) < IPRParser.MIN_TELEGRAM_BYTES
+                           else _metrics.CRC_FAILURES)
+                _metrics.increment(_reason)
+                _metrics.add_invalid_telegram(packet, _reason)
+            return
+        _length = len(self.ipr_parser_obj._byte_data)
+        if _metrics is not None:
+            _unescaped_time = perf_counter()
+            _metrics.record_time(_metrics.STAGE_UNESCAPE, _unescaped_time - _start_time)
+        self.ipr_parser_obj.parser_get_header()
+
+        # Process based on packet type
+        _packet_name = self.ipr_parser_obj.parser_get_id_name()
+        if _packet_name == "STRAIN":
+            if _length >= self.ipr_parser_obj.MIN_PACKET_BYTES_STRAIN:
+                self.packet_type = self.TYPE_STRAIN
+                self.ipr_parser_obj.parser_get_strain()
+                if _metrics is not None:
+                    _decoded_time = perf_counter()
+                self.ipr_parser_obj.parser_scale_strain_xyz()
+                self.ipr_parser_obj.parser_scale_strain_p1p2()
+                self.is_packet_valid = True
+            elif DEBUG_MODE:
+                print("STRAIN: Data string too short to be process")
+
+        elif _packet_name == "ENVIRONMENT":
+            if _length >= self.ipr_parser_obj.MIN_PACKET_BYTES_ENVIRONMENT:
+                self.packet_type = self.TYPE_ENVIRONMENT
+                self.ipr_parser_obj.parser_get_environment()
+                if _metrics is not None:
+                    _decoded_time = perf_counter()
+                self.ipr_parser_obj.parser_scale_environment()
+                self.is_packet_valid = True
+            elif DEBUG_MODE:
+                print("ENVIRONMENT: Data string too short to be process")
+
+        elif _packet_name == "ACCELERATION":
+            if _length >= self.ipr_parser_obj.MIN_PACKET_BYTES_ACCELERATION:
+                self.packet_type = self.TYPE_ACCELERATION
+                self.ipr_parser_obj.parser_get_acceleration()
+                if _metrics is not None:
+                    _decoded_time = perf_counter()
+                self.ipr_parser_obj.parser_scale_acceleration()
+                self.is_packet_valid = True
+            elif DEBUG_MODE:
+                print("ACCELERATION: Data string too short to be process")
+
+        if self.continuity_tracker is not None and _packet_name in self._SHORT_PACKET_COUNTERS:
+            # Packets too short for their type were still received: they are not lost
+            _header = self.ipr_parser_obj.raw_header
+            self.continuity_tracker.update(_header[0], _header[2], _header[3], self.is_packet_valid)
+
+        if _metrics is not None:
+            if self.is_packet_valid:
+                _metrics.record_time(_metrics.STAGE_DECODE, _decoded_time - _unescaped_time)
+                _metrics.record_time(_metrics.STAGE_SCALE, perf_counter() - _decoded_time)
+                _metrics.increment(_metrics.TELEGRAMS_DECODED)
+            else:
+                _reason = self._SHORT_PACKET_COUNTERS.get(_packet_name, _metrics.UNKNOWN_PACKET_TYPES)
+                _metrics.increment(_reason)
+                _metrics.add_invalid_telegram(packet, _reason)
 
     def print_strain(self):
         """
@@ -181,13 +296,9 @@ class IPRSensorDecoder:
         - Principal strain angle in degrees
         """
         print("STRAIN X: {:.2f} uStrain ; STRAIN Y: {:.2f} uStrain ; STRAIN Z: {:.2f} uStrain"
-              .format(self.ipr_parser_obj.parser_scale_strain_xyz()[0],
-                      self.ipr_parser_obj.parser_scale_strain_xyz()[1],
-                      self.ipr_parser_obj.parser_scale_strain_xyz()[2]))
+              .format(*self.ipr_parser_obj.scaled_strain[0:3]))
         print("STRAIN P1: {:.2f} uStrain ; STRAIN P2: {:.2f} uStrain ; STRAIN ANGLE: {:.2f} degrees"
-              .format(self.ipr_parser_obj.parser_scale_strain_p1p2()[3],
-                      self.ipr_parser_obj.parser_scale_strain_p1p2()[4],
-                      self.ipr_parser_obj.parser_scale_strain_p1p2()[5]))
+              .format(*self.ipr_parser_obj.scaled_strain[3:6]))
 
     def print_environment(self):
         """
@@ -200,10 +311,7 @@ class IPRSensorDecoder:
         - Temperature in Celsius (°C)
         """
         print("VBATT: {:.2f} V ; PRESSURE: {:.2f} hP ; HUMIDITY: {:.2f}% ; TEMPERATURE: {:.2f}°C"
-              .format(self.ipr_parser_obj.parser_scale_environment()[0],
-                      self.ipr_parser_obj.parser_scale_environment()[1],
-                      self.ipr_parser_obj.parser_scale_environment()[2],
-                      self.ipr_parser_obj.parser_scale_environment()[3]))
+              .format(*self.ipr_parser_obj.scaled_env))
 
     def print_acceleration(self):
         """
@@ -213,9 +321,7 @@ class IPRSensorDecoder:
         - XYZ acceleration values in G forces
         """
         print("ACC. X: {:.2f} G ; ACC. Y: {:.2f} G ; ACC. Z: {:.2f} G"
-              .format(self.ipr_parser_obj.parser_scale_acceleration()[0],
-                      self.ipr_parser_obj.parser_scale_acceleration()[1],
-                      self.ipr_parser_obj.parser_scale_acceleration()[2]))
+              .format(*self.ipr_parser_obj.scaled_acc))
 
     def get_strain_xyz(self, axis=0, scaled=True):
         """
@@ -230,9 +336,9 @@ class IPRSensorDecoder:
         """
         if axis in range(0, 3):
             if scaled:
-                return self.ipr_parser_obj.parser_scale_strain_xyz()[axis]
+                return self.ipr_parser_obj.scaled_strain[axis]
             else:
-                return self.ipr_parser_obj.parser_get_strain()[axis]
+                return self.ipr_parser_obj.raw_strain[axis]
         else:
             return -1
 
@@ -249,9 +355,9 @@ class IPRSensorDecoder:
         """
         if axis in range(0, 3):
             if scaled:
-                return self.ipr_parser_obj.parser_scale_acceleration()[axis]
+                return self.ipr_parser_obj.scaled_acc[axis]
             else:
-                return self.ipr_parser_obj.parser_get_acceleration()[axis]
+                return self.ipr_parser_obj.raw_acc[axis]
         else:
             return -1
 
@@ -268,12 +374,22 @@ class IPRSensorDecoder:
         """
         if axis in range(0, 4):
             if scaled:
-                return self.ipr_parser_obj.parser_scale_environment()[axis]
+                return self.ipr_parser_obj.scaled_env[axis]
             else:
-                return self.ipr_parser_obj.parser_get_environment()[axis]
+                return self.ipr_parser_obj.raw_env[axis]
         else:
             return -1
 
+    def get_timestamp(self):
+        """
+        Get the timestamp of the current packet.
+
+        Returns:
+            int: Raw 27-bit header timestamp in ticks, see ipr_time_axis.unwrap_timestamps to
+                 remove the rollovers of a series of timestamps
+        """
+        return self.ipr_parser_obj.raw_header[3]
+
     def get_packet_type(self):
         """
         Get the type of the current packet.
@@ -0,0 +1,56 @@
+import time
+from collections import namedtuple
+
+from pyipr_sensor_lib.ipr_calibration import IPRCalibration
+from pyipr_sensor_lib.ipr_time_axis import parse_rtc_time
+
+_SensorInfoFields = namedtuple("SensorInfo", ("name", "material", "tare", "gain", "strain_offset",
+                                              "rtc_time", "system_status", "query_time"))
+
+
+class SensorInfo(_SensorInfoFields):
+    """
+    Metadata of a sensor read in one query session, see IPRSerialInterface.serial_ipr_get_sensor_info.
+
+    Fields:
+        name (str): Sensor name
+        material (str): Configured material
+        tare, gain, strain_offset (tuple): X, Y and Z values of the calibration
+        rtc_time (datetime): Sensor clock when the status was read, None if not reported
+        system_status (str): Complete reply of the '$' command
+        query_time (float): time.time() when the metadata was read
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_replies(cls, replies, query_time=None):
+        """
+        Build the metadata from the parsed replies of the sensor.
+
+        Args:
+            replies (dict): Command ('$', 'name', 'material', 'tare', 'transfer', 'offset') mapped
+                to its reply, as returned by the serial_ipr_get_* methods
+            query_time (float): time.time() of the query (default: now)
+
+        Returns:
+            SensorInfo: Typed metadata
+        """
+        try:
+            _rtc_time = parse_rtc_time(replies["$"])
+        except ValueError:
+            _rtc_time = None
+        return cls(replies["name"], replies["material"],
+                   IPRCalibration.parse_axis_values(replies["tare"]),
+                   IPRCalibration.parse_axis_values(replies["transfer"]),
+                   IPRCalibration.parse_axis_values(replies["offset"]),
+                   _rtc_time, replies["$"], time.time() if query_time is None else query_time)
+
+    def get_calibration(self):
+        """
+        Get the strain calibration stored in the sensor.
+
+        Returns:
+            IPRCalibration: Calibration made of the tare, gain and strain offset
+        """
+        return IPRCalibration(self.tare, self.gain, self.strain_offset)
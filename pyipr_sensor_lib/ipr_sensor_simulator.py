@@ -0,0 +1,243 @@
+import os
+import select
+import threading
+import time
+import tty
+from collections import deque
+from datetime import datetime, timedelta
+
+from pyipr_sensor_lib.ipr_encoder import IPRCaptureGenerator
+
+# 921600 baud, 8 data bits, no parity, 1 stop bit: 10 bits per byte
+LINE_RATE_BYTES_PER_SECOND = 921600 // 10
+
+
+class IPRSensorSimulator:
+    """
+    Virtual IPR sensor on a pseudo-terminal, for tests without hardware.
+
+    The simulator answers the text commands used by IPRSerialInterface ('$', 'tare', 'material',
+    'transfer', 'offset', 'name', '<scanmb-start>', '<scanmb-stop>') and streams binary telegrams
+    while the acquisition is started, at a configurable telegram rate limited by the line rate.
+    Like the sensor, it does not wait for a slow reader: bytes the pseudo-terminal cannot accept
+    are lost and counted in dropped_bytes.
+
+    Open the port returned by get_port_name with IPRSerialInterface.serial_setup.
+    """
+
+    WRITE_INTERVAL = 0.005  # Seconds between two writes of the streaming loop
+    GENERATOR_BLOCK_TICKS = 1 << 22  # Ticks generated at once when the source is a generator
+    SEND_TIME_WINDOW = 5.0  # Seconds during which the send time of a telegram is kept
+
+    def __init__(self, name="IPR-SIM", telegram_rate=None, byte_rate=LINE_RATE_BYTES_PER_SECOND,
+                 generator=None, capture=None, tare=(0.0, 0.0, 0.0), gain=(0.0, 0.0, 0.0),
+                 strain_offset=(0.0, 0.0, 0.0), material="Steel", rtc_start=None, record_send_times=False):
+        """
+        Initialize the simulator.
+
+        Args:
+            name (str): Sensor name returned by the 'name' command
+            telegram_rate (float): Telegrams sent per second (default: as fast as the byte rate allows)
+            byte_rate (float): Maximum bytes sent per second (default: 921600-baud line rate)
+            generator (IPRCaptureGenerator): Source of the telegrams (default: generator with the
+                packet mix of the example capture)
+            capture (bytes): Binary capture streamed in a loop instead of the generator
+            tare (tuple): Tare of strain X, Y and Z returned by the 'tare' command
+            gain (tuple): Gain of strain X, Y and Z returned by the 'transfer' command
+            strain_offset (tuple): Offset of strain X, Y and Z returned by the 'offset' command
+            material (str): Material returned by the 'material' command
+            rtc_start (datetime): Time of the sensor clock when the simulator starts (default: now)
+            record_send_times (bool): Whether to record the send time of every telegram, see
+                get_send_time. Only the telegrams of the last SEND_TIME_WINDOW seconds are kept
+
+        Raises:
+            ValueError: If the capture does not contain any complete telegram
+        """
+        self.name = name
+        self.telegram_rate = telegram_rate
+        self.byte_rate = byte_rate
+        self.tare = tare
+        self.gain = gain
+        self.strain_offset = strain_offset
+        self.material = material
+        self.record_send_times = record_send_times
+
+        self._generator = generator if generator is not None else IPRCaptureGenerator(jitter=500)
+        self._capture = None
+        if capture is not None:
+            self._capture = capture[:capture.rfind(b'\x08') + 1].split(b'\x08')[:-1]
+            if not self._capture:
+                raise ValueError("The capture does not contain any complete telegram")
+        self._pending_telegrams = deque()
+
+        self._rtc_start = rtc_start if rtc_start is not None else datetime.now()
+        self._start_time = time.monotonic()
+        self._master_fd, self._slave_fd = os.openpty()
+        tty.setraw(self._slave_fd)
+        os.set_blocking(self._master_fd, False)
+        self._port_name = os.ttyname(self._slave_fd)
+
+        self.is_streaming = False
+        self.bytes_sent = 0
+        self.telegrams_sent = 0
+        self.dropped_bytes = 0
+        self.commands_received = 0
+        self._send_times = dict()  # Telegram (bytes) -> monotonic time it was written
+        self._send_order = deque()  # (time, telegram) in write order, to forget the oldest ones
+        self._stream_start_time = 0
+        self._stream_sent_bytes = 0
+        self._stream_sent_telegrams = 0
+
+        self._stop_requested = threading.Event()
+        self._thread = None
+
+    def get_port_name(self):
+        """
+        Get the name of the pseudo-terminal to open with IPRSerialInterface.
+
+        Returns:
+            str: Device path, e.g. '/dev/pts/3'
+        """
+        return self._port_name
+
+    def start(self):
+        """Start answering commands on the pseudo-terminal."""
+        self._stop_requested.clear()
+        self._thread = threading.Thread(target=self._run, name="IPRSensorSimulator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the simulator and close the pseudo-terminal."""
+        self._stop_requested.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        os.close(self._master_fd)
+        os.close(self._slave_fd)
+
+    def get_send_time(self, telegram):
+        """
+        Get the time a telegram was written, to measure the acquisition latency.
+
+        Args:
+            telegram (bytes): Telegram as received, without the 0x08 separator
+
+        Returns:
+            float: time.monotonic() when the telegram was written, or None if it was not recorded
+                   or was written more than SEND_TIME_WINDOW seconds ago
+        """
+        return self._send_times.get(bytes(telegram))
+
+    def _run(self):
+        """Simulator thread: answer the commands and stream the telegrams."""
+        _command = bytearray()
+        while not self._stop_requested.is_set():
+            _readable, _, _ = select.select([self._master_fd], [], [], self.WRITE_INTERVAL)
+            if _readable:
+                try:
+                    _command += os.read(self._master_fd, 4096)
+                except OSError:
+                    _command.clear()  # No reader on the other side
+                while b'\r' in _command:
+                    _line, _, _rest = bytes(_command).partition(b'\r')
+                    _command = bytearray(_rest)
+                    self._answer_command(_line.decode("utf-8", "replace").strip())
+            if self.is_streaming:
+                self._stream()
+
+    def _answer_command(self, command):
+        """Write the reply of a text command: echo, reply lines and the '>' prompt."""
+        self.commands_received += 1
+        if command == "<scanmb-start>":
+            self.is_streaming = True
+            self._stream_start_time = time.monotonic()
+            self._stream_sent_bytes = 0
+            self._stream_sent_telegrams = 0
+            return
+        if command == "<scanmb-stop>":
+            self.is_streaming = False
+            return
+
+        if command == "$":
+            _rtc = self._rtc_start + timedelta(seconds=time.monotonic() - self._start_time)
+            _lines = ["Name         : {}".format(self.name),
+                      "Firmware     : Simulator",
+                      "Time (RTC)   : {}".format(_rtc.strftime("%Y-%m-%d-%H-%M-%S")),
+                      "Streaming    : {}".format("ON" if self.is_streaming else "OFF")]
+        elif command == "tare":
+            _lines = ["X={} Y={} Z={}".format(*self.tare)]
+        elif command == "transfer":
+            _lines = ["X={} Y={} Z={}".format(*self.gain)]
+        elif command == "offset":
+            _lines = ["X={} Y={} Z={}".format(*self.strain_offset)]
+        elif command == "material":
+            _lines = ["Material = {}".format(self.material)]
+        elif command == "name":
+            _lines = ["Name : {}".format(self.name)]
+        elif command.startswith("name "):
+            self.name = command[5:].strip()
+            _lines = ["Name : {}".format(self.name)]
+        else:
+            _lines = ["Unknown command"]
+        _reply = "{}\r\n{}\r\n>".format(command, "\r\n".join(_lines)).encode("utf-8")
+        self._write(_reply)
+
+    def _stream(self):
+        """Write the telegrams due since the acquisition started, within the rate limits."""
+        _elapsed = time.monotonic() - self._stream_start_time
+        _byte_budget = int(_elapsed * self.byte_rate) - self._stream_sent_bytes
+        _telegram_budget = None
+        if self.telegram_rate is not None:
+            _telegram_budget = int(_elapsed * self.telegram_rate) - self._stream_sent_telegrams
+
+        _block = bytearray()
+        _telegrams = list()
+        while _telegram_budget is None or len(_telegrams) < _telegram_budget:
+            _telegram = self._next_telegram()
+            if len(_block) + len(_telegram) + 1 > _byte_budget:
+                self._pending_telegrams.appendleft(_telegram)
+                break
+            _block += _telegram
+            _block.append(0x08)
+            _telegrams.append(_telegram)
+        if not _block:
+            return
+
+        self._stream_sent_bytes += len(_block)
+        self._stream_sent_telegrams += len(_telegrams)
+        _written = self._write(_block)
+        if self.record_send_times:
+            _now = time.monotonic()
+            _end = 0
+            for _telegram in _telegrams:
+                _end += len(_telegram) + 1
+                if _end > _written:
+                    break
+                self._send_times[_telegram] = _now
+                self._send_order.append((_now, _telegram))
+            # Forget the telegrams written before the window, unless written again since
+            while self._send_order and _now - self._send_order[0][0] > self.SEND_TIME_WINDOW:
+                _time, _telegram = self._send_order.popleft()
+                if self._send_times.get(_telegram) == _time:
+                    del self._send_times[_telegram]
+        self.telegrams_sent += _block.count(0x08, 0, _written)
+
+    def _next_telegram(self):
+        """Get the next telegram of the capture or of the generator."""
+        while not self._pending_telegrams:
+            if self._capture is not None:
+                self._pending_telegrams.extend(self._capture)
+            else:
+                self._pending_telegrams.extend(
+                    self._generator.generate(self.GENERATOR_BLOCK_TICKS).split(b'\x08')[:-1])
+        return self._pending_telegrams.popleft()
+
+    def _write(self, data):
+        """Write to the pseudo-terminal without blocking, counting the bytes that do not fit."""
+        try:
+            _written = os.write(self._master_fd, data)
+        except (BlockingIOError, OSError):
+            _written = 0
+        self.bytes_sent += _written
+        self.dropped_bytes += len(data) - _written
+        return _written
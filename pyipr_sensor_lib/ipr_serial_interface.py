@@ -1,9 +1,27 @@
+from collections import deque
+from time import monotonic, perf_counter
+
 import serial
 
+from pyipr_sensor_lib.ipr_acquisition import IPRBackgroundReader
+from pyipr_sensor_lib.ipr_frame_splitter import IPRFrameSplitter
+from pyipr_sensor_lib.ipr_metrics import IPRTimingHistogram
+from pyipr_sensor_lib.ipr_sensor_info import SensorInfo
+
 # Global configuration flags for debugging purposes
 DEBUG_MODE = False  # Enable/disable general debug information
 DEBUG_SERIAL_RECEIVE = False  # Enable/disable serial data reception debugging
 
+# Text preceding the value in the reply of each metadata command (None: the whole reply is kept)
+_REPLY_PREFIXES = {"$": None, "tare": "tare\n", "transfer": "transfer\n", "offset": "offset\n",
+                   "material": "Material = ", "name": "Name : "}
+
+# Commands read by IPRSerialInterface.serial_ipr_get_sensor_info
+SENSOR_INFO_COMMANDS = ("$", "name", "material", "tare", "transfer", "offset")
+
+# Command sent right after '<scanmb-stop>': its echo and prompt mark the end of the binary stream
+STREAM_STOP_PROBE_COMMAND = "name"
+
 
 def format_command(text):
     """
@@ -21,6 +39,86 @@ def format_command(text):
     return _array
 
 
+def format_text_reply(data):
+    """
+    Formats a text reply received from the sensor the same way as
+    IPRSerialInterface.serial_ipr_read_text_from_sensor.
+
+    Args:
+        data (bytes): Reply received from the sensor, without the end character ('>')
+
+    Returns:
+        list: List of characters forming the complete response
+    """
+    _telegram = list()
+    for _character in data.decode("utf-8"):
+        if _character not in ('\n', '\r', '$'):
+            _telegram.append(_character)
+        elif _character == '\r':
+            if len(_telegram) >= 1:
+                if _telegram[-1] != "\n":
+                    _telegram.append("\n")
+    return _telegram
+
+
+def parse_command_reply(command, telegram):
+    """
+    Extract the value from the reply of a metadata command.
+
+    Args:
+        command (str): Command sent: '$', 'tare', 'transfer', 'offset', 'material' or 'name'
+        telegram (list/str): Reply as returned by IPRSerialInterface.serial_ipr_read_text_from_sensor
+
+    Returns:
+        str: Value returned by the matching serial_ipr_get_* method
+    """
+    _text = ''.join(telegram)
+    _prefix = _REPLY_PREFIXES[command]
+    if _prefix is not None:
+        _text = _text.split(_prefix)[-1]
+    return _text[:-1]
+
+
+def find_stream_end(data):
+    """
+    Locate the reply of the probe command sent after '<scanmb-stop>' in the bytes received.
+
+    The sensor answers the probe once the binary stream is stopped, so the echo of the probe
+    follows the last binary byte and the '>' prompt ends the reply.
+
+    Args:
+        data (bytes/bytearray): Bytes received since the stop command
+
+    Returns:
+        tuple: (offset of the echo, offset following the prompt), or None if the reply is not
+               complete yet. The echo offset is the number of binary bytes received before it
+    """
+    _echo = data.find(format_command(STREAM_STOP_PROBE_COMMAND))
+    if _echo == -1:
+        return None
+    _end = data.find(b'>', _echo)
+    if _end == -1:
+        return None
+    return _echo, _end + 1
+
+
+def is_binary_data(data):
+    """
+    Tell whether bytes received after '<scanmb-stop>' hold binary stream data.
+
+    Every binary telegram ends with the 0x08 separator, which a text reply never contains: the
+    echo of the stop command or a prompt received before the reply of the probe command are not
+    mistaken for a running stream.
+
+    Args:
+        data (bytes/bytearray): Bytes received before the reply of the probe command
+
+    Returns:
+        bool: True if the bytes hold at least one telegram separator
+    """
+    return IPRFrameSplitter.TELEGRAM_SEPARATOR in data
+
+
 class IPRSerialInterface:
     """
     A class to handle serial communication with IPR sensors.
@@ -28,19 +126,46 @@ class IPRSerialInterface:
     and reading data in both binary and text modes.
     """
 
-    def __init__(self):
+    # Maximum number of bytes read from the serial port in a single call
+    READ_BLOCK_SIZE = 4096
+    # Silence in seconds after which the stream is considered stopped by serial_ipr_get_sensor_info,
+    # when the sensor does not answer the probe command in time
+    COMMAND_DRAIN_TIME = 0.05
+    # Maximum time in seconds to wait for the reply of the probe command after a stop command
+    STREAM_STOP_TIMEOUT = 1.0
+    # Default time in seconds during which serial_ipr_get_sensor_info returns the cached metadata
+    DEFAULT_SENSOR_INFO_MAX_AGE = 60.0
+
+    def __init__(self, metrics=None):
         """
         Initialize the IPR Serial Interface.
         Sets up the serial port object and initial state variables.
+
+        Args:
+            metrics (IPRMetrics): Metrics receiving the bytes read, the telegrams framed and the
+                read and frame timings (default: none)
         """
         if DEBUG_MODE:
             print("Python serial port library version: {}".format(serial.VERSION))
 
         # Initialize serial port object with default settings
         self._serial_port_obj = serial.Serial()
-        # Flag to track if sensor is in binary reading mode
-        self.is_binary_reading_running = True
-        print("Initiating IPRSerialInterface -> DONE")
+        # Flag to track if sensor is in binary reading mode, None until known: the sensor may
+        # still be streaming from a previous session
+        self.is_binary_reading_running = None
+        # Durations of the switches from binary streaming to command mode, in seconds
+        self.stream_stop_timing = IPRTimingHistogram()
+        # Splitter and queue of complete telegrams for buffered binary reads
+        self._frame_splitter = IPRFrameSplitter()
+        self._telegram_queue = deque()
+        # Background acquisition, created by serial_start_background_read
+        self.background_reader = None
+        self.metrics = metrics
+        # Metadata cached by serial_ipr_get_sensor_info
+        self._sensor_info = None
+        self._sensor_info_time = 0.0
+        if DEBUG_MODE:
+            print("Initiating IPRSerialInterface -> DONE")
 
     def serial_setup(self, com_port_name):
         """
@@ -72,6 +197,15 @@ class IPRSerialInterface:
         """Close the serial port connection."""
         self._serial_port_obj.close()
 
+    def serial_is_open(self):
+        """
+        Check if the serial port connection is open.
+
+        Returns:
+            bool: True if the port is open, False otherwise (serial_open reports the error)
+        """
+        return self._serial_port_obj.isOpen()
+
     def serial_read_binary(self):
         """
         Read a single byte from the serial port.
@@ -84,6 +218,28 @@ class IPRSerialInterface:
             print(_data)
         return _data
 
+    def serial_read_available(self, max_size=READ_BLOCK_SIZE):
+        """
+        Read all the bytes waiting in the serial port buffer in a single call.
+        Waits for at least one byte (up to the port timeout) if the buffer is empty.
+
+        Args:
+            max_size (int): Maximum number of bytes to read
+
+        Returns:
+            bytes: Bytes read from serial port, empty if the timeout was reached
+        """
+        if self.metrics is not None:
+            _start_time = perf_counter()
+        _size = min(max(1, self._serial_port_obj.in_waiting), max_size)
+        _data = self._serial_port_obj.read(_size)
+        if DEBUG_SERIAL_RECEIVE:
+            print(_data)
+        if self.metrics is not None:
+            self.metrics.record_time(self.metrics.STAGE_READ, perf_counter() - _start_time)
+            self.metrics.increment(self.metrics.BYTES_READ, len(_data))
+        return _data
+
     def serial_ipr_get_system_status(self):
         """
         Query the sensor's system status.
@@ -91,10 +247,7 @@ class IPRSerialInterface:
         Returns:
             str: System status information with trailing '>' removed
         """
-        self.serial_ipr_check_if_data_reading()
-        self._serial_port_obj.write(format_command("$"))
-        _telegram = self.serial_ipr_read_text_from_sensor()
-        return ''.join(_telegram)[:-1]
+        return parse_command_reply("$", self._serial_ipr_send_command("$"))
 
     def serial_ipr_get_sensor_tare(self):
         """
@@ -103,10 +256,7 @@ class IPRSerialInterface:
         Returns:
             str: Tare value information
         """
-        self.serial_ipr_check_if_data_reading()
-        self._serial_port_obj.write(format_command("tare"))
-        _telegram = self.serial_ipr_read_text_from_sensor()
-        return ''.join(_telegram).split("tare\n")[-1][:-1]
+        return parse_command_reply("tare", self._serial_ipr_send_command("tare"))
 
     def serial_ipr_get_sensor_material_type(self):
         """
@@ -115,10 +265,7 @@ class IPRSerialInterface:
         Returns:
             str: Material type information
         """
-        self.serial_ipr_check_if_data_reading()
-        self._serial_port_obj.write(format_command("material"))
-        _telegram = self.serial_ipr_read_text_from_sensor()
-        return ''.join(_telegram).split("Material = ")[-1][:-1]
+        return parse_command_reply("material", self._serial_ipr_send_command("material"))
 
     def serial_ipr_get_sensor_gain(self):
         """
@@ -127,10 +274,7 @@ class IPRSerialInterface:
         Returns:
             str: Gain value information
         """
-        self.serial_ipr_check_if_data_reading()
-        self._serial_port_obj.write(format_command("transfer"))
-        _telegram = self.serial_ipr_read_text_from_sensor()
-        return ''.join(_telegram).split("transfer\n")[-1][:-1]
+        return parse_command_reply("transfer", self._serial_ipr_send_command("transfer"))
 
     def serial_ipr_get_sensor_strain_offset(self):
         """
@@ -139,10 +283,7 @@ class IPRSerialInterface:
         Returns:
             str: Offset value information
         """
-        self.serial_ipr_check_if_data_reading()
-        self._serial_port_obj.write(format_command("offset"))
-        _telegram = self.serial_ipr_read_text_from_sensor()
-        return ''.join(_telegram).split("offset\n")[-1][:-1]
+        return parse_command_reply("offset", self._serial_ipr_send_command("offset"))
 
     def serial_ipr_get_sensor_name(self):
         """
@@ -151,10 +292,7 @@ class IPRSerialInterface:
         Returns:
             str: Sensor name
         """
-        self.serial_ipr_check_if_data_reading()
-        self._serial_port_obj.write(format_command("name"))
-        _telegram = self.serial_ipr_read_text_from_sensor()
-        return ''.join(_telegram).split("Name : ")[-1][:-1]
+        return parse_command_reply("name", self._serial_ipr_send_command("name"))
 
     def serial_ipr_set_sensor_name(self, sensor_name):
         """
@@ -163,9 +301,35 @@ class IPRSerialInterface:
         Args:
             sensor_name (str): New name to set for the sensor
         """
-        self.serial_ipr_check_if_data_reading()
-        self._serial_port_obj.write(format_command("name {}".format(sensor_name)))
-        self.serial_ipr_read_text_from_sensor()
+        self._serial_ipr_send_command("name {}".format(sensor_name))
+        self._sensor_info = None
+
+    def serial_ipr_get_sensor_info(self, max_age=DEFAULT_SENSOR_INFO_MAX_AGE):
+        """
+        Read the metadata of the sensor in a single query session, or get it from the cache.
+
+        The stream is stopped once, every metadata command is sent and the stream is restarted
+        if it was running. While the cached metadata is younger than max_age, it is returned
+        without any exchange with the sensor, so the acquisition is not interrupted.
+
+        Args:
+            max_age (float): Maximum age in seconds of the cached metadata (0 to force a query)
+
+        Returns:
+            SensorInfo: Name, material, calibration, sensor clock and system status
+        """
+        if self._sensor_info is not None and monotonic() - self._sensor_info_time < max_age:
+            return self._sensor_info
+
+        _was_streaming = self.serial_ipr_check_if_data_reading(self.COMMAND_DRAIN_TIME)
+        _replies = {_command: parse_command_reply(_command, self._serial_ipr_send_command(_command))
+                    for _command in SENSOR_INFO_COMMANDS}
+        if _was_streaming:
+            self.serial_ipr_start_binary_read()
+
+        self._sensor_info = SensorInfo.from_replies(_replies)
+        self._sensor_info_time = monotonic()
+        return self._sensor_info
 
     def serial_ipr_start_binary_read(self):
         """
@@ -174,6 +338,7 @@ class IPRSerialInterface:
         """
         self._serial_port_obj.write(format_command("<scanmb-start>"))
         self.is_binary_reading_running = True
+        self.serial_reset_telegram_buffer()
 
     def serial_ipr_stop_binary_read(self):
         """
@@ -183,19 +348,55 @@ class IPRSerialInterface:
         self._serial_port_obj.write(format_command("<scanmb-stop>"))
         self.is_binary_reading_running = False
 
-    def serial_ipr_check_if_data_reading(self):
+    def serial_ipr_check_if_data_reading(self, drain_time=None):
         """
         Check if sensor is in binary reading mode and stop if necessary.
         Clears any remaining bytes in the buffer after stopping.
-        """
-        if self.is_binary_reading_running:
-            self.serial_ipr_stop_binary_read()
-            _stop_character_found = False
-            _telegram = list()
-            while not _stop_character_found:
-                data = self.serial_read_binary()
-                if data == b'':  # Empty byte indicates timeout reached
-                    _stop_character_found = True
+
+        The stop command is followed by a probe command: the binary bytes are discarded up to
+        the reply of the probe, which the sensor only sends once the stream is stopped. The switch
+        therefore takes the time of one command reply instead of a silent period. The duration of
+        every switch is recorded in stream_stop_timing (and in the metrics, if any).
+
+        Args:
+            drain_time (float): Silence in seconds after which the stream is considered stopped
+                if the probe is not answered within STREAM_STOP_TIMEOUT (default: the port timeout)
+
+        Returns:
+            bool: True if binary data was received before the stream stopped
+        """
+        if self.is_binary_reading_running is False:
+            return False
+
+        _start_time = perf_counter()
+        self.serial_ipr_stop_binary_read()
+        self._serial_port_obj.write(format_command(STREAM_STOP_PROBE_COMMAND))
+        _received = bytearray()
+        _stream_end = None
+        while _stream_end is None and perf_counter() - _start_time < self.STREAM_STOP_TIMEOUT:
+            _received += self._serial_port_obj.read(max(1, self._serial_port_obj.in_waiting))
+            _stream_end = find_stream_end(_received)
+
+        if _stream_end is not None:
+            _was_streaming = is_binary_data(_received[:_stream_end[0]])
+        else:
+            # No reply to the probe: wait for the port to stay silent
+            _timeout = self._serial_port_obj.timeout
+            if drain_time is not None:
+                self._serial_port_obj.timeout = drain_time
+            try:
+                while self._serial_port_obj.read(max(1, self._serial_port_obj.in_waiting)):
+                    pass
+            finally:
+                self._serial_port_obj.timeout = _timeout
+            _was_streaming = is_binary_data(_received)
+        self.serial_reset_telegram_buffer()
+
+        _duration = perf_counter() - _start_time
+        self.stream_stop_timing.record(_duration)
+        if self.metrics is not None:
+            self.metrics.record_time(self.metrics.STAGE_STREAM_STOP, _duration)
+        return _was_streaming
 
     def serial_ipr_read_telegram(self):
         """
@@ -205,15 +406,93 @@ class IPRSerialInterface:
         Returns:
             str: Complete telegram in hexadecimal format
         """
-        _start_char_found = False
-        _telegram = list()
-        while not _start_char_found:
-            data = self.serial_read_binary().hex()
-            if data == '08':  # Start of Frame character
-                _start_char_found = True
-            else:
-                _telegram.append(data)
-        return ''.join(_telegram)
+        return self.serial_ipr_read_telegram_binary().hex()
+
+    def serial_ipr_read_telegram_binary(self):
+        """
+        Read a complete telegram from the serial port in binary mode.
+        Looks for Start of Frame (SOF) character (0x08) and collects all preceding data.
+
+        The serial port is read in blocks: telegrams received along with the returned one
+        are kept and returned by the next calls.
+
+        Returns:
+            bytes: Complete telegram, without the SOF character
+        """
+        while not self._telegram_queue:
+            self._telegram_queue.extend(self.serial_ipr_read_telegrams())
+        return self._telegram_queue.popleft()
+
+    def serial_ipr_read_telegrams(self):
+        """
+        Read all the available bytes from the serial port and return the telegrams they complete.
+
+        Incomplete telegrams, including partial escape sequences, are kept until the next call.
+
+        Returns:
+            list: Complete telegrams (bytes) without the SOF character, possibly empty
+        """
+        _telegrams = list(self._telegram_queue)
+        self._telegram_queue.clear()
+        _data = self.serial_read_available()
+        if self.metrics is None:
+            _telegrams.extend(self._frame_splitter.feed(_data))
+        else:
+            _start_time = perf_counter()
+            _discarded_bytes = self._frame_splitter.discarded_bytes
+            _framed = self._frame_splitter.feed(_data)
+            self.metrics.record_time(self.metrics.STAGE_FRAME, perf_counter() - _start_time)
+            self.metrics.increment(self.metrics.TELEGRAMS_FRAMED, len(_framed))
+            self.metrics.increment(self.metrics.DISCARDED_BYTES, self._frame_splitter.discarded_bytes - _discarded_bytes)
+            _telegrams.extend(_framed)
+        return _telegrams
+
+    def serial_reset_telegram_buffer(self):
+        """Discard the partially received telegram and the telegrams not read yet."""
+        self._frame_splitter.reset()
+        self._telegram_queue.clear()
+
+    def serial_start_background_read(self, ring_buffer_size=IPRBackgroundReader.DEFAULT_RING_BUFFER_SIZE,
+                                     queue_size=IPRBackgroundReader.DEFAULT_QUEUE_SIZE,
+                                     drop_policy=IPRBackgroundReader.DROP_OLDEST):
+        """
+        Start reading the binary data stream in background threads.
+
+        The serial port is drained continuously into a ring buffer and the telegrams are made
+        available through serial_get_telegram. No other read or command method should be used
+        until serial_stop_background_read is called.
+
+        Args:
+            ring_buffer_size (int): Size of the ring buffer in bytes
+            queue_size (int): Maximum number of telegrams waiting to be read
+            drop_policy (int): Behaviour when the queue is full (IPRBackgroundReader.DROP_NEWEST,
+                DROP_OLDEST or BLOCK)
+
+        Returns:
+            IPRBackgroundReader: Background reader object, giving access to the overflow counters
+        """
+        self.serial_stop_background_read()
+        self.serial_reset_telegram_buffer()
+        self.background_reader = IPRBackgroundReader(self, ring_buffer_size, queue_size, drop_policy)
+        self.background_reader.start()
+        return self.background_reader
+
+    def serial_stop_background_read(self):
+        """Stop the background threads started by serial_start_background_read."""
+        if self.background_reader is not None:
+            self.background_reader.stop()
+
+    def serial_get_telegram(self, timeout=None):
+        """
+        Get the next telegram received by the background reader.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds (default: wait forever)
+
+        Returns:
+            bytes: Telegram without the SOF character, or None if the timeout was reached
+        """
+        return self.background_reader.get_telegram(timeout)
 
     def serial_ipr_read_text_from_sensor(self):
         """
@@ -223,17 +502,16 @@ class IPRSerialInterface:
         Returns:
             list: List of characters forming the complete response
         """
-        _stop_character_found = False
-        _telegram = list()
-        while not _stop_character_found:
-            data = self.serial_read_binary()
-            if data == b'>':
-                _stop_character_found = True
-            else:
-                if data not in (b'\n', b'\r', b'$'):
-                    _telegram.append(data.decode("utf-8"))
-                elif data == b'\r':
-                    if len(_telegram) >= 1:
-                        if _telegram[-1] != "\n":
-                            _telegram.append("\n")
-        return _telegram
\ No newline at end of file
+        # The reply is read in blocks up to the end character, waiting as long as needed
+        _data = bytearray()
+        while not _data.endswith(b'>'):
+            _data += self._serial_port_obj.read_until(b'>')
+        if DEBUG_SERIAL_RECEIVE:
+            print(bytes(_data))
+        return format_text_reply(bytes(_data[:-1]))
+
+    def _serial_ipr_send_command(self, command):
+        """Stop the stream if needed, send a text command and read its reply."""
+        self.serial_ipr_check_if_data_reading()
+        self._serial_port_obj.write(format_command(command))
+        return self.serial_ipr_read_text_from_sensor()
\ No newline at end of file
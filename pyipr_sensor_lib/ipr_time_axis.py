@@ -0,0 +1,124 @@
+import re
+from datetime import datetime
+
+import numpy as np
+
+TIMESTAMP_MODULO = 1 << 27  # The header timestamp is 27 bits
+PACKET_TYPE_NAMES = ("STRAIN", "ENVIRONMENT", "ACCELERATION")
+
+_RTC_PATTERN = re.compile(r"Time \(RTC\)\s*:\s*(\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2})")
+
+
+def unwrap_timestamps(timestamps, previous=None):
+    """
+    Remove the rollovers of a stream of 27-bit timestamps.
+
+    Every timestamp is assumed to follow the previous one by less than 2^27 ticks, so the
+    result always increases, whatever the number of rollovers in the stream.
+
+    Args:
+        timestamps (array-like): Raw header timestamps of one packet type, in reception order
+        previous (int): Unwrapped timestamp of the packet received before the first one, to
+            continue the time axis of a previous block (default: start at the first raw timestamp)
+
+    Returns:
+        numpy.ndarray: Monotonic timestamps in ticks (int64)
+    """
+    _raw = np.asarray(timestamps, dtype=np.int64)
+    _ticks = np.empty(len(_raw), dtype=np.int64)
+    if not len(_raw):
+        return _ticks
+    _ticks[0] = _raw[0] if previous is None else previous + (_raw[0] - previous) % TIMESTAMP_MODULO
+    _ticks[1:] = np.diff(_raw) % TIMESTAMP_MODULO
+    return np.cumsum(_ticks, out=_ticks)
+
+
+def parse_rtc_time(system_status):
+    """
+    Read the sensor clock in the reply of IPRSerialInterface.serial_ipr_get_system_status.
+
+    Args:
+        system_status (str): System status text
+
+    Returns:
+        datetime: Time of the sensor real-time clock, with a resolution of one second
+
+    Raises:
+        ValueError: If the status does not contain the 'Time (RTC)' line
+    """
+    _match = _RTC_PATTERN.search(system_status)
+    if _match is None:
+        raise ValueError("No 'Time (RTC)' line in the system status")
+    return datetime.strptime(_match.group(1), "%Y-%m-%d-%H-%M-%S")
+
+
+class IPRTimeAxis:
+    """
+    Common time axis of the packet types decoded block by block with decode_batch.
+
+    Each packet type is unwrapped separately and continues from one block to the next. All types
+    share the same origin, the oldest packet of the first block, so their time axes can be
+    plotted together. The axis can be anchored to the sensor clock read before the acquisition
+    (see parse_rtc_time) to get absolute times.
+    """
+
+    def __init__(self, tick_rate=None, start_time=None):
+        """
+        Initialize the time axis.
+
+        Args:
+            tick_rate (float): Timestamp ticks per second, required for the "time" column
+            start_time (datetime/float): Absolute time of the origin, as datetime or POSIX
+                seconds (default: times relative to the origin)
+        """
+        self.tick_rate = tick_rate
+        self.start_time = start_time.timestamp() if isinstance(start_time, datetime) else start_time
+        self._origin = None  # Raw timestamp of the origin
+        self._last_ticks = dict()  # Packet type name -> unwrapped raw timestamp of its last packet
+
+    def update(self, columns):
+        """
+        Add the time axis to a block decoded by ipr_batch_decoder.decode_batch.
+
+        Args:
+            columns (dict): Packet type name mapped to a dict holding the "timestamp" column
+
+        Returns:
+            dict: The same dict, each packet type having a "tick" column (int64 ticks since the
+                  origin) and, if the tick rate is known, a "time" column (float64 seconds since
+                  the origin, or POSIX seconds when the start time is known)
+        """
+        if self._origin is None:
+            self._origin = self._find_origin(columns)
+        for _name in PACKET_TYPE_NAMES:
+            if _name not in columns:
+                continue
+            # The first packet of a type follows the origin by less than one rollover
+            _ticks = unwrap_timestamps(columns[_name]["timestamp"], self._last_ticks.get(_name, self._origin))
+            if len(_ticks):
+                self._last_ticks[_name] = int(_ticks[-1])
+                _ticks -= self._origin
+            columns[_name]["tick"] = _ticks
+            if self.tick_rate is not None:
+                _time = _ticks / self.tick_rate
+                if self.start_time is not None:
+                    _time += self.start_time
+                columns[_name]["time"] = _time
+        return columns
+
+    def reset(self):
+        """Restart the time axis at the next block, after a stream restart."""
+        self._origin = None
+        self._last_ticks.clear()
+
+    @staticmethod
+    def _find_origin(columns):
+        """Raw timestamp of the oldest first packet among the packet types of a block."""
+        _firsts = [int(columns[_name]["timestamp"][0]) for _name in PACKET_TYPE_NAMES
+                   if _name in columns and len(columns[_name]["timestamp"])]
+        if not _firsts:
+            return None
+        # Signed distance to the first one, the packet types start within half a rollover
+        _offsets = [(_first - _firsts[0] + TIMESTAMP_MODULO // 2) % TIMESTAMP_MODULO - TIMESTAMP_MODULO // 2
+                    for _first in _firsts]
+        return _firsts[0] + min(_offsets)
@@ -11,4 +11,9 @@ setup(
                       'numpy',
                       'regex',
                       ],
+    extras_require={'arrow': ['pyarrow'],
+                    'test': ['pytest'],
+                    },
+    entry_points={'console_scripts': ['pyipr=pyipr_sensor_lib.ipr_cli:main'],
+                  },
 )
\ No newline at end of file
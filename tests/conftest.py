@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+import pytest
+
+from pyipr_sensor_lib.ipr_encoder import IPRCaptureGenerator
+
+EXAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Examples", "")
+EXAMPLE_FILE = "binary_data_example_01.bin"
+
+
+@pytest.fixture(scope="session")
+def example_data():
+    """Capture of a real sensor, with rollovers, escaped bytes and one truncated telegram."""
+    with open(EXAMPLE_PATH + EXAMPLE_FILE, 'rb') as _file:
+        return _file.read()
+
+
+@pytest.fixture(scope="session")
+def generated_data():
+    """Synthetic capture of about 840 kB (8 timestamp rollovers) with corrupted and lost telegrams."""
+    _generator = IPRCaptureGenerator(jitter=500, corruption_rate=0.002, gap_rate=0.002, seed=11)
+    return _generator.generate(1 << 30)
+
+
+@pytest.fixture
+def capture_file(tmp_path, generated_data):
+    """(filepath, filename) of the synthetic capture written to a temporary directory."""
+    with open(str(tmp_path / "capture.bin"), 'wb') as _file:
+        _file.write(generated_data)
+    return str(tmp_path) + os.sep, "capture.bin"
+
+
+def assert_columns_equal(columns, expected):
+    """Check that two results of decode_batch hold the same packet types, columns and values."""
+    assert list(columns) == list(expected)
+    for _name, _expected_columns in expected.items():
+        assert list(columns[_name]) == list(_expected_columns)
+        for _column, _values in _expected_columns.items():
+            assert columns[_name][_column].dtype == _values.dtype
+            assert np.array_equal(columns[_name][_column], _values), (_name, _column)
@@ -0,0 +1,69 @@
+import threading
+import time
+
+from pyipr_sensor_lib.ipr_acquisition import IPRBackgroundReader, IPRRingBuffer
+from pyipr_sensor_lib.ipr_metrics import IPRMetrics
+
+
+class FakeSerialInterface:
+    """Serial interface returning the blocks of a capture, then nothing."""
+
+    def __init__(self, data, block_size=1000, metrics=None):
+        self._blocks = [data[_start:_start + block_size] for _start in range(0, len(data), block_size)]
+        self.metrics = metrics
+        self.finished = threading.Event()
+
+    def serial_read_available(self):
+        if not self._blocks:
+            self.finished.set()
+            self.finished.wait(0.001)
+            return b''
+        return self._blocks.pop(0)
+
+
+def test_ring_buffer_wraps_around():
+    _buffer = IPRRingBuffer(10)
+    assert _buffer.write(b'0123456') == 7
+    assert _buffer.read(5) == b'01234'
+    assert _buffer.write(b'789abcde') == 8
+    assert _buffer.get_length() == 10
+    assert _buffer.read() == b'56789abcde'
+    assert _buffer.read() == b''
+
+
+def test_ring_buffer_counts_overflow():
+    _buffer = IPRRingBuffer(4)
+    assert _buffer.write(b'abcdef') == 4
+    assert _buffer.overflow_bytes == 2
+    assert _buffer.read() == b'abcd'
+
+
+def test_background_reader_frames_every_telegram(generated_data):
+    _metrics = IPRMetrics()
+    _interface = FakeSerialInterface(generated_data, metrics=_metrics)
+    _reader = IPRBackgroundReader(_interface, queue_size=1 << 20)
+    _reader.start()
+    _expected = generated_data.split(b'\x08')[:-1]
+    _telegrams = [_reader.get_telegram(5) for _ in _expected]
+    _reader.stop()
+    assert _telegrams == _expected
+    assert not _reader.is_running()
+    assert _reader.bytes_read == len(generated_data)
+    assert _metrics.get_counter(IPRMetrics.TELEGRAMS_FRAMED) == len(_expected)
+
+
+def test_background_reader_drops_oldest_when_full(generated_data):
+    _interface = FakeSerialInterface(generated_data)
+    _reader = IPRBackgroundReader(_interface, queue_size=10, drop_policy=IPRBackgroundReader.DROP_OLDEST)
+    _reader.start()
+    assert _interface.finished.wait(5)
+    _expected = generated_data.split(b'\x08')[:-1]
+    for _ in range(500):
+        if _reader.telegrams_framed == len(_expected):
+            break
+        time.sleep(0.01)
+    _reader.stop()
+    _telegrams = [_reader.get_telegram(0) for _ in range(10)]
+    assert _telegrams == _expected[-10:]
+    assert _reader.telegrams_dropped == len(_expected) - 10
+    assert _reader.get_telegram(0) is None
@@ -0,0 +1,35 @@
+import time
+
+import numpy as np
+
+from pyipr_sensor_lib.ipr_acquisition_manager import IPRAcquisitionManager
+from pyipr_sensor_lib.ipr_batch_decoder import concatenate_batches, decode_batch
+from pyipr_sensor_lib.ipr_sensor_simulator import IPRSensorSimulator
+
+
+def test_sensors_are_decoded_in_reception_order(example_data):
+    _simulators = [IPRSensorSimulator(name=_name, telegram_rate=4000, capture=example_data)
+                   for _name in ("SIM_A", "SIM_B")]
+    for _simulator in _simulators:
+        _simulator.start()
+    _manager = IPRAcquisitionManager([_simulator.get_port_name() for _simulator in _simulators], workers=2,
+                                     batch_size=500, batch_interval=0.05)
+    try:
+        _manager.start()
+        time.sleep(0.5)
+    finally:
+        _manager.stop()
+        for _simulator in _simulators:
+            _simulator.stop()
+    _results = dict()
+    for _name, _columns in _manager.read_results(timeout=5):
+        _results.setdefault(_name, list()).append(_columns)
+
+    assert sorted(_results) == ["SIM_A", "SIM_B"]
+    _expected = decode_batch(example_data)["STRAIN"]["timestamp"]
+    for _batches in _results.values():
+        _timestamps = concatenate_batches(_batches)["STRAIN"]["timestamp"]
+        assert len(_timestamps) > 100
+        # A contiguous part of the capture, the simulator looping over it from the beginning
+        _start = int(np.flatnonzero(_expected == _timestamps[0])[0])
+        assert np.array_equal(_timestamps, _expected[_start:_start + len(_timestamps)])
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from pyipr_sensor_lib.ipr_aggregation import IPRWindowAggregator, lttb_downsample
+from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+from pyipr_sensor_lib.ipr_time_axis import IPRTimeAxis
+
+
+def reference_windows(columns, index, channel):
+    """Statistics of each window computed in one pass over the whole capture."""
+    _windows = {"start": list(), "count": list(), "min": list(), "max": list(), "mean": list(), "rms": list()}
+    for _window in np.unique(index):
+        _values = columns[channel][index == _window].astype(np.float64)
+        _windows["start"].append(columns["tick"][index == _window][0])
+        _windows["count"].append(len(_values))
+        _windows["min"].append(_values.min())
+        _windows["max"].append(_values.max())
+        _windows["mean"].append(_values.mean())
+        _windows["rms"].append(np.sqrt(np.mean(_values * _values)))
+    return _windows
+
+
+@pytest.mark.parametrize("window", [{"window_rows": 1000}, {"window_time": 5000000}])
+def test_blocks_match_one_pass(generated_data, window):
+    _columns = IPRTimeAxis().update(decode_batch(generated_data))["STRAIN"]
+    _aggregator = IPRWindowAggregator(**window)
+    _rows = len(_columns["tick"])
+    for _start in range(0, _rows, 777):
+        _aggregator.update({_name: _values[_start:_start + 777] for _name, _values in _columns.items()})
+    _windows = _aggregator.get_windows()
+    _flushed = _aggregator.get_windows(flush=True)
+    assert len(_flushed["count"]) == 1
+    _windows = {_name: np.concatenate((_values, _flushed[_name])) for _name, _values in _windows.items()}
+    assert _windows["count"].sum() == _rows
+
+    if "window_rows" in window:
+        _index = np.arange(_rows) // window["window_rows"]
+    else:
+        _index = _columns["tick"] // window["window_time"]
+    for _channel in ("strain_x", "strain_angle"):
+        _expected = reference_windows(_columns, _index, _channel)
+        assert np.array_equal(_windows["start"], _expected["start"])
+        assert np.array_equal(_windows["count"], _expected["count"])
+        for _statistic in ("min", "max", "mean", "rms"):
+            assert np.allclose(_windows["{}_{}".format(_channel, _statistic)], _expected[_statistic],
+                               rtol=1e-9, atol=1e-6), _statistic
+
+
+def test_window_arguments():
+    with pytest.raises(ValueError):
+        IPRWindowAggregator()
+    with pytest.raises(ValueError):
+        IPRWindowAggregator(window_rows=10, window_time=10)
+    _aggregator = IPRWindowAggregator(window_rows=10, channels=["value"])
+    assert len(_aggregator.get_windows(flush=True)["value_mean"]) == 0
+
+
+def test_lttb_keeps_the_peaks():
+    _x = np.arange(10000, dtype=np.float64)
+    _y = np.sin(_x / 500)
+    _y[1234], _y[7777] = 50, -50
+    _kept_x, _kept_y = lttb_downsample(_x, _y, 100)
+    assert len(_kept_x) == 100
+    assert _kept_x[0] == 0 and _kept_x[-1] == 9999
+    assert np.all(np.diff(_kept_x) > 0)
+    assert 1234 in _kept_x and 7777 in _kept_x
+    assert np.array_equal(_kept_y, _y[_kept_x.astype(np.int64)])
+
+    # Nothing to reduce
+    _short_x, _short_y = lttb_downsample(_x[:50], _y[:50], 100)
+    assert np.array_equal(_short_x, _x[:50])
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pytest
+
+from pyipr_sensor_lib.ipr_arrow_export import IPRParquetWriter, to_record_batches
+from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def test_record_batches(example_data):
+    _columns = decode_batch(example_data)
+    _columns["EMPTY"] = {"timestamp": np.zeros(0, dtype=np.uint32)}
+    _batches = to_record_batches(_columns)
+    assert list(_batches) == ["STRAIN", "ENVIRONMENT", "ACCELERATION"]
+    for _name, _batch in _batches.items():
+        assert _batch.schema.names == list(_columns[_name])
+        for _column, _values in _columns[_name].items():
+            _array = _batch.column(_column).to_numpy()
+            assert _array.dtype == _values.dtype
+            assert np.array_equal(_array, _values)
+
+
+def test_parquet_dataset(tmp_path, generated_data):
+    _expected = decode_batch(generated_data)
+    _split = generated_data.rfind(b'\x08', 0, len(generated_data) // 2) + 1
+    _blocks = [generated_data[:_split], generated_data[_split:]]
+    with IPRParquetWriter(str(tmp_path) + os.sep, "dataset", max_rows_per_file=10000) as _writer:
+        for _block in _blocks:
+            _writer.write_batch(decode_batch(_block))
+
+    for _name, _columns in _expected.items():
+        assert _writer.rows_written[_name] == len(_columns["timestamp"])
+        _directory = tmp_path / "dataset" / "packet_type={}".format(_name)
+        _files = sorted(os.listdir(str(_directory)))
+        assert len(_files) == -(-len(_columns["timestamp"]) // 10000)
+        _table = pq.read_table(str(_directory))
+        assert _table.column_names == list(_columns)
+        for _column, _values in _columns.items():
+            assert np.array_equal(_table.column(_column).to_numpy(), _values)
+
+
+def test_existing_files_are_kept(tmp_path, example_data):
+    _columns = decode_batch(example_data)
+    for _ in range(2):
+        with IPRParquetWriter(str(tmp_path) + os.sep, "dataset", max_rows_per_file=10000) as _writer:
+            _writer.write_batch(_columns)
+    _directory = tmp_path / "dataset" / "packet_type=STRAIN"
+    assert sorted(os.listdir(str(_directory))) == ["part-{:05d}.parquet".format(_number) for _number in range(4)]
+    _table = pq.read_table(str(_directory))
+    assert np.array_equal(_table.column("timestamp").to_numpy(), np.tile(_columns["STRAIN"]["timestamp"], 2))
+
+
+def test_changed_columns_are_rejected(tmp_path, example_data):
+    _scaled = decode_batch(example_data, scaled=True)
+    _raw = decode_batch(example_data, scaled=False)
+    _writer = IPRParquetWriter(str(tmp_path) + os.sep, "dataset")
+    try:
+        _writer.write_batch(_scaled)
+        with pytest.raises(ValueError):
+            _writer.write_batch(_raw)
+        # Also when the next batch starts a new file
+        _writer.close()
+        with pytest.raises(ValueError):
+            _writer.write_batch(_raw)
+    finally:
+        _writer.close()
+    # And when another writer adds files to the dataset
+    with IPRParquetWriter(str(tmp_path) + os.sep, "dataset") as _writer:
+        with pytest.raises(ValueError):
+            _writer.write_batch(_raw)
+        _writer.write_batch(_scaled)
+    assert len(os.listdir(str(tmp_path / "dataset" / "packet_type=STRAIN"))) == 2
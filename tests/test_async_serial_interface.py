@@ -0,0 +1,40 @@
+import asyncio
+
+from pyipr_sensor_lib.ipr_async_serial_interface import AsyncIPRSerialInterface
+from pyipr_sensor_lib.ipr_metrics import IPRMetrics
+from pyipr_sensor_lib.ipr_serial_interface import STREAM_STOP_PROBE_COMMAND, format_command
+
+
+class FakeSerialPort:
+    """Serial port recording the commands written, the replies being put in the receive buffer."""
+
+    def __init__(self):
+        self.written = bytearray()
+
+    def write(self, data):
+        self.written += data
+
+
+def _make_interface(received, streaming=False, metrics=None):
+    _interface = AsyncIPRSerialInterface(metrics)
+    _interface._serial_port_obj = FakeSerialPort()
+    _interface._receive_buffer += received
+    _interface.is_binary_reading_running = streaming
+    return _interface
+
+
+def test_getters_use_the_shared_reply_parsing():
+    _interface = _make_interface(b"material\r\nMaterial = Steel\r\n>name\r\nName : SENSOR_A\r\n>")
+    assert asyncio.run(_interface.serial_ipr_get_sensor_material_type()) == "Steel"
+    assert asyncio.run(_interface.serial_ipr_get_sensor_name()) == "SENSOR_A"
+    assert _interface._serial_port_obj.written == format_command("material") + format_command("name")
+
+
+def test_stream_stop_is_timed():
+    _metrics = IPRMetrics()
+    _probe_reply = format_command(STREAM_STOP_PROBE_COMMAND) + b"\r\nName : SENSOR_A\r\n>"
+    _interface = _make_interface(b'\x01\x02\x08' + _probe_reply + b"tare\r\n1.5\r\n>", True, _metrics)
+    assert asyncio.run(_interface.serial_ipr_get_sensor_tare()) == "1.5"
+    assert _interface.is_binary_reading_running is False
+    assert _interface.stream_stop_timing.count == 1
+    assert _metrics.timings[IPRMetrics.STAGE_STREAM_STOP].count == 1
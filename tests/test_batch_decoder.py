@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from conftest import EXAMPLE_FILE, EXAMPLE_PATH
+from pyipr_sensor_lib.ipr_batch_decoder import (batch_split_telegrams, batch_unescape, concatenate_batches,
+                                                decode_batch)
+from pyipr_sensor_lib.ipr_metrics import IPRMetrics
+from pyipr_sensor_lib.ipr_packet_layout import PACKET_LAYOUTS
+from pyipr_sensor_lib.ipr_parser import IPRParser
+from pyipr_sensor_lib.ipr_sensor_decoder import IPRSensorDecoder
+
+_RAW_ARRAYS = {"STRAIN": "raw_strain", "ENVIRONMENT": "raw_env", "ACCELERATION": "raw_acc"}
+_SCALED_ARRAYS = {"STRAIN": "scaled_strain", "ENVIRONMENT": "scaled_env", "ACCELERATION": "scaled_acc"}
+
+
+def decode_scalar(data):
+    """Decode a capture telegram by telegram with analyse_packet, into the columns of decode_batch."""
+    _decoder = IPRSensorDecoder()
+    _rows = {_layout.name: list() for _layout in PACKET_LAYOUTS}
+    for _telegram in data.split(b'\x08')[:-1]:
+        _decoder.analyse_packet(_telegram)
+        if not _decoder.is_packet_valid:
+            continue
+        _parser = _decoder.ipr_parser_obj
+        _name = _parser.packet_type
+        _rows[_name].append([_parser.raw_header[3], _parser.raw_header[2]] +
+                            list(getattr(_parser, _RAW_ARRAYS[_name])) +
+                            list(getattr(_parser, _SCALED_ARRAYS[_name])))
+    return _rows
+
+
+@pytest.mark.parametrize("capture", ["example_data", "generated_data"])
+def test_batch_matches_analyse_packet(request, capture):
+    _data = request.getfixturevalue(capture)
+    _raw = decode_batch(_data, scaled=False)
+    _scaled = decode_batch(_data, scaled=True)
+    _scalar = decode_scalar(_data)
+    for _layout in PACKET_LAYOUTS:
+        _rows = np.array(_scalar[_layout.name], dtype=np.float64).reshape(-1, 2 + 2 * len(_layout.columns))
+        _width = len(_layout.columns)
+        assert _raw[_layout.name]["timestamp"].tolist() == _rows[:, 0].tolist()
+        assert _raw[_layout.name]["sequence"].tolist() == _rows[:, 1].tolist()
+        for _index, _column in enumerate(_layout.columns):
+            assert _raw[_layout.name][_column].tolist() == _rows[:, 2 + _index].tolist()
+            assert _scaled[_layout.name][_column].tolist() == _rows[:, 2 + _width + _index].astype(np.float32).tolist()
+
+
+def test_example_capture_counts(example_data):
+    _metrics = IPRMetrics()
+    _columns = decode_batch(example_data, metrics=_metrics)
+    assert {_name: len(_values["timestamp"]) for _name, _values in _columns.items()} == \
+        {"STRAIN": 17544, "ENVIRONMENT": 18, "ACCELERATION": 4386}
+    assert _metrics.get_counter(IPRMetrics.TELEGRAMS_FRAMED) == 21950
+    assert _metrics.get_counter(IPRMetrics.SHORT_PACKETS_STRAIN) == 1
+    assert _metrics.get_counter(IPRMetrics.CRC_FAILURES) == 0
+
+
+def test_headers_include_rejected_packets(example_data):
+    _headers = dict()
+    _columns = decode_batch(example_data, headers=_headers)
+    for _name, _header in _headers.items():
+        assert _header["timestamp"][_header["valid"]].tolist() == _columns[_name]["timestamp"].tolist()
+    assert np.count_nonzero(~_headers["STRAIN"]["valid"]) == 1
+
+
+def test_short_packet_is_not_printed(capsys, example_data):
+    # The example capture holds a strain telegram too short for its type
+    decode_scalar(example_data)
+    assert capsys.readouterr().out == ""
+
+
+def test_batch_unescape_matches_scalar(example_data):
+    _data = np.frombuffer(example_data, dtype=np.uint8)
+    _starts, _ends = batch_split_telegrams(_data)
+    _clean, _clean_starts, _clean_lengths = batch_unescape(_data, _starts, _ends)
+    _parser = IPRParser()
+    for _index, _telegram in enumerate(example_data.split(b'\x08')[:-1]):
+        _start = _clean_starts[_index]
+        assert _clean[_start:_start + _clean_lengths[_index]].tobytes() == _parser.parser_unescape(_telegram)
+
+
+def test_hexadecimal_telegrams_match_bytes(example_data):
+    _decoder = IPRSensorDecoder()
+    _hex_decoder = IPRSensorDecoder()
+    _telegrams = example_data.split(b'\x08')[:-1]
+    assert _hex_decoder.load_from_binary_file(EXAMPLE_PATH, EXAMPLE_FILE) == [_telegram.hex() for _telegram in _telegrams]
+    for _telegram in _telegrams:
+        _decoder.analyse_packet(_telegram)
+        _hex_decoder.analyse_packet(_telegram.hex())
+        assert _hex_decoder.is_packet_valid == _decoder.is_packet_valid
+        if _decoder.is_packet_valid:
+            assert _hex_decoder.ipr_parser_obj.raw_header == _decoder.ipr_parser_obj.raw_header
+            assert _hex_decoder.ipr_parser_obj.scaled_strain == _decoder.ipr_parser_obj.scaled_strain
+
+
+def test_concatenate_batches(example_data):
+    _middle = example_data.index(b'\x08', len(example_data) // 2) + 1
+    _joined = concatenate_batches([decode_batch(example_data[:_middle]), decode_batch(example_data[_middle:])])
+    _whole = decode_batch(example_data)
+    for _name, _columns in _whole.items():
+        for _column, _values in _columns.items():
+            assert np.array_equal(_joined[_name][_column], _values)
+    assert all(len(_columns["timestamp"]) == 0 for _columns in concatenate_batches([]).values())
+
+
+def test_empty_and_incomplete_data():
+    assert all(len(_columns["timestamp"]) == 0 for _columns in decode_batch(b'').values())
+    assert all(len(_columns["timestamp"]) == 0 for _columns in decode_batch(b'\x01\x02\x03').values())
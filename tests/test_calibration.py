@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+from pyipr_sensor_lib.ipr_calibration import IPRCalibration
+from pyipr_sensor_lib.ipr_parser import IPRParser
+from pyipr_sensor_lib.ipr_sensor_decoder import IPRSensorDecoder
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("X=1.5 Y=-2 Z=0", (1.5, -2.0, 0.0)),
+    ("Tare X : 10\r\nY : 20.25\r\nZ : -30", (10.0, 20.25, -30.0)),
+    ("X=Y=Z=0.5", (0.5, 0.5, 0.5)),
+    ("Z=3", (0.0, 0.0, 3.0)),
+    ("gain 1.1 1.2 1.3", (1.1, 1.2, 1.3)),
+    ("", (0.0, 0.0, 0.0)),
+])
+def test_parse_axis_values(text, expected):
+    assert IPRCalibration.parse_axis_values(text) == expected
+
+
+def test_default_tables_match_the_interpolation():
+    _tables = IPRParser.get_default_scale_tables()
+    for _name, _ranges in (("STRAIN", IPRParser.SCALE_RANGES_STRAIN),
+                           ("ENVIRONMENT", IPRParser.SCALE_RANGES_ENVIRONMENT),
+                           ("ACCELERATION", IPRParser.SCALE_RANGES_ACCELERATION)):
+        assert len(_tables[_name]) == len(_ranges)
+        for _table, _range in zip(_tables[_name], _ranges):
+            assert len(_table) == _range[1] + 1
+            for _raw in (0, 1, _range[1] // 2, _range[1]):
+                assert _table[_raw] == pytest.approx(IPRParser.convert_numeric_to_scale(_raw, *_range), rel=1e-6)
+    assert IPRParser.get_default_scale_tables() is _tables
+
+
+def test_calibration_is_folded_into_the_tables(example_data):
+    _calibration = IPRCalibration.from_sensor_replies("X=10 Y=-20 Z=0", "X=2 Y=0 Z=0.5", "X=0 Y=0 Z=100")
+    _default = decode_batch(example_data)["STRAIN"]
+    _calibrated = decode_batch(example_data, scale_tables=_calibration.build_scale_tables())["STRAIN"]
+
+    _is_set = _default["strain_x"] != 0  # A raw value of 0 stays 0
+    assert np.allclose(_calibrated["strain_x"][_is_set], (_default["strain_x"][_is_set] - 10) * 2, atol=1e-2)
+    # A gain of 0 is the sensor default: no gain
+    assert np.allclose(_calibrated["strain_y"][_is_set], _default["strain_y"][_is_set] + 20, atol=1e-2)
+    assert np.allclose(_calibrated["strain_z"][_is_set], _default["strain_z"][_is_set] * 0.5 + 100, atol=1e-2)
+    for _column in ("strain_p1", "strain_p2", "strain_angle"):
+        assert np.array_equal(_calibrated[_column], _default[_column])
+
+
+def test_sensor_decoder_calibration(example_data):
+    _decoder = IPRSensorDecoder()
+    _calibration = IPRCalibration(tare=(10.0, 0.0, 0.0))
+    _decoder.set_calibration(_calibration)
+    _expected = decode_batch(example_data, scale_tables=_calibration.build_scale_tables())
+    assert np.array_equal(_decoder.decode_batch(example_data)["STRAIN"]["strain_x"], _expected["STRAIN"]["strain_x"])
+    _decoder.set_calibration(None)
+    assert np.array_equal(_decoder.decode_batch(example_data)["STRAIN"]["strain_x"],
+                          decode_batch(example_data)["STRAIN"]["strain_x"])
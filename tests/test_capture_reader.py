@@ -0,0 +1,102 @@
+import pytest
+
+from conftest import assert_columns_equal
+from pyipr_sensor_lib.ipr_batch_decoder import concatenate_batches, decode_batch
+from pyipr_sensor_lib.ipr_capture_reader import IPRCaptureFollower, IPRCaptureReader, decode_file_parallel
+
+
+@pytest.mark.parametrize("chunk_size", [1, 1000, 65536, 1 << 30])
+def test_chunks_hold_complete_telegrams(capture_file, generated_data, chunk_size):
+    _reader = IPRCaptureReader(*capture_file, chunk_size=chunk_size)
+    _chunks = list(_reader.read_chunks())
+    assert b''.join(_chunks) == generated_data[:generated_data.rfind(b'\x08') + 1]
+    assert all(_chunk.endswith(b'\x08') for _chunk in _chunks)
+    if chunk_size > 1:
+        assert all(len(_chunk) <= chunk_size for _chunk in _chunks[:-1])
+
+
+def test_read_batches_matches_one_shot(capture_file, generated_data):
+    _reader = IPRCaptureReader(*capture_file, chunk_size=50000)
+    assert_columns_equal(concatenate_batches(_reader.read_batches(False)), decode_batch(generated_data, False))
+    assert list(_reader.read_telegrams()) == generated_data.split(b'\x08')[:-1]
+
+
+def test_incomplete_last_telegram_is_ignored(tmp_path, generated_data):
+    with open(str(tmp_path / "partial.bin"), 'wb') as _file:
+        _file.write(generated_data + b'\x01\x02\x03')
+    _reader = IPRCaptureReader(str(tmp_path) + "/", "partial.bin", chunk_size=4096)
+    assert_columns_equal(concatenate_batches(_reader.read_batches()), decode_batch(generated_data))
+
+
+def test_empty_file(tmp_path):
+    open(str(tmp_path / "empty.bin"), 'wb').close()
+    _reader = IPRCaptureReader(str(tmp_path) + "/", "empty.bin")
+    assert list(_reader.read_chunks()) == []
+    assert _reader.split_ranges() == []
+
+
+def test_split_ranges_cover_the_file(capture_file, generated_data):
+    _ranges = IPRCaptureReader(*capture_file, chunk_size=100000).split_ranges()
+    assert _ranges[0][0] == 0 and _ranges[-1][1] == generated_data.rfind(b'\x08') + 1
+    assert all(_previous[1] == _next[0] for _previous, _next in zip(_ranges, _ranges[1:]))
+    assert all(generated_data[_end - 1] == 0x08 for _, _end in _ranges)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parallel_decode_matches_one_shot(capture_file, generated_data, workers):
+    _columns = decode_file_parallel(*capture_file, workers=workers, scaled=True, chunk_size=100000)
+    assert_columns_equal(_columns, decode_batch(generated_data))
+
+
+def _append(path, data):
+    with open(path, 'ab') as _file:
+        _file.write(data)
+
+
+def test_follower_matches_one_shot(tmp_path, generated_data):
+    _path = str(tmp_path / "growing.bin")
+    _follower = IPRCaptureFollower(str(tmp_path) + "/", "growing.bin", chunk_size=30000)
+    assert list(_follower.read_batches()) == []  # Not created yet
+    _batches = list()
+    # Append pieces cutting telegrams and escape sequences anywhere
+    for _start in range(0, len(generated_data), 77777):
+        _append(_path, generated_data[_start:_start + 77777])
+        _batches.extend(_follower.read_batches(False))
+    assert _follower.offset == generated_data.rfind(b'\x08') + 1
+    assert_columns_equal(concatenate_batches(_batches), decode_batch(generated_data, False))
+
+
+def test_follower_resumes_from_checkpoint(tmp_path, generated_data):
+    _directory = str(tmp_path) + "/"
+    _middle = generated_data.index(b'\x08', len(generated_data) // 2) + 1
+    _append(_directory + "capture.bin", generated_data[:_middle + 5])
+    _first = IPRCaptureFollower(_directory, "capture.bin")
+    _before = list(_first.read_batches())
+    _first.save_checkpoint(_directory, "capture.checkpoint")
+
+    _append(_directory + "capture.bin", generated_data[_middle + 5:])
+    _second = IPRCaptureFollower(_directory, "capture.bin")
+    assert _second.load_checkpoint(_directory, "capture.checkpoint")
+    assert _second.offset == _middle
+    assert_columns_equal(concatenate_batches(_before + list(_second.read_batches())), decode_batch(generated_data))
+
+
+def test_follower_restarts_on_replaced_file(tmp_path, generated_data):
+    _directory = str(tmp_path) + "/"
+    _append(_directory + "capture.bin", generated_data)
+    _follower = IPRCaptureFollower(_directory, "capture.bin")
+    list(_follower.read_chunks())
+    _follower.save_checkpoint(_directory, "capture.checkpoint")
+
+    _short = generated_data[:generated_data.index(b'\x08', 1000) + 1]
+    with open(_directory + "capture.bin", 'wb') as _file:
+        _file.write(_short)
+    assert b''.join(_follower.read_chunks()) == _short
+    assert _follower.restart_count == 1
+    assert not IPRCaptureFollower(_directory, "capture.bin").load_checkpoint(_directory, "capture.checkpoint")
+
+
+def test_follow_stops_when_idle(capture_file, generated_data):
+    _follower = IPRCaptureFollower(*capture_file, chunk_size=100000)
+    _batches = list(_follower.follow(poll_interval=0.01, idle_timeout=0.05))
+    assert_columns_equal(concatenate_batches(_batches), decode_batch(generated_data))
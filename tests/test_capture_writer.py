@@ -0,0 +1,51 @@
+import os
+
+from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+from pyipr_sensor_lib.ipr_capture_writer import IPRCaptureWriter
+
+
+def write_pieces(writer, data, size):
+    for _start in range(0, len(data), size):
+        writer.write(data[_start:_start + size])
+    writer.close()
+
+
+def test_single_file_holds_the_stream(tmp_path, example_data):
+    _writer = IPRCaptureWriter(str(tmp_path) + os.sep, "capture.bin", buffer_size=4096)
+    write_pieces(_writer, example_data, 1000)
+    assert (tmp_path / "capture.bin").read_bytes() == example_data
+
+    # An existing file is appended to
+    _writer = IPRCaptureWriter(str(tmp_path) + os.sep, "capture.bin")
+    write_pieces(_writer, example_data, 1000)
+    assert (tmp_path / "capture.bin").read_bytes() == example_data * 2
+
+
+def test_rotation_on_telegram_boundaries(tmp_path, example_data):
+    (tmp_path / "capture_0001.bin").write_bytes(b'previous capture')
+    _writer = IPRCaptureWriter(str(tmp_path) + os.sep, "capture.bin", max_file_size=50000)
+    write_pieces(_writer, example_data, 7000)
+
+    _names = sorted(os.listdir(str(tmp_path)))[1:]
+    assert len(_names) > 2
+    assert _names[0] == "capture_0002.bin"
+    _parts = [(tmp_path / _name).read_bytes() for _name in _names]
+    assert b''.join(_parts) == example_data
+    for _part in _parts[:-1]:
+        assert _part.endswith(b'\x08')
+        # The limit is checked before each write, the file then ends at the next separator
+        assert 50000 <= len(_part) < 50000 + 2 * 7000
+    # Each file decodes on its own to its part of the stream
+    assert sum(len(decode_batch(_part)["STRAIN"]["timestamp"]) for _part in _parts) == \
+        len(decode_batch(example_data)["STRAIN"]["timestamp"])
+
+
+def test_flush_makes_data_visible(tmp_path):
+    _writer = IPRCaptureWriter(str(tmp_path) + os.sep, "capture.bin", buffer_size=1 << 20, flush_interval=0,
+                               fsync_policy=IPRCaptureWriter.FSYNC_ON_FLUSH)
+    try:
+        _writer.write(b'\x01\x02\x08')
+        assert (tmp_path / "capture.bin").read_bytes() == b'\x01\x02\x08'
+    finally:
+        _writer.close()
+    _writer.close()
@@ -0,0 +1,96 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from pyipr_sensor_lib.ipr_batch_decoder import HEADER_COLUMNS, decode_batch
+from pyipr_sensor_lib.ipr_cli import COLUMNAR_EXTENSION, format_csv, main
+from pyipr_sensor_lib.ipr_columnar_store import IPRColumnarReader
+from pyipr_sensor_lib.ipr_packet_layout import PACKET_LAYOUTS
+from pyipr_sensor_lib.ipr_sensor_simulator import IPRSensorSimulator
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_decode(capsysbinary, capture_file, generated_data, workers):
+    _path = capture_file[0] + capture_file[1]
+    assert main(["decode", _path, "--type", "ACCELERATION", "--chunk-size", "65536",
+                 "--workers", str(workers)]) == 0
+    _header = ",".join(HEADER_COLUMNS + PACKET_LAYOUTS[2].columns).encode("utf-8") + b"\n"
+    assert capsysbinary.readouterr().out == _header + format_csv(decode_batch(generated_data)["ACCELERATION"])
+
+
+def test_decode_raw_with_filename(capsysbinary, capture_file, generated_data):
+    _path = capture_file[0] + capture_file[1]
+    assert main(["decode", _path, "--raw", "--with-filename", "--no-header", "--workers", "1"]) == 0
+    _expected = format_csv(decode_batch(generated_data, scaled=False)["STRAIN"], _path)
+    assert capsysbinary.readouterr().out == _expected
+
+
+def test_missing_file(capsys, tmp_path):
+    assert main(["stats", str(tmp_path / "missing.bin"), "--workers", "1"]) == 1
+    assert "missing.bin" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("output_format", ["csv", "columnar", "parquet"])
+def test_convert(capsys, tmp_path, capture_file, generated_data, output_format):
+    if output_format == "parquet":
+        pytest.importorskip("pyarrow")
+    _output_dir = str(tmp_path / "converted")
+    assert main(["convert", capture_file[0] + capture_file[1], "--format", output_format,
+                 "--output-dir", _output_dir, "--chunk-size", "100000", "--workers", "1"]) == 0
+    _expected = decode_batch(generated_data)
+    _printed = capsys.readouterr().out
+    for _name, _columns in _expected.items():
+        assert "{} {}".format(len(_columns["timestamp"]), _name) in _printed
+
+    if output_format == "csv":
+        _text = (tmp_path / "converted" / "capture_STRAIN.csv").read_bytes()
+        assert _text == ",".join(_expected["STRAIN"]).encode("utf-8") + b"\n" + format_csv(_expected["STRAIN"])
+    elif output_format == "columnar":
+        _reader = IPRColumnarReader(os.path.join(_output_dir, ""), "capture" + COLUMNAR_EXTENSION)
+        try:
+            assert _reader.time_column == "tick"
+            _read = _reader.read("STRAIN")
+            assert np.array_equal(_read["strain_x"], _expected["STRAIN"]["strain_x"])
+            assert np.all(np.diff(_read["tick"]) > 0)
+        finally:
+            _reader.close()
+    else:
+        import pyarrow.parquet
+        _table = pyarrow.parquet.read_table(os.path.join(_output_dir, "capture", "packet_type=STRAIN"))
+        assert np.array_equal(_table.column("strain_x").to_numpy(), _expected["STRAIN"]["strain_x"])
+
+
+def test_stats(capsys, example_data, tmp_path):
+    (tmp_path / "example.bin").write_bytes(example_data)
+    _path = str(tmp_path / "example.bin")
+    assert main(["stats", _path, "--json", "--chunk-size", "65536", "--workers", "1"]) == 0
+    _stats = json.loads(capsys.readouterr().out)
+    assert _stats["bytes"] == len(example_data)
+    assert _stats["counters"]["telegrams_framed"] == 21950
+    assert _stats["counters"]["telegrams_decoded"] == 21948
+    assert _stats["counters"]["short_telegrams"] == 1
+    assert _stats["counters"]["crc_failures"] == 0
+    _acceleration = _stats["packets"]["ACCELERATION"]
+    assert (_acceleration["received"], _acceleration["lost"]) == (4386, 2)
+
+    assert main(["stats", _path, "--tick-rate", "1e6", "--workers", "1"]) == 0
+    _lines = capsys.readouterr().out.splitlines()
+    assert _lines[0].startswith("{}: {} bytes, 21950 telegrams, 21948 decoded".format(_path, len(example_data)))
+    assert "4386 received, 0 invalid, 2 lost (0.05 %)" in _lines[3]
+    assert _lines[3].endswith("packets/s")
+
+
+def test_record(capsys, tmp_path):
+    pytest.importorskip("serial")
+    _simulator = IPRSensorSimulator(telegram_rate=2000)
+    _simulator.start()
+    try:
+        assert main(["record", _simulator.get_port_name(), str(tmp_path / "record.bin"), "--duration", "0.3"]) == 0
+    finally:
+        _simulator.stop()
+    assert "bytes recorded" in capsys.readouterr().err
+    _data = (tmp_path / "record.bin").read_bytes()
+    _columns = decode_batch(_data[_data.find(b'\x08') + 1:])
+    assert sum(len(_type_columns["timestamp"]) for _type_columns in _columns.values()) > 100
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+from pyipr_sensor_lib.ipr_columnar_store import IPRColumnarReader, IPRColumnarWriter
+from pyipr_sensor_lib.ipr_time_axis import IPRTimeAxis
+
+
+def write_blocks(filepath, data, block_size, chunk_rows):
+    """Decode data block by block with a time axis into a columnar file, return the one-shot result."""
+    _time_axis = IPRTimeAxis()
+    _writer = IPRColumnarWriter(filepath, "capture.iprc", chunk_rows=chunk_rows, time_column="tick")
+    _start = 0
+    while _start < len(data):
+        _end = data.find(b'\x08', _start + block_size)
+        _end = len(data) if _end < 0 else _end + 1
+        _writer.write_batch(_time_axis.update(decode_batch(data[_start:_end])))
+        _start = _end
+    _writer.close()
+    return IPRTimeAxis().update(decode_batch(data))
+
+
+def test_round_trip(tmp_path, generated_data):
+    _filepath = str(tmp_path) + "/"
+    _expected = write_blocks(_filepath, generated_data, 100000, 1000)
+    _reader = IPRColumnarReader(_filepath, "capture.iprc")
+    try:
+        assert sorted(_reader.get_packet_types()) == sorted(_expected)
+        for _name, _columns in _expected.items():
+            assert _reader.get_row_count(_name) == len(_columns["tick"])
+            _read = _reader.read(_name)
+            assert list(_read) == list(_columns)
+            for _column, _values in _columns.items():
+                assert _read[_column].dtype == _values.dtype
+                assert np.array_equal(_read[_column], _values)
+    finally:
+        _reader.close()
+
+
+def test_time_range_query_on_ticks(tmp_path, generated_data):
+    _filepath = str(tmp_path) + "/"
+    _expected = write_blocks(_filepath, generated_data, 100000, 1000)["STRAIN"]
+    # The capture holds several rollovers: the range is only contiguous on the unwrapped ticks
+    _start, _end = np.percentile(_expected["tick"], [40, 45]).astype(np.int64)
+    _mask = (_expected["tick"] >= _start) & (_expected["tick"] <= _end)
+    _reader = IPRColumnarReader(_filepath, "capture.iprc")
+    try:
+        _read = _reader.read("STRAIN", ["strain_x", "timestamp"], time_start=_start, time_end=_end)
+        assert list(_read) == ["strain_x", "timestamp"]
+        assert np.array_equal(_read["strain_x"], _expected["strain_x"][_mask])
+        assert np.array_equal(_read["timestamp"], _expected["timestamp"][_mask])
+        assert _reader.read("STRAIN", time_start=_expected["tick"][-1] + 1) == dict()
+    finally:
+        _reader.close()
+
+
+def test_decreasing_time_column_is_rejected(tmp_path, generated_data):
+    _columns = decode_batch(generated_data)
+    _writer = IPRColumnarWriter(str(tmp_path) + "/", "capture.iprc")
+    try:
+        with pytest.raises(ValueError, match="rollover"):
+            _writer.write_batch(_columns)
+    finally:
+        _writer.close()
+
+    _writer = IPRColumnarWriter(str(tmp_path) + "/", "capture.iprc")
+    _block = {"STRAIN": {"timestamp": np.arange(10, 20)}}
+    try:
+        _writer.write_batch(_block)
+        with pytest.raises(ValueError):
+            _writer.write_batch({"STRAIN": {"timestamp": np.arange(5, 15)}})
+    finally:
+        _writer.close()
+
+
+def test_invalid_file(tmp_path):
+    (tmp_path / "capture.iprc").write_bytes(b'IPRCOL01 truncated')
+    with pytest.raises(ValueError):
+        IPRColumnarReader(str(tmp_path) + "/", "capture.iprc")
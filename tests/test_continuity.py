@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+from pyipr_sensor_lib.ipr_continuity import (EVENT_CONTINUOUS, EVENT_DUPLICATE, EVENT_FIRST, EVENT_GAP,
+                                             EVENT_OUT_OF_ORDER, EVENT_RESYNC, PACKET_TYPE_NAMES,
+                                             IPRContinuityTracker)
+from pyipr_sensor_lib.ipr_encoder import IPRCaptureGenerator
+
+
+def decode_headers(data, block_size):
+    """Headers filled by decode_batch for each block of about block_size bytes, ending on a separator."""
+    _blocks = list()
+    _start = 0
+    while _start < len(data):
+        _end = data.find(b'\x08', _start + block_size)
+        _end = len(data) if _end < 0 else _end + 1
+        _headers = dict()
+        decode_batch(data[_start:_end], headers=_headers)
+        _blocks.append(_headers)
+        _start = _end
+    return _blocks
+
+
+def update_scalar(tracker, blocks):
+    for _headers in blocks:
+        for _packet_type, _name in enumerate(PACKET_TYPE_NAMES):
+            _columns = _headers[_name]
+            for _sequence, _timestamp, _valid in zip(_columns["sequence"], _columns["timestamp"], _columns["valid"]):
+                tracker.update(_packet_type, _sequence, _timestamp, _valid)
+
+
+@pytest.mark.parametrize("capture", ["example_data", "generated_data"])
+@pytest.mark.parametrize("block_size", [5000, 1 << 30])
+def test_vectorized_matches_scalar(request, capture, block_size):
+    _blocks = decode_headers(request.getfixturevalue(capture), block_size)
+    _vectorized = IPRContinuityTracker()
+    for _headers in _blocks:
+        _vectorized.update_batch(_headers)
+    _scalar = IPRContinuityTracker()
+    update_scalar(_scalar, _blocks)
+    assert _vectorized.get_report() == _scalar.get_report()
+
+
+def test_lost_packets_match_the_dropped_telegrams():
+    _generator = IPRCaptureGenerator(jitter=500, gap_rate=0.01, seed=3)
+    _data = _generator.generate(1 << 30)
+    _tracker = IPRContinuityTracker()
+    for _headers in decode_headers(_data, 20000):
+        _tracker.update_batch(_headers)
+    _report = _tracker.get_report()
+    assert sum(_stats["lost"] for _stats in _report.values()) == _generator.dropped_count
+    assert sum(_stats["received"] for _stats in _report.values()) == _generator.telegram_count
+    # Learned as the shortest interval, the jitter shortens it by up to 500 ticks
+    assert _report["STRAIN"]["period"] == pytest.approx(IPRCaptureGenerator.DEFAULT_STRAIN_PERIOD, abs=500)
+    assert all(_stats["invalid"] == 0 and _stats["resyncs"] == 0 for _stats in _report.values())
+
+
+def test_events():
+    _tracker = IPRContinuityTracker(periods={"STRAIN": 100})
+    assert _tracker.update(0, 0 << 3, 1000) == EVENT_FIRST
+    assert _tracker.update(0, 1 << 3, 1100) == EVENT_CONTINUOUS
+    assert _tracker.update(0, 1 << 3, 1100) == EVENT_DUPLICATE
+    # 10 packets later: the sequence alone would mean 1 missing packet, the timestamp tells 9
+    assert _tracker.update(0, 3 << 3, 2100) == EVENT_GAP
+    assert _tracker.update(0, 2 << 3, 2000) == EVENT_OUT_OF_ORDER
+    assert _tracker.update(0, 4 << 3, 2200, valid=False) == EVENT_CONTINUOUS
+    assert _tracker.update(0, 0, 100) == EVENT_RESYNC
+    # Across the 27-bit rollover
+    assert _tracker.update(0, 1 << 3, 200) == EVENT_CONTINUOUS
+    _tracker.update(0, 2 << 3, 300)
+
+    _report = _tracker.get_report()["STRAIN"]
+    assert _report["received"] == 9
+    assert _report["invalid"] == 1
+    assert _report["duplicates"] == 1
+    assert _report["out_of_order"] == 1
+    assert _report["lost"] == 8
+    assert _report["resyncs"] == 1
+
+
+def test_rollover_and_late_batch_fallback():
+    _timestamps = (np.arange(20, dtype=np.int64) * 100 + (1 << 27) - 1000) % (1 << 27)
+    _sequences = (np.arange(20) & 0x07) << 3
+    _late = np.r_[0:10, 11, 10, 12:20]  # Two packets swapped: processed packet by packet
+    for _order, _out_of_order in ((np.arange(20), 0), (_late, 1)):
+        _tracker = IPRContinuityTracker()
+        _tracker.update_batch({"STRAIN": {"timestamp": _timestamps[_order], "sequence": _sequences[_order]}})
+        _report = _tracker.get_report()["STRAIN"]
+        assert (_report["received"], _report["lost"], _report["out_of_order"]) == (20, 0, _out_of_order)
+
+
+def test_reset_keeps_the_period():
+    _tracker = IPRContinuityTracker(tick_rate=1000.0)
+    for _index in range(20):
+        _tracker.update(2, (_index & 0x07) << 3, _index * 50)
+    assert _tracker.get_report()["ACCELERATION"]["sample_rate"] == pytest.approx(20.0)
+    _tracker.reset()
+    _report = _tracker.get_report()["ACCELERATION"]
+    assert _report["received"] == 0
+    assert _report["period"] == 50
@@ -0,0 +1,66 @@
+import numpy as np
+
+from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+from pyipr_sensor_lib.ipr_encoder import (IPRCaptureGenerator, compute_checksum, encode_telegram, encode_sample,
+                                          TYPE_STRAIN, TYPE_ENVIRONMENT, TYPE_ACCELERATION)
+from pyipr_sensor_lib.ipr_metrics import IPRMetrics
+from pyipr_sensor_lib.ipr_parser import IPRParser, unescape_telegram
+from pyipr_sensor_lib.ipr_sample_decoder import decode
+
+RAW_VALUES = {TYPE_STRAIN: (4034, 4252, 4314, 4346, 2149, 2789),
+              TYPE_ENVIRONMENT: (300, 10000, 500, 1200),
+              TYPE_ACCELERATION: (2048, 1000, 3000)}
+
+
+def test_encode_telegram_round_trip():
+    for _packet_type, _values in RAW_VALUES.items():
+        for _sequence in range(8):
+            _telegram = encode_telegram(_packet_type, 34679462 + _sequence, _sequence, _values)
+            _sample = decode(_telegram, scaled=False)
+            assert _sample is not None
+            assert _sample.timestamp == 34679462 + _sequence
+            assert _sample.sequence == _sequence << 3
+            assert tuple(_sample[2:]) == _values
+            assert encode_sample(_sample, scaled=False) == _telegram
+
+
+def test_encode_telegram_checksum():
+    _telegram = unescape_telegram(encode_telegram(TYPE_ACCELERATION, 123456, 3, RAW_VALUES[TYPE_ACCELERATION]))
+    assert len(_telegram) == 10
+    assert _telegram[-1] == compute_checksum(_telegram[:-1])
+
+
+def test_escaped_first_byte_is_decoded():
+    # Strain, sequence 1 and timestamp multiple of 4: the first byte is 0x08, sent as 0x07 0x55
+    _telegram = encode_telegram(TYPE_STRAIN, 4000, 1, RAW_VALUES[TYPE_STRAIN])
+    assert _telegram[:2] == bytes((IPRParser.TELEGRAM_ESCAPE, IPRParser.ESCAPED_SEPARATOR))
+    assert decode(_telegram, scaled=False).timestamp == 4000
+    _columns = decode_batch(_telegram + b'\x08', scaled=False)
+    assert _columns["STRAIN"]["timestamp"].tolist() == [4000]
+
+
+def test_generator_round_trip_has_no_invalid_telegram():
+    _generator = IPRCaptureGenerator(jitter=500, seed=7)
+    _data = _generator.generate(1 << 27)
+    _metrics = IPRMetrics()
+    _columns = decode_batch(_data, scaled=False, metrics=_metrics)
+    _decoded = sum(len(_type_columns["timestamp"]) for _type_columns in _columns.values())
+    assert _decoded == _generator.telegram_count > 0
+    assert _metrics.counters[IPRMetrics.TELEGRAMS_DECODED] == _metrics.counters[IPRMetrics.TELEGRAMS_FRAMED]
+    # As on a real sensor, some telegrams start with an escaped separator
+    assert IPRParser.TELEGRAM_ESCAPE in [_telegram[0] for _telegram in _data.split(b'\x08')[:-1]]
+
+
+def test_generator_dropped_telegrams_are_not_sent():
+    _generator = IPRCaptureGenerator(gap_rate=0.01, seed=3)
+    _data = _generator.generate(1 << 27)
+    _columns = decode_batch(_data, scaled=False)
+    assert _generator.dropped_count > 0
+    assert sum(len(_type_columns["timestamp"]) for _type_columns in _columns.values()) == _generator.telegram_count
+
+
+def test_generator_is_deterministic():
+    _first = IPRCaptureGenerator(jitter=100, seed=5).generate(1 << 24)
+    _second = IPRCaptureGenerator(jitter=100, seed=5).generate(1 << 24)
+    assert _first == _second
+    assert np.frombuffer(_first, dtype=np.uint8)[-1] == IPRParser.TELEGRAM_SEPARATOR
@@ -0,0 +1,30 @@
+import pytest
+
+from pyipr_sensor_lib.ipr_frame_splitter import IPRFrameSplitter
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 4096])
+def test_blocks_of_any_size_give_the_same_telegrams(generated_data, block_size):
+    _splitter = IPRFrameSplitter()
+    _telegrams = list()
+    for _start in range(0, len(generated_data), block_size):
+        _telegrams.extend(_splitter.feed(generated_data[_start:_start + block_size]))
+    assert _telegrams == generated_data.split(b'\x08')[:-1]
+    assert _splitter.get_pending_length() == 0
+
+
+def test_incomplete_telegram_is_kept_until_completed():
+    _splitter = IPRFrameSplitter()
+    assert _splitter.feed(b'\x01\x02\x08\x03\x07') == [b'\x01\x02']
+    assert _splitter.get_pending_length() == 2
+    assert _splitter.feed(b'\x55\x04\x08') == [b'\x03\x07\x55\x04']
+    _splitter.feed(b'\x05')
+    _splitter.reset()
+    assert _splitter.feed(b'\x06\x08') == [b'\x06']
+
+
+def test_data_without_separator_is_discarded():
+    _splitter = IPRFrameSplitter(max_pending_bytes=10)
+    assert _splitter.feed(b'Name : SENSOR\r\n>') == []
+    assert _splitter.discarded_bytes == 16
+    assert _splitter.get_pending_length() == 0
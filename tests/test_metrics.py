@@ -0,0 +1,111 @@
+import sys
+import threading
+
+import pytest
+
+from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+from pyipr_sensor_lib.ipr_metrics import IPRMetrics, IPRTimingHistogram
+from pyipr_sensor_lib.ipr_sensor_decoder import IPRSensorDecoder
+
+_DECODE_COUNTERS = (IPRMetrics.TELEGRAMS_DECODED, IPRMetrics.SHORT_TELEGRAMS, IPRMetrics.CRC_FAILURES,
+                    IPRMetrics.UNKNOWN_PACKET_TYPES, IPRMetrics.SHORT_PACKETS_STRAIN,
+                    IPRMetrics.SHORT_PACKETS_ENVIRONMENT, IPRMetrics.SHORT_PACKETS_ACCELERATION,
+                    IPRMetrics.ESCAPE_SEQUENCES)
+
+
+def test_histogram():
+    _histogram = IPRTimingHistogram()
+    assert _histogram.get_percentile(50) is None
+    for _seconds in [0.000003] * 90 + [0.0005] * 9 + [0.1]:
+        _histogram.record(_seconds)
+    _summary = _histogram.to_dict()
+    assert _summary["count"] == 100
+    assert _summary["min"] == 0.000003 and _summary["max"] == 0.1
+    assert _summary["mean"] == pytest.approx(_histogram.total / 100)
+    assert sum(_summary["buckets"]) == 100
+    # Upper bounds of the buckets: 3 us < 4 us, 500 us < 512 us, the maximum caps the last one
+    assert _summary["p50"] == pytest.approx(4e-6)
+    assert _summary["p90"] == pytest.approx(4e-6)
+    assert _summary["p99"] == pytest.approx(512e-6)
+    assert _histogram.get_percentile(100) == 0.1
+
+
+@pytest.mark.parametrize("capture", ["example_data", "generated_data"])
+def test_batch_counters_match_analyse_packet(request, capture):
+    _data = request.getfixturevalue(capture)
+    _batch_metrics = IPRMetrics()
+    decode_batch(_data, metrics=_batch_metrics)
+    _scalar_metrics = IPRMetrics()
+    _decoder = IPRSensorDecoder(metrics=_scalar_metrics)
+    for _telegram in _data.split(b'\x08')[:-1]:
+        _decoder.analyse_packet(_telegram)
+    for _counter in _DECODE_COUNTERS:
+        assert _batch_metrics.get_counter(_counter) == _scalar_metrics.get_counter(_counter), _counter
+    assert _batch_metrics.get_counter(IPRMetrics.TELEGRAMS_DECODED) > 0
+    for _stage in (IPRMetrics.STAGE_FRAME, IPRMetrics.STAGE_UNESCAPE, IPRMetrics.STAGE_DECODE, IPRMetrics.STAGE_SCALE):
+        assert _batch_metrics.timings[_stage].count == 1
+    assert _scalar_metrics.timings[IPRMetrics.STAGE_DECODE].count == \
+        _scalar_metrics.get_counter(IPRMetrics.TELEGRAMS_DECODED)
+
+
+def test_invalid_sample_is_bounded():
+    _metrics = IPRMetrics(invalid_sample_size=3)
+    for _index in range(5):
+        _metrics.add_invalid_telegram(bytes([_index]), IPRMetrics.CRC_FAILURES)
+    _snapshot = _metrics.snapshot()
+    assert [_telegram for _, _, _telegram in _snapshot["invalid_samples"]] == ["02", "03", "04"]
+    assert _snapshot["invalid_samples"][0][1] == IPRMetrics.CRC_FAILURES
+
+
+def test_invalid_sample_during_snapshot():
+    _metrics = IPRMetrics(invalid_sample_size=100)
+    _done = threading.Event()
+
+    def _add():
+        for _ in range(100000):
+            _metrics.add_invalid_telegram(b'\x01\x02', IPRMetrics.CRC_FAILURES)
+        _done.set()
+
+    # Switch threads as often as possible so that snapshot runs during the appends
+    _switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    _thread = threading.Thread(target=_add)
+    _thread.start()
+    try:
+        while not _done.is_set():
+            assert len(_metrics.snapshot()["invalid_samples"]) <= 100
+    finally:
+        _thread.join()
+        sys.setswitchinterval(_switch_interval)
+
+
+def test_custom_names_and_reset():
+    _metrics = IPRMetrics()
+    _metrics.increment("custom", 3)
+    _metrics.increment(IPRMetrics.BYTES_READ, 10)
+    _metrics.record_time("custom_stage", 0.01)
+    assert _metrics.get_counter("custom") == 3
+    assert _metrics.snapshot()["timings"]["custom_stage"]["count"] == 1
+    _metrics.reset()
+    assert _metrics.get_counter("custom") == 0
+    assert _metrics.get_counter(IPRMetrics.BYTES_READ) == 0
+    assert _metrics.snapshot()["timings"]["custom_stage"]["count"] == 0
+
+
+def test_periodic_export():
+    _metrics = IPRMetrics()
+    _metrics.increment(IPRMetrics.BYTES_READ, 42)
+    _snapshots = list()
+    _exported = threading.Event()
+
+    def _callback(snapshot):
+        _snapshots.append(snapshot)
+        _exported.set()
+
+    _metrics.add_callback(_callback)
+    _metrics.start_periodic_export(0.01)
+    try:
+        assert _exported.wait(5)
+    finally:
+        _metrics.stop_periodic_export()
+    assert _snapshots[0]["counters"][IPRMetrics.BYTES_READ] == 42
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from pyipr_sensor_lib.ipr_batch_decoder import batch_split_telegrams, batch_unescape
+from pyipr_sensor_lib.ipr_packet_layout import (HEADER_BYTES, PACKET_LAYOUTS, PACKET_LAYOUTS_BY_ID,
+                                                IPRPacketLayout, PacketField)
+from pyipr_sensor_lib.ipr_parser import IPRParser
+
+
+@pytest.mark.parametrize("layout", PACKET_LAYOUTS, ids=lambda _layout: _layout.name)
+def test_pack_extract_round_trip(layout):
+    _random = np.random.default_rng(5)
+    _values = [_random.integers(0, 1 << _field.width, 200) for _field in layout.fields]
+    _bytes = np.zeros((layout.decode_width, 200), dtype=np.int64)
+    layout.pack_into(_bytes, _values)
+    assert _bytes.max() <= 0xFF
+
+    # The decoders do not read the ignored bits
+    _expected = [_value & ~_field.ignored_bits for _value, _field in zip(_values, layout.fields)]
+    for _extracted, _value in zip(layout.extract_batch(_bytes.T), _expected):
+        assert np.array_equal(_extracted, _value)
+    _row = [0] * len(layout.fields)
+    for _telegram in range(200):
+        layout.extract_into(_bytes[:, _telegram].tolist(), _row)
+        assert _row == [int(_value[_telegram]) for _value in _expected]
+    # The header bits are left untouched
+    assert not _bytes[:HEADER_BYTES - 1].any() and not (_bytes[HEADER_BYTES - 1] & 0x01).any()
+
+
+@pytest.mark.parametrize("layout", PACKET_LAYOUTS, ids=lambda _layout: _layout.name)
+def test_batch_matches_scalar_extract(layout, example_data):
+    _data = np.frombuffer(example_data, dtype=np.uint8)
+    _clean, _starts, _lengths = batch_unescape(_data, *batch_split_telegrams(_data))
+    _selected = np.flatnonzero((_lengths >= layout.telegram_length) &
+                               (_clean[np.minimum(_starts, len(_clean) - 1)] & 0x03 == layout.packet_id))
+    _bytes = _clean[_starts[_selected, None] + np.arange(layout.decode_width)].astype(np.int32)
+    _batch = np.stack(layout.extract_batch(_bytes), axis=1)
+    _scalar = list()
+    for _telegram in _bytes.tolist():
+        _row = [0] * len(layout.fields)
+        layout.extract_into(_telegram, _row)
+        _scalar.append(_row)
+    assert len(_scalar) > 0
+    assert np.array_equal(_batch, np.array(_scalar))
+
+
+def test_layout_table():
+    assert [_layout.name for _layout in PACKET_LAYOUTS] == ["STRAIN", "ENVIRONMENT", "ACCELERATION"]
+    assert [_layout.telegram_length for _layout in PACKET_LAYOUTS] == [15, 11, 10]
+    assert PACKET_LAYOUTS_BY_ID == PACKET_LAYOUTS + (None,)
+    assert PACKET_LAYOUTS[0].columns[0] == "strain_x"
+    assert PACKET_LAYOUTS[2].units == ("g", "g", "g")
+
+
+@pytest.mark.parametrize("fields, message", [
+    ((PacketField("a", 3, 0, 8, (1, 255, 0, 1), ""),), "header"),
+    ((PacketField("a", 4, 1, 8, (1, 255, 0, 1), ""), PacketField("b", 5, 0, 8, (1, 255, 0, 1), "")), "another"),
+    ((PacketField("a", 4, 1, 8, (1, 256, 0, 1), ""),), "8 bits"),
+    ((PacketField("a", 4, 1, 8, (1, 200, 0, 1), ""),), "raw values up to 255"),
+    ((PacketField("a", 4, 1, 8, (1, 100, 0, 1), "", 0x80),), "raw values up to 127"),
+])
+def test_invalid_fields(fields, message):
+    with pytest.raises(ValueError, match=message):
+        IPRPacketLayout("TEST", 3, fields)
+
+
+@pytest.mark.parametrize("layout", PACKET_LAYOUTS, ids=lambda _layout: _layout.name)
+def test_scale_tables_cover_the_read_bits(layout):
+    # Every raw value the extractors can return indexes the scale tables
+    _bytes = [0xFF] * layout.decode_width
+    _values = [0] * len(layout.fields)
+    layout.extract_into(_bytes, _values)
+    for _table, _value in zip(IPRParser.get_default_scale_tables()[layout.name], _values):
+        assert _value < len(_table)
+
+
+def test_custom_layout_source():
+    _layout = IPRPacketLayout("TEST", 3, (PacketField("a", 4, 1, 7, (1, 127, 0, 1), ""),
+                                          PacketField("b", 5, 0, 12, (1, 4095, 0, 1), "")))
+    assert (_layout.decode_width, _layout.telegram_length) == (7, 8)
+    assert "def extract_into" in _layout.source and "def extract_batch" in _layout.source
+    _bytes = [0] * _layout.decode_width
+    _layout.pack_into(_bytes, (0x55, 0xABC))
+    _values = [0, 0]
+    _layout.extract_into(_bytes, _values)
+    assert _values == [0x55, 0xABC]
@@ -0,0 +1,47 @@
+from array import array
+
+import numpy as np
+import pytest
+
+from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+from pyipr_sensor_lib.ipr_packet_layout import PACKET_LAYOUTS
+from pyipr_sensor_lib.ipr_sample_decoder import (DECODE_BUFFER_LENGTH, TYPE_INVALID, AccelSample, EnvSample,
+                                                 StrainSample, decode, decode_into)
+
+_SAMPLE_TYPES = {"STRAIN": StrainSample, "ENVIRONMENT": EnvSample, "ACCELERATION": AccelSample}
+
+
+@pytest.mark.parametrize("capture", ["example_data", "generated_data"])
+@pytest.mark.parametrize("scaled", [False, True])
+def test_decode_matches_batch(request, capture, scaled):
+    _data = request.getfixturevalue(capture)
+    _batch = decode_batch(_data, scaled=scaled)
+    _samples = {_name: list() for _name in _SAMPLE_TYPES}
+    for _telegram in _data.split(b'\x08')[:-1]:
+        _sample = decode(_telegram, scaled=scaled)
+        if _sample is not None:
+            _samples[next(_name for _name, _type in _SAMPLE_TYPES.items() if isinstance(_sample, _type))].append(_sample)
+
+    for _layout in PACKET_LAYOUTS:
+        _columns = _batch[_layout.name]
+        _rows = np.array(_samples[_layout.name], dtype=np.float64).reshape(-1, 2 + len(_layout.columns))
+        assert len(_rows) == len(_columns["timestamp"])
+        for _index, _column in enumerate(("timestamp", "sequence") + _layout.columns):
+            assert np.array_equal(_rows[:, _index], _columns[_column].astype(np.float64)), (_layout.name, _column)
+
+
+def test_decode_into_buffer(example_data):
+    _telegram = next(_telegram for _telegram in example_data.split(b'\x08') if decode(_telegram) is not None)
+    _values = array('d', [0.0] * DECODE_BUFFER_LENGTH)
+    _packet_type = decode_into(_telegram, _values)
+    _sample = decode(_telegram)
+    assert _packet_type == [StrainSample, EnvSample, AccelSample].index(type(_sample))
+    assert list(_values[:len(_sample)]) == pytest.approx(list(_sample))
+
+
+@pytest.mark.parametrize("telegram", [b'', b'\x00' * 9, b'\x04' + b'\x00' * 14, b'\x05' + b'\x00' * 9,
+                                      b'\x03' + b'\x00' * 14])
+def test_invalid_telegrams(telegram):
+    # Too short, wrong ID CRC, too short for an environment packet, unknown packet ID
+    assert decode_into(telegram, [0] * DECODE_BUFFER_LENGTH) == TYPE_INVALID
+    assert decode(telegram) is None
@@ -0,0 +1,62 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from pyipr_sensor_lib.ipr_calibration import IPRCalibration
+from pyipr_sensor_lib.ipr_sensor_info import SensorInfo
+from pyipr_sensor_lib.ipr_sensor_simulator import IPRSensorSimulator
+from pyipr_sensor_lib.ipr_serial_interface import IPRSerialInterface
+
+_REPLIES = {"$": "Firmware : 1.2\r\nTime (RTC)   : 2024-05-17-12-30-05", "name": "IPR-1", "material": "Steel",
+            "tare": "X=1.5 Y=-2 Z=0", "transfer": "X=Y=Z=1", "offset": "X=0 Y=0 Z=10"}
+
+
+def test_from_replies():
+    _info = SensorInfo.from_replies(_REPLIES, query_time=123.0)
+    assert (_info.name, _info.material) == ("IPR-1", "Steel")
+    assert _info.tare == (1.5, -2.0, 0.0)
+    assert _info.gain == (1.0, 1.0, 1.0)
+    assert _info.strain_offset == (0.0, 0.0, 10.0)
+    assert _info.rtc_time == datetime(2024, 5, 17, 12, 30, 5)
+    assert _info.system_status == _REPLIES["$"]
+    assert _info.query_time == 123.0
+
+    _calibration = _info.get_calibration()
+    assert isinstance(_calibration, IPRCalibration)
+    assert (_calibration.tare, _calibration.gain, _calibration.strain_offset) == (_info.tare, _info.gain,
+                                                                                   _info.strain_offset)
+
+
+def test_status_without_clock():
+    _info = SensorInfo.from_replies(dict(_REPLIES, **{"$": "Firmware : 1.2"}))
+    assert _info.rtc_time is None
+    assert _info.query_time == pytest.approx(time.time(), abs=60)
+
+
+def test_query_session_keeps_the_stream():
+    _simulator = IPRSensorSimulator(name="SIM_INFO", telegram_rate=2000, tare=(1.5, -2, 0), gain=(1, 1, 2),
+                                    material="Aluminium", rtc_start=datetime(2024, 5, 17, 12, 30, 0))
+    _simulator.start()
+    _interface = IPRSerialInterface()
+    try:
+        _interface.serial_setup(_simulator.get_port_name())
+        _interface.serial_open()
+        _interface.serial_ipr_start_binary_read()
+        time.sleep(0.05)
+        _info = _interface.serial_ipr_get_sensor_info()
+        assert _info.name == "SIM_INFO"
+        assert _info.material == "Aluminium"
+        assert _info.tare == (1.5, -2.0, 0.0)
+        assert _info.gain == (1.0, 1.0, 2.0)
+        assert _info.rtc_time is not None and _info.rtc_time.year == 2024
+        # The stream is restarted, and the cached metadata is returned without stopping it again
+        _end = time.monotonic() + 1
+        while not _simulator.is_streaming and time.monotonic() < _end:
+            time.sleep(0.01)
+        assert _simulator.is_streaming
+        assert _interface.serial_ipr_get_sensor_info() is _info
+        assert _interface.serial_ipr_get_sensor_info(max_age=0) is not _info
+    finally:
+        _interface.serial_close()
+        _simulator.stop()
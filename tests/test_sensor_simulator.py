@@ -0,0 +1,55 @@
+import time
+
+from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+from pyipr_sensor_lib.ipr_sensor_simulator import IPRSensorSimulator
+from pyipr_sensor_lib.ipr_serial_interface import IPRSerialInterface
+
+
+def _connect(simulator):
+    simulator.start()
+    _interface = IPRSerialInterface()
+    _interface.serial_setup(simulator.get_port_name())
+    _interface.serial_open()
+    return _interface
+
+
+def test_commands_and_stream():
+    _simulator = IPRSensorSimulator(name="SIM_A", telegram_rate=2000, tare=(1.5, -2, 0))
+    _interface = _connect(_simulator)
+    try:
+        assert _interface.serial_ipr_get_sensor_name() == "SIM_A"
+        assert _interface.serial_ipr_get_sensor_tare() == "X=1.5 Y=-2 Z=0"
+        _interface.serial_ipr_start_binary_read()
+        _telegrams = list()
+        _end = time.monotonic() + 0.3
+        while time.monotonic() < _end:
+            _telegrams.extend(_interface.serial_ipr_read_telegrams())
+        # The next command stops the stream first
+        assert _interface.serial_ipr_get_sensor_name() == "SIM_A"
+        assert not _simulator.is_streaming
+    finally:
+        _interface.serial_close()
+        _simulator.stop()
+    _columns = decode_batch(b'\x08'.join(_telegrams[1:]) + b'\x08')
+    assert sum(len(_type_columns["timestamp"]) for _type_columns in _columns.values()) == len(_telegrams) - 1 > 0
+
+
+def test_send_times_are_bounded_by_the_window():
+    _simulator = IPRSensorSimulator(telegram_rate=5000, record_send_times=True)
+    _simulator.SEND_TIME_WINDOW = 0.05
+    _interface = _connect(_simulator)
+    try:
+        _interface.serial_ipr_start_binary_read()
+        _received = list()
+        _end = time.monotonic() + 0.5
+        while time.monotonic() < _end:
+            _received.extend(_interface.serial_ipr_read_telegrams())
+        _interface.serial_ipr_stop_binary_read()
+        _recorded = len(_simulator._send_times)
+        assert _simulator.get_send_time(_received[-1]) is not None
+        assert _simulator.get_send_time(_received[1]) is None
+    finally:
+        _interface.serial_close()
+        _simulator.stop()
+    # About 5000 telegrams/s during the 0.05 s window, not the whole stream
+    assert 0 < _recorded < 1000 < len(_received)
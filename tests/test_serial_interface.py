@@ -0,0 +1,72 @@
+from pyipr_sensor_lib.ipr_encoder import encode_telegram, TYPE_STRAIN
+from pyipr_sensor_lib.ipr_serial_interface import (IPRSerialInterface, STREAM_STOP_PROBE_COMMAND, find_stream_end,
+                                                   format_command, format_text_reply, is_binary_data,
+                                                   parse_command_reply)
+
+
+class FakeSerialPort:
+    """Serial port returning a fixed reply once a command is written."""
+
+    def __init__(self, reply):
+        self.reply = bytearray(reply)
+        self.written = bytearray()
+        self.timeout = 0.01
+
+    @property
+    def in_waiting(self):
+        return len(self.reply)
+
+    def write(self, data):
+        self.written += data
+
+    def read(self, size):
+        _data = bytes(self.reply[:size])
+        del self.reply[:size]
+        return _data
+
+
+def _probe_reply():
+    return format_command(STREAM_STOP_PROBE_COMMAND) + b"\nName : SENSOR_A\r\n>"
+
+
+def _stop_stream(reply):
+    _interface = IPRSerialInterface()
+    _interface.STREAM_STOP_TIMEOUT = 0.1
+    _interface._serial_port_obj = FakeSerialPort(reply)
+    _interface.is_binary_reading_running = True
+    return _interface, _interface.serial_ipr_check_if_data_reading()
+
+
+def test_stop_after_binary_stream():
+    _telegram = encode_telegram(TYPE_STRAIN, 1000, 2, (1, 2, 3, 4, 5, 6))
+    _interface, _was_streaming = _stop_stream(_telegram[3:] + b'\x08' + _telegram + b'\x08' + _probe_reply())
+    assert _was_streaming
+    assert _interface.is_binary_reading_running is False
+    assert _interface.stream_stop_timing.count == 1
+
+
+def test_stop_echo_and_prompt_are_not_a_stream():
+    _interface, _was_streaming = _stop_stream(format_command("<scanmb-stop>") + b"\n>" + _probe_reply())
+    assert not _was_streaming
+
+
+def test_stop_without_probe_reply():
+    _interface, _was_streaming = _stop_stream(b"\r\n>")
+    assert not _was_streaming
+
+
+def test_find_stream_end():
+    _data = b'\x01\x02\x08' + _probe_reply() + b'next'
+    _echo, _end = find_stream_end(_data)
+    assert _echo == 3
+    assert _data[_end:] == b'next'
+    assert find_stream_end(b'\x01\x08' + format_command(STREAM_STOP_PROBE_COMMAND)) is None
+    assert is_binary_data(_data[:_echo])
+    assert not is_binary_data(b"<scanmb-stop>\r\n>")
+
+
+def test_parse_command_reply():
+    _reply = format_text_reply(b"name\r\nName : SENSOR_A\r\n")
+    assert parse_command_reply("name", _reply) == "SENSOR_A"
+    _reply = format_text_reply(b"material\r\nMaterial = Steel\r\n")
+    assert parse_command_reply("material", _reply) == "Steel"
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from pyipr_sensor_lib.ipr_batch_decoder import decode_batch
+from pyipr_sensor_lib.ipr_time_axis import TIMESTAMP_MODULO, IPRTimeAxis, parse_rtc_time, unwrap_timestamps
+
+
+def test_unwrap_timestamps():
+    _ticks = np.arange(0, 5 * TIMESTAMP_MODULO, TIMESTAMP_MODULO // 3, dtype=np.int64) + 1000
+    assert np.array_equal(unwrap_timestamps(_ticks % TIMESTAMP_MODULO), _ticks)
+    # Continuing a previous block
+    assert np.array_equal(unwrap_timestamps(_ticks[5:] % TIMESTAMP_MODULO, previous=int(_ticks[4])), _ticks[5:])
+    assert len(unwrap_timestamps([])) == 0
+
+
+@pytest.mark.parametrize("block_size", [3000, 100000])
+def test_blocks_continue_the_time_axis(generated_data, block_size):
+    _expected = IPRTimeAxis(tick_rate=1e6).update(decode_batch(generated_data))
+    _time_axis = IPRTimeAxis(tick_rate=1e6)
+    _blocks = list()
+    _start = 0
+    while _start < len(generated_data):
+        _end = generated_data.find(b'\x08', _start + block_size)
+        _end = len(generated_data) if _end < 0 else _end + 1
+        _blocks.append(_time_axis.update(decode_batch(generated_data[_start:_end])))
+        _start = _end
+
+    for _name, _columns in _expected.items():
+        _ticks = np.concatenate([_block[_name]["tick"] for _block in _blocks])
+        assert np.array_equal(_ticks, _columns["tick"])
+        assert np.all(np.diff(_ticks) > 0)
+        assert np.array_equal(np.concatenate([_block[_name]["time"] for _block in _blocks]), _columns["time"])
+    # The capture spans several rollovers of the raw timestamps
+    assert _expected["STRAIN"]["tick"][-1] > 5 * TIMESTAMP_MODULO
+    # Common origin: the oldest first packet of the first block
+    assert min(int(_columns["tick"][0]) for _columns in _expected.values()) == 0
+
+
+def test_absolute_time_and_reset():
+    _start_time = datetime(2024, 5, 17, 12, 30, 0)
+    _time_axis = IPRTimeAxis(tick_rate=1000.0, start_time=_start_time)
+    _columns = _time_axis.update({"STRAIN": {"timestamp": np.array([TIMESTAMP_MODULO - 500, 500], dtype=np.uint32)},
+                                  "ACCELERATION": {"timestamp": np.array([TIMESTAMP_MODULO - 1000], dtype=np.uint32)}})
+    assert _columns["ACCELERATION"]["tick"].tolist() == [0]
+    assert _columns["STRAIN"]["tick"].tolist() == [500, 1500]
+    assert _columns["STRAIN"]["time"].tolist() == [_start_time.timestamp() + 0.5, _start_time.timestamp() + 1.5]
+
+    _time_axis.reset()
+    _columns = _time_axis.update({"STRAIN": {"timestamp": np.array([10, 20], dtype=np.uint32)}})
+    assert _columns["STRAIN"]["tick"].tolist() == [0, 10]
+
+
+def test_parse_rtc_time():
+    _status = "Firmware : 1.2\r\nTime (RTC) : 2024-05-17-12-30-05\r\nBattery : 3.9 V\r\n"
+    assert parse_rtc_time(_status) == datetime(2024, 5, 17, 12, 30, 5)
+    with pytest.raises(ValueError):
+        parse_rtc_time("Firmware : 1.2")